@@ -0,0 +1,390 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+from utils import MediaClock, NUM_POSE_LANDMARKS
+from thresholds import get_thresholds
+from process_frame import ProcessFrame
+from bicep_curl import ProcessFrame as BicepCurlProcessFrame
+from shoulder_press import ProcessShoulderPress
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_VIDEO = os.path.join(BASE_DIR, 'output_live.mp4')
+DEFAULT_BASELINE_DIR = os.path.join(BASE_DIR, 'benchmarks')
+
+# Bump when cases or metrics change meaning so old baselines are not compared against.
+BENCHMARK_VERSION = 1
+
+PROCESSORS = {
+    'squat': ProcessFrame,
+    'bicep_curl': BicepCurlProcessFrame,
+    'shoulder_press': ProcessShoulderPress
+}
+
+# state_tracker keys holding each processor's (correct, incorrect) rep counters.
+COUNTER_KEYS = {
+    'squat': ('SQUAT_COUNT', 'IMPROPER_SQUAT'),
+    'bicep_curl': ('BICEP_CURL_COUNT', 'INCORRECT_BICEP_CURL'),
+    'shoulder_press': ('SHOULDER_PRESS_COUNT', 'IMPROPER_PRESS')
+}
+
+
+
+
+def _rotate(v, degrees):
+    theta = np.deg2rad(degrees)
+    c, s = np.cos(theta), np.sin(theta)
+    return np.array([c * v[0] - s * v[1], s * v[0] + c * v[1]])
+
+
+
+def synthetic_landmarks(exercise, num_frames, frame_width, frame_height, period = 60, noise = 1.5, seed = 0):
+
+    # Deterministic (num_frames, 33, 4) landmark stream of repeated reps, built in pixel space
+    # so the angles each processor measures sweep through its state thresholds, then
+    # normalised by the frame size the way MediaPipe reports landmarks.
+    rng = np.random.default_rng(seed)
+
+    phase = (1 - np.cos(2 * np.pi * np.arange(num_frames) / period)) / 2
+    unit = 0.2 * frame_height
+
+    pts = np.zeros((num_frames, NUM_POSE_LANDMARKS, 2))
+    pts[:] = (0.5 * frame_width, 0.5 * frame_height)
+
+    for i, p in enumerate(phase):
+        if exercise == 'squat':
+            # Side view: knee angle to the vertical sweeps 0 -> 85 degrees.
+            ankle = np.array([0.5 * frame_width, 0.9 * frame_height])
+            knee = ankle + _rotate((0, -unit), 25 * p)
+            hip = knee + _rotate((0, -unit), -85 * p)
+            shoulder = hip + _rotate((0, -1.2 * unit), 15 + 20 * p)
+            elbow = shoulder + (0.1 * unit, 0.6 * unit)
+            wrist = elbow + (0.4 * unit, 0.1 * unit)
+            foot = ankle + (0.3 * unit, 0.05 * unit)
+            nose = shoulder + (0.15 * unit, -0.4 * unit)
+
+        elif exercise == 'bicep_curl':
+            # Side view: forearm swings up from hanging, so the wrist ends up between
+            # shoulder and elbow at the top of the curl.
+            shoulder = np.array([0.5 * frame_width, 0.3 * frame_height])
+            elbow = shoulder + (0, unit)
+            wrist = elbow + _rotate((0, 0.8 * unit), 20 + 158 * p)
+            hip = shoulder + (0, 1.2 * unit)
+            knee = hip + (0, unit)
+            ankle = knee + (0, unit)
+            foot = ankle + (0.3 * unit, 0)
+            nose = shoulder + (0.15 * unit, -0.4 * unit)
+
+        else:
+            # Front view: the left elbow circles the right shoulder from 40 to 140 degrees.
+            right_shoulder = np.array([0.4 * frame_width, 0.45 * frame_height])
+            shoulder = right_shoulder + (unit, 0)
+            elbow = right_shoulder + _rotate((1.2 * unit, 0), -(40 + 100 * p))
+            wrist = elbow + (0, -0.6 * unit)
+            hip = shoulder + (0, 1.5 * unit)
+            knee = hip + (0, unit)
+            ankle = knee + (0, unit)
+            foot = ankle + (0, 0.1 * unit)
+            nose = (shoulder + right_shoulder) / 2 + (0, -0.5 * unit)
+
+        pts[i, 0] = nose
+        for left_idx, point in ((11, shoulder), (13, elbow), (15, wrist), (23, hip), (25, knee), (27, ankle), (31, foot)):
+            pts[i, left_idx] = point
+            pts[i, left_idx + 1] = point + (2, 0)
+
+        if exercise == 'shoulder_press':
+            pts[i, 12] = right_shoulder
+
+    pts += rng.normal(0, noise, pts.shape)
+
+    landmarks = np.zeros((num_frames, NUM_POSE_LANDMARKS, 4), dtype=np.float32)
+    landmarks[..., 0] = pts[..., 0] / frame_width
+    landmarks[..., 1] = pts[..., 1] / frame_height
+    landmarks[..., 3] = 0.9
+
+    return landmarks
+
+
+
+
+class FakePose:
+    def __init__(self, landmarks):
+
+        # Stand-in for a MediaPipe Pose graph that replays a landmark track, one row per
+        # process() call, as MediaPipe-style result objects. NaN rows report no detection.
+        self.landmarks = landmarks
+        self.frame_idx = 0
+
+
+
+    def process(self, frame):
+        row = self.landmarks[self.frame_idx % len(self.landmarks)]
+        self.frame_idx += 1
+
+        if np.isnan(row[0, 0]):
+            return SimpleNamespace(pose_landmarks=None)
+
+        landmark = [SimpleNamespace(x=float(x), y=float(y), z=float(z), visibility=float(v)) for x, y, z, v in row]
+
+        return SimpleNamespace(pose_landmarks=SimpleNamespace(landmark=landmark))
+
+
+
+    def reset(self):
+        pass
+
+
+
+    def close(self):
+        pass
+
+
+
+
+def load_frames(video_path, num_frames):
+    # RGB frames of the video, looped to num_frames, held in memory so decoding stays out
+    # of the measurements. Falls back to blank 480x360 frames when the video is unavailable.
+    frames = []
+
+    vf = cv2.VideoCapture(video_path)
+    while len(frames) < num_frames:
+        ret, frame = vf.read()
+        if not ret:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    vf.release()
+
+    if not frames:
+        frames = [np.zeros((360, 480, 3), dtype=np.uint8)]
+
+    return [frames[i % len(frames)] for i in range(num_frames)]
+
+
+
+def cpu_model():
+    # CPU model name, since platform.processor() is empty or just the architecture on Linux.
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+
+    return platform.processor() or platform.machine()
+
+
+
+def mediapipe_available():
+    try:
+        import mediapipe as mp
+        return hasattr(mp, 'solutions')
+    except ImportError:
+        return False
+
+
+
+
+def run_case(exercise, frames, landmarks, inference, thresholds, flip_frame = False, warmup = 30, pose = None):
+
+    # Feeds every frame through one processor and times each call. With inference the
+    # processor runs process() against the pose backend; without, it replays the landmark
+    # track through process_landmarks(). Timers follow a MediaClock so counts are reproducible.
+    clock = MediaClock(fps=30.0)
+    processor = PROCESSORS[exercise](thresholds, flip_frame=flip_frame, clock=clock)
+
+    if inference and pose is None:
+        pose = FakePose(landmarks)
+
+    latencies = np.zeros(len(frames))
+
+    for frame_idx, frame in enumerate(frames):
+        clock.frame_idx = frame_idx
+        frame = frame.copy()
+
+        if inference:
+            start = time.perf_counter()
+            processor.process(frame, pose)
+        else:
+            row = landmarks[frame_idx % len(landmarks)]
+            row = None if np.isnan(row[0, 0]) else row
+
+            start = time.perf_counter()
+            processor.process_landmarks(frame, row)
+
+        latencies[frame_idx] = time.perf_counter() - start
+
+    latencies = latencies[warmup:] * 1000.0
+    correct_key, incorrect_key = COUNTER_KEYS[exercise]
+    counters = {'correct': processor.state_tracker[correct_key], 'incorrect': processor.state_tracker[incorrect_key]}
+
+    return {
+        'frames': int(len(latencies)),
+        'fps': float(len(latencies) / (latencies.sum() / 1000.0)),
+        'latency_ms': {
+            'mean': float(latencies.mean()),
+            'p50': float(np.percentile(latencies, 50)),
+            'p95': float(np.percentile(latencies, 95)),
+            'p99': float(np.percentile(latencies, 99)),
+            'max': float(latencies.max())
+        },
+        'counters': counters
+    }
+
+
+
+def best_of(repeat, case, *args, **kwargs):
+    # Fastest of several runs, as timeit does: slower runs measure interference, not the code.
+    return max((case(*args, **kwargs) for _ in range(repeat)), key=lambda result: result['fps'])
+
+
+
+def run_benchmarks(video_path = DEFAULT_VIDEO, num_frames = 600, mode = 'beginner', flip_frame = False, warmup = 30, repeat = 3, real_pose = False, machine = None):
+
+    thresholds = get_thresholds(mode)
+    frames = load_frames(video_path, num_frames + warmup)
+    frame_height, frame_width, _ = frames[0].shape
+
+    results = {}
+
+    for exercise in PROCESSORS:
+        landmarks = synthetic_landmarks(exercise, len(frames), frame_width, frame_height)
+
+        for inference in (True, False):
+            name = f"{exercise}/synthetic/{'with' if inference else 'without'}_inference"
+            results[name] = best_of(repeat, run_case, exercise, frames, landmarks, inference, thresholds, flip_frame, warmup)
+
+    # The recorded clip through the real model, and its landmarks replayed without it.
+    if real_pose:
+        from utils import get_mediapipe_pose
+        from parallel_analysis import extract_landmarks
+
+        track = extract_landmarks(video_path, end_frame=len(frames))
+
+        for exercise in PROCESSORS:
+            pose = get_mediapipe_pose()
+            try:
+                results[f'{exercise}/video/with_inference'] = run_case(exercise, frames, track, True, thresholds, flip_frame, warmup, pose=pose)
+            finally:
+                pose.close()
+
+            results[f'{exercise}/video/without_inference'] = best_of(repeat, run_case, exercise, frames, track, False, thresholds, flip_frame, warmup)
+
+    return {
+        'version': BENCHMARK_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': {
+            'video': os.path.basename(video_path),
+            'frame_size': [frame_width, frame_height],
+            'num_frames': num_frames,
+            'warmup': warmup,
+            'repeat': repeat,
+            'mode': mode,
+            'flip_frame': flip_frame,
+            'real_pose': real_pose
+        },
+        'environment': {
+            'machine': machine or platform.node(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+            'platform': platform.platform(),
+            'processor': cpu_model(),
+            'cpu_count': os.cpu_count()
+        },
+        'results': results
+    }
+
+
+
+
+def compare(current, baseline, tolerance = 0.15):
+
+    # Lists the cases whose fps dropped or p95 latency rose by more than tolerance against
+    # the baseline, plus any whose rep counters changed (a behaviour change, not a slowdown).
+    regressions = []
+
+    if baseline.get('version') != current['version']:
+        return [f"baseline version {baseline.get('version')} does not match {current['version']}"]
+
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+
+        if result['fps'] < base['fps'] * (1 - tolerance):
+            regressions.append(f"{name}: fps {base['fps']:.1f} -> {result['fps']:.1f}")
+
+        if result['latency_ms']['p95'] > base['latency_ms']['p95'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base['latency_ms']['p95']:.3f} ms -> {result['latency_ms']['p95']:.3f} ms")
+
+        if result['counters'] != base['counters']:
+            regressions.append(f"{name}: counters {base['counters']} -> {result['counters']}")
+
+    return regressions
+
+
+
+def format_report(report):
+    lines = [f"{'case':<42} {'fps':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  counters"]
+    for name, result in report['results'].items():
+        latency = result['latency_ms']
+        lines.append(f"{name:<42} {result['fps']:>10.1f} {latency['p50']:>9.3f} {latency['p95']:>9.3f} {latency['p99']:>9.3f}  {result['counters']}")
+
+    return '\n'.join(lines)
+
+
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description='Throughput benchmarks for the exercise processors.')
+    parser.add_argument('--video', default=DEFAULT_VIDEO)
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--warmup', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per case; the fastest is reported.')
+    parser.add_argument('--mode', choices=['beginner', 'pro'], default='beginner')
+    parser.add_argument('--flip', action='store_true', help='Benchmark with flip_frame=True, as on the live page.')
+    parser.add_argument('--real-pose', action='store_true', help='Also replay the video through MediaPipe Pose.')
+    parser.add_argument('--save', metavar='PATH', help=f'Write the results as JSON, e.g. {os.path.relpath(DEFAULT_BASELINE_DIR)}/baseline.json')
+    parser.add_argument('--compare', metavar='PATH', help='Baseline JSON to compare against; exits with status 1 on regressions.')
+    parser.add_argument('--tolerance', type=float, default=0.15)
+    parser.add_argument('--machine', help='Description of the machine, recorded with the results; defaults to the host name.')
+    args = parser.parse_args(argv)
+
+    if args.real_pose and not mediapipe_available():
+        parser.error('--real-pose needs a MediaPipe build with mediapipe.solutions')
+
+    report = run_benchmarks(args.video, args.frames, args.mode, args.flip, args.warmup, args.repeat, args.real_pose, args.machine)
+    print(format_report(report))
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+        regressions = compare(report, baseline, args.tolerance)
+        for regression in regressions:
+            print('REGRESSION', regression)
+
+        if regressions:
+            return 1
+
+    return 0
+
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,168 @@
+import threading
+import time
+from collections import deque
+
+from pose_pool import get_pose_pool
+
+
+# Rough inference cost of MediaPipe's lite, full and heavy pose models relative to the
+# lite one, to predict whether a higher complexity would fit the budget.
+DEFAULT_COMPLEXITY_COST = (1.0, 1.5, 4.0)
+
+
+class AdaptiveComplexityPose:
+    def __init__(self, target_latency = 1.0 / 30, complexity = 1, min_complexity = 0, max_complexity = 2, upgrade_margin = 0.7,
+                 hold_frames = 60, smoothing = 0.1, cost = DEFAULT_COMPLEXITY_COST, pose_params = None, pool = None, timeout = 10.0,
+                 clock = time.perf_counter, max_switches = 100):
+
+        # Pose graph that switches its model complexity at run time to keep inference
+        # within target_latency seconds per frame.
+        #   down  as soon as the latency moving average exceeds the budget
+        #   up    only once the next complexity's predicted latency is below
+        #         upgrade_margin of the budget
+        # Between the two thresholds it holds, and after every switch it holds for
+        # hold_frames frames while the new latency settles. An upgrade that turns out over
+        # budget doubles the wait before the next one. Graphs are leased from the
+        # pose pool. A switch trades the old graph in for the new one in a single step,
+        # so it goes through on a busy node with every slot leased. Tracking restarts
+        # after a switch.
+        # close() waits for a process() call in flight; process() after close() raises.
+        self.target_latency = target_latency
+        self.min_complexity = min_complexity
+        self.max_complexity = max_complexity
+        self.upgrade_margin = upgrade_margin
+        self.hold_frames = hold_frames
+        self.smoothing = smoothing
+        self.pose_params = dict(pose_params or {})
+        self.pool = pool if pool is not None else get_pose_pool()
+        self.clock = clock
+        self.timeout = timeout
+
+        self.cost = cost
+
+        self.complexity = complexity
+        self.pose = self.pool.acquire(timeout=timeout, **dict(self.pose_params, model_complexity=complexity))
+
+        self.latency = None
+        self.frames_since_switch = 0
+        self.upgrade_hold = hold_frames
+        self._upgraded = False
+
+        # Metrics: every switch as a row for st.table, newest last.
+        self.switches = deque(maxlen=max_switches)
+        self.num_switches = 0
+        self._lock = threading.Lock()
+
+        # Held while the graph is in use, so close() never hands it back mid-inference.
+        self._pose_lock = threading.Lock()
+
+
+
+    def process(self, frame):
+        with self._pose_lock:
+            if self.pose is None:
+                raise RuntimeError('AdaptiveComplexityPose used after close()')
+
+            start = self.clock()
+            keypoints = self.pose.process(frame)
+            elapsed = self.clock() - start
+
+            self.latency = elapsed if self.latency is None else (1 - self.smoothing) * self.latency + self.smoothing * elapsed
+            self.frames_since_switch += 1
+
+            if self.frames_since_switch >= self.hold_frames:
+                self._tune()
+
+        return keypoints
+
+
+
+    def predicted_latency(self, complexity):
+        # Latency the given complexity would have under the current load.
+        return self.latency * self.cost[complexity] / self.cost[self.complexity]
+
+
+
+    def _tune(self):
+        # First decision since an upgrade, which shows whether the upgrade fit.
+        settling, self._upgraded = self._upgraded, False
+
+        if self.latency > self.target_latency and self.complexity > self.min_complexity:
+            if settling:
+                self.upgrade_hold = min(2 * self.upgrade_hold, 64 * self.hold_frames)
+
+            self._switch(self.complexity - 1, 'over budget')
+            return
+
+        if settling:
+            self.upgrade_hold = self.hold_frames
+
+        if self.complexity < self.max_complexity and self.frames_since_switch >= self.upgrade_hold \
+                and self.predicted_latency(self.complexity + 1) < self.upgrade_margin * self.target_latency:
+            self._switch(self.complexity + 1, 'headroom')
+
+
+
+    def _switch(self, complexity, reason):
+        try:
+            pose = self.pool.exchange(self.pose, timeout=self.timeout, **dict(self.pose_params, model_complexity=complexity))
+        except Exception:
+            # The old graph went back to the pool; carry on with one like it and try again
+            # after another hold period.
+            self.pose = None
+            self.pose = self.pool.acquire(timeout=self.timeout, **dict(self.pose_params, model_complexity=self.complexity))
+            self.latency = None
+            self.frames_since_switch = 0
+            return
+
+        with self._lock:
+            self.switches.append({
+                'time': time.strftime('%H:%M:%S'),
+                'from': self.complexity,
+                'to': complexity,
+                'latency (ms)': round(self.latency * 1000, 1),
+                'budget (ms)': round(self.target_latency * 1000, 1),
+                'reason': reason
+            })
+            self.num_switches += 1
+
+        self._upgraded = complexity > self.complexity
+        self.complexity = complexity
+        self.pose = pose
+
+        self.latency = None
+        self.frames_since_switch = 0
+
+
+
+    def recent_switches(self, count = 5):
+        # The latest switches, safe to call while another thread runs process().
+        with self._lock:
+            return list(self.switches)[-count:]
+
+
+
+    def stats(self):
+        latency = self.latency
+        return {
+            'model complexity': self.complexity,
+            'latency (ms)': round(latency * 1000, 1) if latency is not None else None,
+            'budget (ms)': round(self.target_latency * 1000, 1),
+            'switches': self.num_switches
+        }
+
+
+
+    def reset(self):
+        with self._pose_lock:
+            if self.pose is not None:
+                self.pose.reset()
+
+
+
+    def close(self):
+        # Hands the current graph back to the pool, once no frame is being processed.
+        with self._pose_lock:
+            if self.pose is not None:
+                self.pool.release(self.pose)
+                self.pose = None
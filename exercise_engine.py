@@ -0,0 +1,819 @@
+import time
+from contextlib import nullcontext
+from types import MappingProxyType
+import cv2
+import numpy as np
+from thresholds import thresholds_key
+from utils import find_joint_angles, get_landmark_matrix, get_landmark_coords, mirror_landmarks, draw_text, draw_dotted_line, NUM_POSE_LANDMARKS
+
+
+# MediaPipe pose landmark ids of the joints exercise specs refer to.
+POSE_LANDMARKS = {
+                   'nose'          : 0,
+                   'left_shoulder' : 11, 'right_shoulder': 12,
+                   'left_elbow'    : 13, 'right_elbow'   : 14,
+                   'left_wrist'    : 15, 'right_wrist'   : 16,
+                   'left_hip'      : 23, 'right_hip'     : 24,
+                   'left_knee'     : 25, 'right_knee'    : 26,
+                   'left_ankle'    : 27, 'right_ankle'   : 28,
+                   'left_foot'     : 31, 'right_foot'    : 32
+                 }
+
+OTHER_SIDE = {'left': 'right', 'right': 'left'}
+
+# Offset angle (p1, p2, ref_pt) between the shoulders seen from the nose: large when the
+# camera faces the subject instead of seeing them from the side.
+OFFSET_TRIPLE = ('left_shoulder', 'right_shoulder', 'nose')
+
+# Joint angles are whole degrees in [0, 180], so per-angle decisions are table lookups.
+NUM_ANGLES = 181
+
+_compiled_specs = {}
+_compiled_profiles = {}
+
+
+
+
+def _landmark_id(joint, side):
+    if joint in POSE_LANDMARKS:
+        return POSE_LANDMARKS[joint]
+
+    if joint.startswith('other_'):
+        return POSE_LANDMARKS[OTHER_SIDE[side] + '_' + joint[len('other_'):]]
+
+    return POSE_LANDMARKS[side + '_' + joint]
+
+
+
+
+def compile_exercise(spec):
+
+    # Resolves a spec from exercise_specs into landmark index arrays, once per exercise.
+    # Only the landmarks the exercise reads are denormalized each frame: 'landmark_ids'
+    # lists them, and every other index here is a column of that gathered array.
+    compiled = _compiled_specs.get(spec['name'])
+    if compiled is not None:
+        return compiled
+
+    sides = ('left', 'right') if isinstance(spec['side'], tuple) else (spec['side'],)
+
+    joint_ids = {}
+    for side in sides:
+        names = list(spec['joints'])
+        for angle in spec['angles'].values():
+            names += angle['points']
+        if isinstance(spec['side'], tuple):
+            names += spec['side']
+        if spec['alignment']:
+            names += OFFSET_TRIPLE
+
+        joint_ids[side] = {name: _landmark_id(name, side) for name in names}
+
+    landmark_ids = np.unique([landmark_id for ids in joint_ids.values() for landmark_id in ids.values()])
+    column = {landmark_id: idx for idx, landmark_id in enumerate(landmark_ids.tolist())}
+
+    def columns(side, *names):
+        return [column[joint_ids[side][name]] for name in names]
+
+    angle_names = tuple(spec['angles'])
+
+    # Offset angle first when the exercise checks camera alignment, then the spec's angles.
+    triples = {}
+    for side in sides:
+        rows = [columns(side, *OFFSET_TRIPLE)] if spec['alignment'] else []
+        rows += [columns(side, *spec['angles'][name]['points']) for name in angle_names]
+        triples[side] = np.array(rows)
+
+    vertical = np.array(([False] if spec['alignment'] else []) + [spec['angles'][name].get('vertical', False) for name in angle_names], dtype=bool)
+
+    arcs, labels = {}, {}
+    for side in sides:
+        arcs[side] = [
+                       (name, columns(side, arc['at'])[0], arc['radius'], arc['direction'], arc.get('guide'))
+                       for name, arc in ((name, spec['angles'][name].get('arc')) for name in angle_names) if arc
+                     ]
+        labels[side] = [
+                         (name, columns(side, label['at'])[0], label['offset'])
+                         for name, label in ((name, spec['angles'][name].get('label')) for name in angle_names) if label
+                       ]
+
+    compiled = {
+        'landmark_ids': landmark_ids,
+        'sides': sides,
+        'angle_names': angle_names,
+        'triples': triples,
+        'vertical': vertical,
+        'side_joints': {side: columns(side, *spec['side']) for side in sides} if len(sides) == 2 else None,
+        'offset_joints': columns(sides[0], *OFFSET_TRIPLE) if spec['alignment'] else None,
+        'joints': {side: columns(side, *spec['joints']) for side in sides},
+        'segments': {side: [columns(side, *segment) for segment in spec['segments']] for side in sides},
+        'arcs': arcs,
+        'labels': labels
+    }
+
+    _compiled_specs[spec['name']] = compiled
+
+    return compiled
+
+
+
+
+def get_threshold(thresholds, path):
+    value = thresholds
+    for key in path:
+        value = value[key]
+
+    return value
+
+
+
+
+
+def _readonly(array):
+    array.setflags(write=False)
+    return array
+
+
+
+
+def compile_profile(spec, thresholds):
+
+    # Resolves a spec's state ranges and feedback rules against one threshold profile into
+    # lookup tables indexed by an integer angle, once per (exercise, thresholds) pair.
+    #   state_table   angle -> state code, an index into state_names (0 is no state)
+    #   state_lut     angle -> state name, the same table as a tuple for per-frame lookups
+    #   rules         chains of (angle, angle_lut, state, seq_count, feedback, hint, incorrect),
+    #                 angle_lut holding the rule's angle condition for every angle
+    # Arrays are read-only and batch code (offline_counter) reads the same tables.
+    key = (spec['name'], thresholds_key(thresholds))
+
+    profile = _compiled_profiles.get(key)
+    if profile is not None:
+        return profile
+
+    angles = np.arange(NUM_ANGLES)
+    state_names = (None, *spec['states'])
+
+    # Filled from the last state back, so the first matching range wins as in a chain of ifs.
+    state_table = np.zeros(NUM_ANGLES, dtype=np.int8)
+    for code in range(len(state_names) - 1, 0, -1):
+        low, high = get_threshold(thresholds, spec['states'][state_names[code]])
+        state_table[(low <= angles) & (angles <= high)] = code
+
+    rule_tables = []
+    rules = []
+    for chain in spec['feedback']:
+        compiled_chain = []
+        chain_tables = []
+
+        for rule in chain:
+            low, high = -np.inf, np.inf
+
+            if 'above' in rule:
+                low = get_threshold(thresholds, rule['above'])
+            if 'below' in rule:
+                high = get_threshold(thresholds, rule['below'])
+            if 'between' in rule:
+                low, high = (get_threshold(thresholds, path) for path in rule['between'])
+
+            angle_table = _readonly((low < angles) & (angles < high))
+            chain_tables.append(angle_table)
+
+            compiled_chain.append((
+                rule.get('angle'),
+                tuple(angle_table.tolist()) if 'angle' in rule else None,
+                rule.get('state'),
+                rule.get('seq_count'),
+                rule.get('feedback'),
+                rule.get('hint', False),
+                rule.get('incorrect', False)
+            ))
+
+        rules.append(tuple(compiled_chain))
+        rule_tables.append(tuple(chain_tables))
+
+    profile = MappingProxyType({
+        'state_names': state_names,
+        'state_table': _readonly(state_table),
+        'state_lut': tuple(state_names[code] for code in state_table.tolist()),
+        'rules': tuple(rules),
+        'rule_tables': tuple(rule_tables)
+    })
+
+    _compiled_profiles[key] = profile
+
+    return profile
+
+
+
+
+class ExerciseProcessor:
+    def __init__(self, spec, thresholds, flip_frame = False, clock = time.perf_counter, profiler = None, frame_mirrored = False, landmark_filter = None):
+
+        # Declarative exercise definition from exercise_specs and its compiled form.
+        self.spec = spec
+        self.compiled = compile_exercise(spec)
+
+        # Set if frame should be flipped or not. Overlays are drawn straight in display
+        # space, at mirrored landmark coordinates, so the pixels are flipped at most once.
+        self.flip_frame = flip_frame
+
+        # Set when frames arrive already mirrored (frame_buffers.FrameBufferPool(mirror=True)).
+        # Landmarks inferred from them are mirrored back before analysis, and the pixels
+        # are only flipped if flip_frame asks for the unmirrored view.
+        self.frame_mirrored = frame_mirrored
+
+        # Optional landmark_filter.OneEuroFilter applied to every frame's landmarks before
+        # analysis, timed by self.clock. Keeps the states of the lite pose model
+        # (model_complexity=0) from jittering. Each processor needs its own filter.
+        self.landmark_filter = landmark_filter
+
+        # Time source for the inactivity timers. Defaults to wall time; offline
+        # analysis passes a utils.MediaClock so timers follow the video instead.
+        self.clock = clock
+
+        # Optional stage_profiler.StageProfiler that times each stage of a frame.
+        self.profiler = profiler
+
+        # self.thresholds
+        self.thresholds = thresholds
+
+        # Font type.
+        self.font = cv2.FONT_HERSHEY_SIMPLEX
+
+        # line type
+        self.linetype = cv2.LINE_AA
+
+        # Colors in BGR format.
+        self.COLORS = {
+                        'blue'       : (0, 127, 255),
+                        'red'        : (255, 50, 50),
+                        'green'      : (0, 255, 127),
+                        'light_green': (100, 233, 127),
+                        'yellow'     : (255, 255, 0),
+                        'magenta'    : (255, 0, 255),
+                        'white'      : (255,255,255),
+                        'cyan'       : (0, 255, 255),
+                        'light_blue' : (102, 204, 255)
+                      }
+
+        # State ranges and feedback rules as lookup tables for these thresholds.
+        self.profile = compile_profile(spec, thresholds)
+        self.state_lut = self.profile['state_lut']
+        self.feedback_rules = self.profile['rules']
+
+        self.alignment = spec['alignment']
+        self.state_angle = spec['state_angle']
+        self.rest_state = spec['rest_state']
+        self.rep_pattern = spec['rep_pattern']
+
+        self.correct_key, self.incorrect_key = spec['counter_keys']
+        self.hint_key = spec['hint']['key'] if spec['hint'] else None
+        self.num_feedback = len(spec['feedback_messages'])
+
+        # Per-frame landmark buffers, reused across frames.
+        self.landmarks = np.zeros((NUM_POSE_LANDMARKS, 4), dtype=np.float32)
+        self.unmirrored_landmarks = np.zeros((NUM_POSE_LANDMARKS, 4), dtype=np.float32)
+        self.landmark_coords = np.zeros((len(self.compiled['landmark_ids']), 2), dtype=np.int64)
+
+
+        # For tracking counters and sharing states in and out of callbacks.
+        self.state_tracker = {
+            'state_seq': [],
+
+            'start_inactive_time': self.clock(),
+            'start_inactive_time_front': self.clock(),
+            'INACTIVE_TIME': 0.0,
+            'INACTIVE_TIME_FRONT': 0.0,
+
+            # One flag and frame count per entry of spec['feedback_messages'].
+            'DISPLAY_TEXT' : np.full((self.num_feedback,), False),
+            'COUNT_FRAMES' : np.zeros((self.num_feedback,), dtype=np.int64),
+
+            'INCORRECT_POSTURE': False,
+
+            'prev_state': None,
+            'curr_state':None,
+
+            self.correct_key: 0,
+            self.incorrect_key: 0
+        }
+
+        if self.hint_key:
+            self.state_tracker[self.hint_key] = False
+
+        self.FEEDBACK_ID_MAP = dict(enumerate(spec['feedback_messages']))
+
+
+
+
+    def _rule_matches(self, rule, angles, state):
+        angle, angle_lut, rule_state, seq_count = rule[:4]
+
+        if rule_state is not None and rule_state != state:
+            return False
+
+        if seq_count is not None and self.state_tracker['state_seq'].count(seq_count[0]) != seq_count[1]:
+            return False
+
+        return angle_lut is None or angle_lut[angles[angle]]
+
+
+
+    def _update_state_sequence(self, state):
+        # The sequence only ever holds a prefix of the rep pattern.
+        seq = self.state_tracker['state_seq']
+        pattern = self.rep_pattern
+
+        if len(seq) < len(pattern) and pattern[len(seq)] == state:
+            seq.append(state)
+
+
+
+    def _reset_counters(self):
+        # Inactivity reset; returns whether the counters were reset.
+        if not self.spec['inactivity_reset']:
+            return False
+
+        self.state_tracker[self.correct_key] = 0
+        self.state_tracker[self.incorrect_key] = 0
+
+        return True
+
+
+
+    def _show_feedback(self, frame, c_frame, dict_maps, hint_disp):
+
+
+        if hint_disp:
+            draw_text(
+                    frame,
+                    self.spec['hint']['text'],
+                    pos=(30, 80),
+                    text_color=(0, 0, 0),
+                    font_scale=0.6,
+                    text_color_bg=(255, 255, 0)
+                )
+
+        for idx in np.where(c_frame)[0]:
+            draw_text(
+                    frame,
+                    dict_maps[idx][0],
+                    pos=(30, dict_maps[idx][1]),
+                    text_color=(255, 255, 230),
+                    font_scale=0.6,
+                    text_color_bg=dict_maps[idx][2]
+                )
+
+        return frame
+
+
+
+    def _lap(self, stage):
+        if self.profiler is not None:
+            self.profiler.lap(stage)
+
+
+
+    def _timed_frame(self):
+        # Times the block as one frame on the profiler, if any. Nested entry points
+        # (process -> process_landmarks) leave the timing to the outermost one.
+        return self.profiler.time_frame() if self.profiler is not None else nullcontext()
+
+
+
+    def process(self, frame: np.array, pose):
+        with self._timed_frame():
+            # Process the image.
+            keypoints = pose.process(frame)
+            self._lap('inference')
+
+            landmarks = None
+            if keypoints.pose_landmarks:
+                landmarks = get_landmark_matrix(keypoints.pose_landmarks.landmark, out=self.landmarks)
+            self._lap('landmarks')
+
+            frame, play_sound = self.process_landmarks(frame, landmarks)
+
+        return frame, play_sound
+
+
+
+    def process_landmarks(self, frame: np.array, landmarks):
+        # landmarks is a (33, 4) array from utils.get_landmark_matrix, or None when no pose was detected.
+        with self._timed_frame():
+            frame_height, frame_width, _ = frame.shape
+
+            result = self.analyze(landmarks, frame_width, frame_height)
+            frame = self.render(frame, result)
+
+        return frame, result['play_sound']
+
+
+
+    def analyze_frame(self, frame: np.array, pose):
+        # Headless counterpart of process(): runs inference and the state machine only.
+        with self._timed_frame():
+            frame_height, frame_width, _ = frame.shape
+
+            keypoints = pose.process(frame)
+            self._lap('inference')
+
+            landmarks = None
+            if keypoints.pose_landmarks:
+                landmarks = get_landmark_matrix(keypoints.pose_landmarks.landmark, out=self.landmarks)
+            self._lap('landmarks')
+
+            result = self.analyze(landmarks, frame_width, frame_height)
+
+        return result
+
+
+
+    def blank_result(self, pose_detected):
+        # analyze() result with nothing filled in but the current counters.
+        result = {
+            'pose_detected': pose_detected,
+            'camera_aligned': None,
+            'offset_angle': None,
+            'coords': None,
+            'side': None,
+            'angles': {},
+            'state': None,
+            'feedback': None,
+            'counters': {
+                          'correct': self.state_tracker[self.correct_key],
+                          'incorrect': self.state_tracker[self.incorrect_key]
+                        },
+            'play_sound': None
+        }
+
+        if self.hint_key:
+            result[self.hint_key.lower()] = False
+
+        return result
+
+
+
+    def pause(self):
+        # Stops the inactivity timers for a frame analysed by another exercise, so time
+        # spent on it does not count as inactivity once this one resumes.
+        now = self.clock()
+        self.state_tracker['start_inactive_time'] = now
+        self.state_tracker['start_inactive_time_front'] = now
+
+
+
+    def check_alignment(self, landmarks, frame_width, frame_height):
+        # analyze()'s camera alignment check on its own, leaving counters and timers as they
+        # are. Returns (camera_aligned, offset_angle, coords); exercises watched from the
+        # front are always aligned. Any landmark_filter is not applied.
+        if not self.alignment:
+            return True, None, None
+
+        if self.frame_mirrored:
+            landmarks = mirror_landmarks(landmarks, out=self.unmirrored_landmarks)
+
+        coords = get_landmark_coords(landmarks[self.compiled['landmark_ids']], frame_width, frame_height, out=self.landmark_coords)
+
+        # The offset angle is the first row of either side's triples.
+        offset_triple = self.compiled['triples'][self.compiled['sides'][0]][:1]
+        offset_angle = int(find_joint_angles(coords, offset_triple, self.compiled['vertical'][:1])[0])
+
+        return offset_angle <= self.thresholds['OFFSET_THRESH'], offset_angle, coords.copy()
+
+
+
+    def analyze(self, landmarks, frame_width, frame_height):
+        # Updates counters and feedback for one frame without touching any pixels. The
+        # returned dict holds everything render() needs to draw the overlay; 'coords' only
+        # holds the landmarks listed in self.compiled['landmark_ids'].
+        play_sound = None
+
+        result = self.blank_result(landmarks is not None)
+
+
+        if landmarks is not None:
+            if self.frame_mirrored:
+                landmarks = mirror_landmarks(landmarks, out=self.unmirrored_landmarks)
+
+            if self.landmark_filter is not None:
+                landmarks = self.landmark_filter(landmarks, self.clock())
+
+            coords = get_landmark_coords(landmarks[self.compiled['landmark_ids']], frame_width, frame_height, out=self.landmark_coords)
+            self._lap('landmarks')
+
+            side_joints = self.compiled['side_joints']
+
+            if side_joints is None:
+                side = self.compiled['sides'][0]
+
+            else:
+                # The side whose pair of side joints lies further apart vertically faces the camera.
+                left_a, left_b = side_joints['left']
+                right_a, right_b = side_joints['right']
+
+                side = 'left' if abs(coords[left_a][1] - coords[left_b][1]) > abs(coords[right_a][1] - coords[right_b][1]) else 'right'
+
+            angles = find_joint_angles(coords, self.compiled['triples'][side], self.compiled['vertical']).tolist()
+            self._lap('angles')
+
+            if self.alignment:
+                offset_angle = angles.pop(0)
+                result['offset_angle'] = offset_angle
+
+            joint_angles = dict(zip(self.compiled['angle_names'], angles))
+            result['coords'] = coords.copy()
+
+            if self.alignment and offset_angle > self.thresholds['OFFSET_THRESH']:
+
+                end_time = self.clock()
+                self.state_tracker['INACTIVE_TIME_FRONT'] += end_time - self.state_tracker['start_inactive_time_front']
+                self.state_tracker['start_inactive_time_front'] = end_time
+
+                if self.state_tracker['INACTIVE_TIME_FRONT'] >= self.thresholds['INACTIVE_THRESH'] and self._reset_counters():
+                    play_sound = 'reset_counters'
+                    self.state_tracker['INACTIVE_TIME_FRONT'] = 0.0
+                    self.state_tracker['start_inactive_time_front'] = self.clock()
+
+                # Reset inactive times for side view.
+                self.state_tracker['start_inactive_time'] = self.clock()
+                self.state_tracker['INACTIVE_TIME'] = 0.0
+                self.state_tracker['prev_state'] =  None
+                self.state_tracker['curr_state'] = None
+
+                result['camera_aligned'] = False
+
+            # Camera is aligned properly, or the exercise is watched from the front.
+            else:
+
+                self.state_tracker['INACTIVE_TIME_FRONT'] = 0.0
+                self.state_tracker['start_inactive_time_front'] = self.clock()
+
+                current_state = self.state_lut[joint_angles[self.state_angle]]
+                self.state_tracker['curr_state'] = current_state
+                self._update_state_sequence(current_state)
+
+
+
+                # -------------------------------------- COMPUTE COUNTERS --------------------------------------
+
+                if current_state == self.rest_state:
+
+                    if len(self.state_tracker['state_seq']) == len(self.rep_pattern) and not self.state_tracker['INCORRECT_POSTURE']:
+                        self.state_tracker[self.correct_key]+=1
+                        play_sound = str(self.state_tracker[self.correct_key])
+
+                    elif len(self.state_tracker['state_seq'])==1:
+                        self.state_tracker[self.incorrect_key]+=1
+                        play_sound = 'incorrect'
+
+                    elif self.state_tracker['INCORRECT_POSTURE']:
+                        self.state_tracker[self.incorrect_key]+=1
+                        play_sound = 'incorrect'
+
+
+                    self.state_tracker['state_seq'] = []
+                    self.state_tracker['INCORRECT_POSTURE'] = False
+
+
+                # ----------------------------------------------------------------------------------------------------
+
+
+
+
+                # -------------------------------------- PERFORM FEEDBACK ACTIONS --------------------------------------
+
+                else:
+                    for chain in self.feedback_rules:
+                        for rule in chain:
+                            if self._rule_matches(rule, joint_angles, current_state):
+                                feedback_id, hint, incorrect = rule[4:]
+
+                                if feedback_id is not None:
+                                    self.state_tracker['DISPLAY_TEXT'][feedback_id] = True
+                                if hint:
+                                    self.state_tracker[self.hint_key] = True
+                                if incorrect:
+                                    self.state_tracker['INCORRECT_POSTURE'] = True
+
+                                break
+
+
+                # ----------------------------------------------------------------------------------------------------
+
+
+
+
+                # ----------------------------------- COMPUTE INACTIVITY ---------------------------------------------
+
+                if self.state_tracker['curr_state'] == self.state_tracker['prev_state']:
+
+                    end_time = self.clock()
+                    self.state_tracker['INACTIVE_TIME'] += end_time - self.state_tracker['start_inactive_time']
+                    self.state_tracker['start_inactive_time'] = end_time
+
+                    if self.state_tracker['INACTIVE_TIME'] >= self.thresholds['INACTIVE_THRESH'] and self._reset_counters():
+                        play_sound = 'reset_counters'
+                        self.state_tracker['start_inactive_time'] = self.clock()
+                        self.state_tracker['INACTIVE_TIME'] = 0.0
+
+
+                else:
+
+                    self.state_tracker['start_inactive_time'] = self.clock()
+                    self.state_tracker['INACTIVE_TIME'] = 0.0
+
+                # -------------------------------------------------------------------------------------------------------
+
+
+                # The hint only applies to the first phase of a rep.
+                if self.hint_key and (len(self.state_tracker['state_seq']) >= 2 or current_state == self.rest_state):
+                    self.state_tracker[self.hint_key] = False
+
+                self.state_tracker['COUNT_FRAMES'][self.state_tracker['DISPLAY_TEXT']]+=1
+
+                # Feedback shown this frame, captured before expired messages are cleared below.
+                result['feedback'] = self.state_tracker['COUNT_FRAMES'] > 0
+                if self.hint_key:
+                    result[self.hint_key.lower()] = self.state_tracker[self.hint_key]
+
+
+                self.state_tracker['DISPLAY_TEXT'][self.state_tracker['COUNT_FRAMES'] > self.thresholds['CNT_FRAME_THRESH']] = False
+                self.state_tracker['COUNT_FRAMES'][self.state_tracker['COUNT_FRAMES'] > self.thresholds['CNT_FRAME_THRESH']] = 0
+                self.state_tracker['prev_state'] = current_state
+
+                result['camera_aligned'] = True
+                result['side'] = side
+                result['angles'] = joint_angles
+                result['state'] = current_state
+
+
+
+
+        else:
+
+            if self.landmark_filter is not None:
+                self.landmark_filter.reset()
+
+            end_time = self.clock()
+            self.state_tracker['INACTIVE_TIME'] += end_time - self.state_tracker['start_inactive_time']
+            self.state_tracker['start_inactive_time'] = end_time
+
+            if self.state_tracker['INACTIVE_TIME'] >= self.thresholds['INACTIVE_THRESH'] and self._reset_counters():
+                play_sound = 'reset_counters'
+                self.state_tracker['start_inactive_time'] = self.clock()
+                self.state_tracker['INACTIVE_TIME'] = 0.0
+
+
+            # Reset all other state variables
+
+            self.state_tracker['prev_state'] =  None
+            self.state_tracker['curr_state'] = None
+            self.state_tracker['INACTIVE_TIME_FRONT'] = 0.0
+            self.state_tracker['INCORRECT_POSTURE'] = False
+            self.state_tracker['DISPLAY_TEXT'] = np.full((self.num_feedback,), False)
+            self.state_tracker['COUNT_FRAMES'] = np.zeros((self.num_feedback,), dtype=np.int64)
+            self.state_tracker['start_inactive_time_front'] = self.clock()
+
+
+        result['counters'] = {
+                               'correct': self.state_tracker[self.correct_key],
+                               'incorrect': self.state_tracker[self.incorrect_key]
+                             }
+        result['play_sound'] = play_sound
+
+        self._lap('state')
+
+        return result
+
+
+
+    def render(self, frame: np.array, result):
+        # Draws the overlay for a result returned by analyze(), in place.
+        frame_height, frame_width, _ = frame.shape
+
+        if self.flip_frame != self.frame_mirrored:
+            # In place, unless OpenCV cannot write to the frame's memory as it is laid out,
+            # e.g. the RGB channels of an RGBA array.
+            if frame.flags.c_contiguous:
+                cv2.flip(frame, 1, dst=frame)
+            else:
+                frame = cv2.flip(frame, 1)
+            self._lap('flip')
+
+        coords = result['coords']
+        if coords is not None and self.flip_frame:
+            coords = self._display_coords(coords, frame_width)
+
+        if result['pose_detected'] and not result['camera_aligned']:
+            left_shoulder, right_shoulder, nose = self.compiled['offset_joints']
+
+            cv2.circle(frame, coords[nose], 7, self.COLORS['white'], -1)
+            cv2.circle(frame, coords[left_shoulder], 7, self.COLORS['yellow'], -1)
+            cv2.circle(frame, coords[right_shoulder], 7, self.COLORS['magenta'], -1)
+
+            self._draw_counters(frame, result['counters'])
+
+            draw_text(
+                frame,
+                'CAMERA NOT ALIGNED PROPERLY!!!',
+                pos=(30, frame_height-60),
+                text_color=(255, 255, 230),
+                font_scale=0.65,
+                text_color_bg=(255, 153, 0),
+            )
+
+
+            draw_text(
+                frame,
+                'OFFSET ANGLE: '+str(result['offset_angle']),
+                pos=(30, frame_height-30),
+                text_color=(255, 255, 230),
+                font_scale=0.65,
+                text_color_bg=(255, 153, 0),
+            )
+
+
+        elif result['pose_detected']:
+            side = result['side']
+            angles = result['angles']
+
+            # Arcs sweep the other way round in a mirrored view.
+            multiplier = -1 if side == 'left' else 1
+            if self.flip_frame:
+                multiplier = -multiplier
+
+
+            # ------------------- Angle arcs --------------
+
+            for name, joint, radius, direction, guide in self.compiled['arcs'][side]:
+                cv2.ellipse(frame, coords[joint], (radius, radius),
+                            angle = 0, startAngle = -90, endAngle = -90+direction*multiplier*angles[name],
+                            color = self.COLORS['white'], thickness = 3, lineType = self.linetype)
+
+                if guide:
+                    draw_dotted_line(frame, coords[joint], start=coords[joint][1]-guide[0], end=coords[joint][1]+guide[1], line_color=self.COLORS['blue'])
+
+            # ------------------------------------------------------------
+
+
+            # Join landmarks.
+            for start, end in self.compiled['segments'][side]:
+                cv2.line(frame, coords[start], coords[end], self.COLORS['light_blue'], 4, lineType=self.linetype)
+
+            # Plot landmark points
+            for joint in self.compiled['joints'][side]:
+                cv2.circle(frame, coords[joint], 7, self.COLORS['yellow'], -1,  lineType=self.linetype)
+
+
+            frame = self._show_feedback(frame, result['feedback'], self.FEEDBACK_ID_MAP, self.hint_key and result[self.hint_key.lower()])
+
+
+            for name, joint, (offset_x, offset_y) in self.compiled['labels'][side]:
+                cv2.putText(frame, str(int(angles[name])), (coords[joint][0] + offset_x, coords[joint][1] + offset_y), self.font, 0.6, self.COLORS['light_green'], 2, lineType=self.linetype)
+
+            self._draw_counters(frame, result['counters'])
+
+
+        else:
+            self._draw_counters(frame, result['counters'])
+
+        self._lap('draw')
+
+        return frame
+
+
+
+    def _display_coords(self, coords, frame_width):
+        # Landmark pixel coordinates as they appear in the horizontally flipped frame.
+        coords = coords.copy()
+        coords[:, 0] = frame_width - 1 - coords[:, 0]
+
+        return coords
+
+
+
+    def _draw_counters(self, frame, counters):
+
+        draw_text(
+            frame,
+            "CORRECT: " + str(counters['correct']),
+            pos=(int(frame.shape[1]*0.68), 30),
+            text_color=(255, 255, 230),
+            font_scale=0.7,
+            text_color_bg=(18, 185, 0)
+        )
+
+
+        draw_text(
+            frame,
+            "INCORRECT: " + str(counters['incorrect']),
+            pos=(int(frame.shape[1]*0.68), 80),
+            text_color=(255, 255, 230),
+            font_scale=0.7,
+            text_color_bg=(221, 0, 0),
+
+        )
+
+        return frame
@@ -0,0 +1,256 @@
+# Declarative exercise definitions, compiled and run by exercise_engine.ExerciseProcessor.
+#
+# Joint names are side-relative ('knee' is the left or the right knee, whichever side is
+# analysed, 'other_shoulder' the shoulder of the opposite side); 'nose', 'left_shoulder'
+# and the like name a fixed landmark. Thresholds are referenced by their path in the
+# profiles returned by thresholds.get_thresholds('beginner' / 'pro'), e.g.
+# ('KNEE_THRESH', 2) or ('HIP_KNEE_VERT', 'PASS', 1), so one spec serves both modes.
+#
+#   joints            landmarks that are drawn, in drawing order
+#   segments          pairs of joints joined by a line
+#   alignment         check the shoulder/nose offset angle against OFFSET_THRESH (side views)
+#   side              'left' / 'right', or a pair of joints: the side on which they lie
+#                     further apart vertically is analysed
+#   angles            name -> points (p1, p2, ref_pt); 'vertical' measures p1 against the
+#                     vertical through ref_pt; optional 'arc' and 'label' drawing hints
+#   state_angle       angle whose value selects the state
+#   states            state -> threshold path of an inclusive (low, high) range, in priority order
+#   rest_state        state in which a rep is scored and the sequence restarts
+#   rep_pattern       states a complete rep passes through, in order
+#   feedback          if/elif chains of rules, checked on every frame outside the rest state;
+#                     a rule matches 'angle' against 'above' / 'below' / 'between' (strict)
+#                     and optionally 'state' and 'seq_count' (state, count in the sequence),
+#                     then shows 'feedback' (an index into feedback_messages), sets the
+#                     'hint' and/or marks the rep 'incorrect'
+#   feedback_messages (text, y position, background color) of each feedback id
+#   hint              state_tracker key and text of the hint shown while a rep starts
+#   counter_keys      state_tracker keys of the correct and incorrect rep counters
+#   inactivity_reset  reset the counters after INACTIVE_THRESH seconds without progress
+
+
+SQUAT = {
+    'name': 'squat',
+    'joints': ('shoulder', 'hip', 'knee', 'ankle', 'foot'),
+    'segments': (('shoulder', 'hip'), ('knee', 'hip'), ('ankle', 'knee'), ('ankle', 'foot')),
+    'alignment': True,
+    'side': ('foot', 'shoulder'),
+    'angles': {
+        'hip_vertical': {
+            'points': ('shoulder', 'hip', 'hip'),
+            'vertical': True,
+            'arc': {'at': 'hip', 'radius': 30, 'direction': 1, 'guide': (80, 20)},
+            'label': {'at': 'hip', 'offset': (10, 0)}
+        },
+        'knee_vertical': {
+            'points': ('hip', 'knee', 'knee'),
+            'vertical': True,
+            'arc': {'at': 'knee', 'radius': 20, 'direction': -1, 'guide': (50, 20)},
+            'label': {'at': 'knee', 'offset': (15, 10)}
+        },
+        'ankle_vertical': {
+            'points': ('knee', 'ankle', 'ankle'),
+            'vertical': True,
+            'arc': {'at': 'ankle', 'radius': 30, 'direction': 1, 'guide': (50, 20)},
+            'label': {'at': 'ankle', 'offset': (10, 0)}
+        }
+    },
+    'state_angle': 'knee_vertical',
+    'states': {
+        's1': ('HIP_KNEE_VERT', 'NORMAL'),
+        's2': ('HIP_KNEE_VERT', 'TRANS'),
+        's3': ('HIP_KNEE_VERT', 'PASS')
+    },
+    'rest_state': 's1',
+    'rep_pattern': ('s2', 's3', 's2'),
+    'feedback': (
+        (
+            {'angle': 'hip_vertical', 'above': ('HIP_THRESH', 1), 'feedback': 0},
+            {'angle': 'hip_vertical', 'below': ('HIP_THRESH', 0), 'seq_count': ('s2', 1), 'feedback': 1}
+        ),
+        (
+            {'angle': 'knee_vertical', 'between': (('KNEE_THRESH', 0), ('KNEE_THRESH', 1)), 'seq_count': ('s2', 1), 'hint': True},
+            {'angle': 'knee_vertical', 'above': ('KNEE_THRESH', 2), 'feedback': 3, 'incorrect': True}
+        ),
+        (
+            {'angle': 'ankle_vertical', 'above': ('ANKLE_THRESH',), 'feedback': 2, 'incorrect': True},
+        )
+    ),
+    'feedback_messages': (
+        ('BEND BACKWARDS', 215, (0, 153, 255)),
+        ('BEND FORWARD', 215, (0, 153, 255)),
+        ('KNEE FALLING OVER TOE', 170, (255, 80, 80)),
+        ('SQUAT TOO DEEP', 125, (255, 80, 80))
+    ),
+    'hint': {'key': 'LOWER_HIPS', 'text': 'LOWER YOUR HIPS'},
+    'counter_keys': ('SQUAT_COUNT', 'IMPROPER_SQUAT'),
+    'inactivity_reset': True
+}
+
+
+BICEP_CURL = {
+    'name': 'bicep_curl',
+    'joints': ('shoulder', 'elbow', 'wrist'),
+    'segments': (('shoulder', 'elbow'), ('wrist', 'elbow')),
+    'alignment': True,
+    # The arm on the side facing the camera, where shoulder and hip lie further apart.
+    'side': ('shoulder', 'hip'),
+    'angles': {
+        'elbow': {
+            'points': ('shoulder', 'elbow', 'wrist'),
+            'label': {'at': 'elbow', 'offset': (15, 0)}
+        }
+    },
+    'state_angle': 'elbow',
+    'states': {
+        'e1': ('ELBOW_BICEP_CURL', 'NORMAL'),
+        'e2': ('ELBOW_BICEP_CURL', 'PASS')
+    },
+    'rest_state': 'e1',
+    'rep_pattern': ('e2', 'e1'),
+    'feedback': (
+        (
+            {'angle': 'elbow', 'above': ('ELBOW_THRESH', 1), 'feedback': 0},
+            {'angle': 'elbow', 'below': ('ELBOW_THRESH', 0), 'seq_count': ('e2', 1), 'feedback': 1}
+        ),
+        (
+            {'angle': 'elbow', 'between': (('ELBOW_THRESH', 2), ('ELBOW_THRESH', 3)), 'hint': True},
+            {'angle': 'elbow', 'above': ('ELBOW_THRESH', 4), 'feedback': 2, 'incorrect': True}
+        )
+    ),
+    'feedback_messages': (
+        ('LOWER YOUR ARMS', 215, (0, 153, 255)),
+        ('BEND YOUR ELBOWS', 170, (255, 80, 80)),
+        ('STRAIGHTEN YOUR ARMS', 125, (255, 80, 80))
+    ),
+    'hint': {'key': 'LOWER_ARMS', 'text': 'LOWER YOUR ARMS'},
+    'counter_keys': ('BICEP_CURL_COUNT', 'INCORRECT_BICEP_CURL'),
+    'inactivity_reset': True
+}
+
+
+SHOULDER_PRESS = {
+    'name': 'shoulder_press',
+    'joints': ('shoulder', 'elbow', 'wrist'),
+    'segments': (('shoulder', 'elbow'), ('elbow', 'wrist')),
+    'alignment': False,
+    'side': 'left',
+    'angles': {
+        # Upper arm against the shoulder line, seen from the opposite shoulder (front view).
+        'shoulder': {
+            'points': ('shoulder', 'elbow', 'other_shoulder'),
+            'arc': {'at': 'shoulder', 'radius': 30, 'direction': -1}
+        }
+    },
+    'state_angle': 'shoulder',
+    'states': {
+        's1': ('SHOULDER_PRESS_STATES', 'DOWN'),
+        's2': ('SHOULDER_PRESS_STATES', 'UP')
+    },
+    'rest_state': 's1',
+    'rep_pattern': ('s2', 's1'),
+    'feedback': (
+        (
+            {'state': 's2', 'feedback': 1},
+        ),
+    ),
+    'feedback_messages': (
+        ('RAISE YOUR ARMS HIGHER', 215, (0, 153, 255)),
+        ('LOWER YOUR ARMS', 170, (255, 80, 80))
+    ),
+    'hint': None,
+    'counter_keys': ('SHOULDER_PRESS_COUNT', 'IMPROPER_PRESS'),
+    'inactivity_reset': False
+}
+
+
+PUSHUP = {
+    'name': 'pushup',
+    'joints': ('shoulder', 'elbow', 'wrist', 'hip', 'ankle'),
+    'segments': (('shoulder', 'elbow'), ('wrist', 'elbow'), ('shoulder', 'hip'), ('hip', 'ankle')),
+    'alignment': True,
+    'side': ('shoulder', 'wrist'),
+    'angles': {
+        'elbow': {
+            'points': ('shoulder', 'wrist', 'elbow'),
+            'label': {'at': 'elbow', 'offset': (15, 0)}
+        },
+        # Straight body line from shoulder over hip to ankle is 180 degrees.
+        'hip': {
+            'points': ('shoulder', 'ankle', 'hip'),
+            'label': {'at': 'hip', 'offset': (10, 0)}
+        }
+    },
+    'state_angle': 'elbow',
+    'states': {
+        's1': ('PUSHUP_ELBOW', 'NORMAL'),
+        's2': ('PUSHUP_ELBOW', 'TRANS'),
+        's3': ('PUSHUP_ELBOW', 'PASS')
+    },
+    'rest_state': 's1',
+    'rep_pattern': ('s2', 's3', 's2'),
+    'feedback': (
+        (
+            {'angle': 'hip', 'below': ('PUSHUP_HIP_THRESH',), 'feedback': 0, 'incorrect': True},
+        ),
+        (
+            {'angle': 'elbow', 'between': (('PUSHUP_ELBOW', 'PASS', 1), ('PUSHUP_ELBOW', 'TRANS', 1)), 'seq_count': ('s2', 1), 'hint': True},
+            {'angle': 'elbow', 'below': ('PUSHUP_ELBOW', 'PASS', 0), 'feedback': 1}
+        )
+    ),
+    'feedback_messages': (
+        ('KEEP YOUR BODY STRAIGHT', 215, (255, 80, 80)),
+        ('PUSHUP TOO DEEP', 170, (0, 153, 255))
+    ),
+    'hint': {'key': 'LOWER_CHEST', 'text': 'LOWER YOUR CHEST'},
+    'counter_keys': ('PUSHUP_COUNT', 'IMPROPER_PUSHUP'),
+    'inactivity_reset': True
+}
+
+
+TRICEP_EXTENSION = {
+    'name': 'tricep_extension',
+    'joints': ('shoulder', 'elbow', 'wrist', 'hip'),
+    'segments': (('hip', 'shoulder'), ('shoulder', 'elbow'), ('wrist', 'elbow')),
+    'alignment': True,
+    'side': ('shoulder', 'hip'),
+    'angles': {
+        'elbow': {
+            'points': ('shoulder', 'wrist', 'elbow'),
+            'label': {'at': 'elbow', 'offset': (15, 0)}
+        },
+        # Upper arm against the vertical above the shoulder; stays small overhead.
+        'upper_arm_vertical': {
+            'points': ('elbow', 'shoulder', 'shoulder'),
+            'vertical': True,
+            'arc': {'at': 'shoulder', 'radius': 30, 'direction': 1, 'guide': (80, 20)},
+            'label': {'at': 'shoulder', 'offset': (10, 0)}
+        }
+    },
+    'state_angle': 'elbow',
+    'states': {
+        's1': ('TRICEP_ELBOW', 'NORMAL'),
+        's2': ('TRICEP_ELBOW', 'TRANS'),
+        's3': ('TRICEP_ELBOW', 'PASS')
+    },
+    'rest_state': 's1',
+    'rep_pattern': ('s2', 's3', 's2'),
+    'feedback': (
+        (
+            {'angle': 'upper_arm_vertical', 'above': ('TRICEP_UPPER_ARM_THRESH',), 'feedback': 0, 'incorrect': True},
+        ),
+        (
+            {'angle': 'elbow', 'between': (('TRICEP_ELBOW', 'PASS', 1), ('TRICEP_ELBOW', 'TRANS', 1)), 'seq_count': ('s2', 1), 'hint': True},
+            {'angle': 'elbow', 'below': ('TRICEP_ELBOW', 'PASS', 0), 'feedback': 1}
+        )
+    ),
+    'feedback_messages': (
+        ('KEEP YOUR ELBOWS UP', 215, (255, 80, 80)),
+        ('WEIGHT TOO LOW', 170, (0, 153, 255))
+    ),
+    'hint': {'key': 'LOWER_WEIGHT', 'text': 'LOWER THE WEIGHT'},
+    'counter_keys': ('TRICEP_EXTENSION_COUNT', 'IMPROPER_TRICEP_EXTENSION'),
+    'inactivity_reset': True
+}
+
+
+EXERCISE_SPECS = {spec['name']: spec for spec in (SQUAT, BICEP_CURL, SHOULDER_PRESS, PUSHUP, TRICEP_EXTENSION)}
@@ -0,0 +1,127 @@
+import threading
+import weakref
+from collections import deque
+
+import av
+import cv2
+import numpy as np
+
+
+class FrameBufferPool:
+    def __init__(self, max_buffers = 6, mirror = False):
+
+        # Reusable RGB buffers for the live stream's frame callback. A decoded PyAV frame
+        # is converted straight into a free buffer, the processor draws on it in place,
+        # and the same memory is handed back to PyAV without a copy. Each buffer is lent
+        # out as an array of its own, and is free again once that array is garbage
+        # collected, i.e. once the callback, the encoder and the recorder have all
+        # dropped it and the VideoFrame wrapping it. With max_buffers all still in
+        # flight, frames fall back to a fresh array.
+        # With mirror set, frames come out horizontally flipped (a selfie view) at no extra
+        # cost, since the flip is folded into gathering the planes; processors are then
+        # created with frame_mirrored=True.
+        self.max_buffers = max_buffers
+        self.mirror = mirror
+
+        self._free = []
+        self._returned = deque()
+        self._num_buffers = 0
+        self._yuv = None
+        self._lock = threading.Lock()
+
+        self.allocated_buffers = 0
+        self.unpooled_frames = 0
+
+
+
+    def acquire(self, height, width):
+        # A free (height, width, 3) uint8 buffer, or None when the pool is exhausted. Keep
+        # the returned array itself for as long as the pixels are in use: views taken
+        # from it do not hold the buffer.
+        with self._lock:
+            while self._returned:
+                self._free.append(self._returned.popleft())
+
+            # Free buffers of another frame size are dropped (the camera resolution changed).
+            free = [buffer for buffer in self._free if buffer.shape[:2] == (height, width)]
+            self._num_buffers -= len(self._free) - len(free)
+            self._free = free
+
+            if self._free:
+                buffer = self._free.pop()
+            elif self._num_buffers < self.max_buffers:
+                buffer = np.empty((height, width, 3), dtype=np.uint8)
+                self._num_buffers += 1
+                self.allocated_buffers += 1
+            else:
+                return None
+
+        lent = buffer[...]
+        weakref.finalize(lent, self._returned.append, buffer)
+
+        return lent
+
+
+
+    def free_buffers(self):
+        # Buffers ready to be lent out again.
+        with self._lock:
+            return len(self._free) + len(self._returned)
+
+
+
+    def to_ndarray(self, frame: av.VideoFrame):
+        # RGB array of a decoded frame, like frame.to_ndarray(format='rgb24') but written
+        # into a pooled buffer. WebRTC video arrives as yuv420p, which is converted with
+        # OpenCV from the planes directly; any other format goes through PyAV.
+        height, width = frame.height, frame.width
+
+        rgb = None
+        if frame.format.name == 'yuv420p' and not height % 2 and not width % 2:
+            rgb = self.acquire(height, width)
+
+        if rgb is None:
+            self.unpooled_frames += 1
+            rgb = frame.to_ndarray(format='rgb24')
+            if self.mirror:
+                cv2.flip(rgb, 1, dst=rgb)
+
+            return rgb
+
+        with self._lock:
+            # Planes are padded to their line size, so they are gathered into one
+            # contiguous I420 image first.
+            if self._yuv is None or self._yuv.shape != (height * 3 // 2, width):
+                self._yuv = np.empty((height * 3 // 2, width), dtype=np.uint8)
+            yuv = self._yuv
+
+            y_plane, u_plane, v_plane = (_plane_view(plane, self.mirror) for plane in frame.planes)
+            flat = yuv.reshape(-1)
+            luma_size, chroma_size = height * width, height * width // 4
+
+            yuv[:height] = y_plane
+            flat[luma_size:luma_size + chroma_size].reshape(height // 2, width // 2)[:] = u_plane
+            flat[luma_size + chroma_size:].reshape(height // 2, width // 2)[:] = v_plane
+
+            cv2.cvtColor(yuv, cv2.COLOR_YUV2RGB_I420, dst=rgb)
+
+        return rgb
+
+
+
+    def to_video_frame(self, rgb: np.array):
+        # Wraps an RGB array in a VideoFrame without copying it where the layout allows.
+        if rgb.flags.c_contiguous:
+            return av.VideoFrame.from_numpy_buffer(rgb, format='rgb24')
+
+        return av.VideoFrame.from_ndarray(rgb, format='rgb24')
+
+
+
+
+def _plane_view(plane, mirror = False):
+    # (height, width) view of a plane's pixels, without its line padding, optionally
+    # with its columns reversed.
+    view = np.frombuffer(plane, dtype=np.uint8).reshape(plane.height, plane.line_size)[:, :plane.width]
+
+    return view[:, ::-1] if mirror else view
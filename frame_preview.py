@@ -0,0 +1,125 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class FramePreview:
+    def __init__(self, publish, max_fps = 5.0, max_width = 480, quality = 75, clock = time.perf_counter):
+
+        # Live preview of a frame stream for a slow consumer, such as a Streamlit image
+        # placeholder. At most max_fps frames are passed on. Each one is downscaled to
+        # max_width on the caller's thread (a cheap resize that also serves as the copy),
+        # then JPEG-encoded and handed to publish(jpeg_bytes) on a background thread.
+        # A frame offered while the previous one is still being published is dropped, so
+        # the caller never waits on the browser.
+        self.publish = publish
+        self.max_fps = max_fps
+        self.max_width = max_width
+        self.quality = quality
+        self.clock = clock
+
+        self._cond = threading.Condition()
+        self._pending = None
+        self._busy = False
+        self._closed = False
+        self._next_time = None
+        self._errors = []
+
+        self.published_frames = 0
+        self.dropped_frames = 0
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+
+
+    def __enter__(self):
+        self.start()
+        return self
+
+
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._shutdown()
+
+
+
+    def start(self):
+        self.thread.start()
+
+
+
+    def offer(self, frame: np.array):
+        # Offers an RGB frame for preview; returns whether it was taken.
+        now = self.clock()
+        if self._next_time is not None and now < self._next_time:
+            return False
+
+        with self._cond:
+            if self._busy or self._pending is not None:
+                self.dropped_frames += 1
+                return False
+
+        frame_height, frame_width, _ = frame.shape
+        if frame_width > self.max_width:
+            preview_size = (self.max_width, round(frame_height * self.max_width / frame_width))
+            frame = cv2.resize(frame, preview_size, interpolation=cv2.INTER_AREA)
+        else:
+            frame = np.copy(frame)
+
+        with self._cond:
+            self._pending = frame
+            self._cond.notify()
+
+        self._next_time = now + 1.0 / self.max_fps
+
+        return True
+
+
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+
+                if self._pending is None:
+                    return
+
+                frame = self._pending
+                self._pending = None
+                self._busy = True
+
+            try:
+                ok, jpeg = cv2.imencode('.jpg', cv2.cvtColor(frame, cv2.COLOR_RGB2BGR), [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+                if ok:
+                    self.publish(jpeg.tobytes())
+                    self.published_frames += 1
+            except Exception as e:
+                self._errors.append(e)
+
+            with self._cond:
+                self._busy = False
+
+
+
+    def close(self):
+        # Publishes the frame still waiting, if any, and stops the background thread.
+        self._shutdown()
+
+        if self._errors:
+            raise self._errors[0]
+
+
+
+    def _shutdown(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+        if self.thread.is_alive():
+            self.thread.join()
@@ -0,0 +1,99 @@
+import math
+import time
+
+import numpy as np
+
+from utils import get_landmark_matrix, NUM_POSE_LANDMARKS
+
+
+class AdaptiveFrameSkipper:
+    def __init__(self, pose, target_latency = 1.0 / 30, max_interval = 4, smoothing = 0.2):
+
+        # Runs pose inference on every N-th frame only, with N chosen from the measured
+        # inference latency against the per-frame budget, and extrapolates landmarks for
+        # the frames in between so the processor's state machine and overlay keep moving.
+        self.pose = pose
+
+        # Per-frame time budget in seconds.
+        self.target_latency = target_latency
+
+        # Upper bound on N. At 30 fps, 4 still samples the pose at 7.5 Hz, well above
+        # the rate at which a squat or curl changes state.
+        self.max_interval = max_interval
+
+        # Weight of the newest sample in the latency moving average.
+        self.smoothing = smoothing
+
+        self.interval = 1
+        self.latency = None
+
+        self.frame_idx = 0
+        self.last_inference_idx = None
+
+        # The two most recent inferred landmark sets and the frames they belong to.
+        self.prev_landmarks = None
+        self.prev_idx = None
+        self.curr_landmarks = None
+
+        self.landmarks = np.zeros((NUM_POSE_LANDMARKS, 4), dtype=np.float32)
+
+
+
+    def process(self, frame):
+        # Returns a (33, 4) landmark array for this frame, or None when no pose is tracked.
+        frame_idx = self.frame_idx
+        self.frame_idx += 1
+
+        if self.last_inference_idx is None or frame_idx - self.last_inference_idx >= self.interval:
+            return self._infer(frame, frame_idx)
+
+        return self._extrapolate(frame_idx)
+
+
+
+    def _infer(self, frame, frame_idx):
+        start = time.perf_counter()
+        keypoints = self.pose.process(frame)
+        elapsed = time.perf_counter() - start
+
+        self.latency = elapsed if self.latency is None else (1 - self.smoothing) * self.latency + self.smoothing * elapsed
+        self.interval = min(self.max_interval, max(1, math.ceil(self.latency / self.target_latency)))
+
+        if keypoints.pose_landmarks:
+            landmarks = get_landmark_matrix(keypoints.pose_landmarks.landmark)
+        else:
+            landmarks = None
+
+        # Only extrapolate between consecutive detections.
+        if landmarks is not None and self.curr_landmarks is not None:
+            self.prev_landmarks = self.curr_landmarks
+            self.prev_idx = self.last_inference_idx
+        else:
+            self.prev_landmarks = None
+            self.prev_idx = None
+
+        self.curr_landmarks = landmarks
+        self.last_inference_idx = frame_idx
+
+        return landmarks
+
+
+
+    def _extrapolate(self, frame_idx):
+        if self.curr_landmarks is None:
+            return None
+
+        if self.prev_landmarks is None:
+            return self.curr_landmarks
+
+        # Linear motion model on x, y, z from the last two inferences; visibility is held.
+        step = (frame_idx - self.last_inference_idx) / (self.last_inference_idx - self.prev_idx)
+
+        self.landmarks[:] = self.curr_landmarks
+        self.landmarks[:, :3] += step * (self.curr_landmarks[:, :3] - self.prev_landmarks[:, :3])
+
+        # Fast motion near an edge must not carry landmarks off the frame.
+        np.clip(self.landmarks[:, :2], 0.0, 1.0, out=self.landmarks[:, :2])
+        np.clip(self.landmarks[:, 3], 0.0, 1.0, out=self.landmarks[:, 3])
+
+        return self.landmarks
@@ -0,0 +1,133 @@
+import threading
+
+import numpy as np
+
+from utils import get_landmark_matrix
+
+
+class InferenceWorker:
+    def __init__(self, pose):
+
+        # Runs pose inference on a background thread. Only the newest submitted frame
+        # is kept: a frame still waiting when a newer one arrives is dropped.
+        self.pose = pose
+
+        self._cond = threading.Condition()
+        self._pending = None
+        self._result = (None, None)
+        self._next_id = 0
+        self._closed = False
+        self._error = None
+
+        self.dropped_frames = 0
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+
+
+    def submit(self, frame):
+        # Copy, since the caller goes on to draw on its frame while inference reads this one.
+        frame = np.copy(frame)
+
+        with self._cond:
+            if self._pending is not None:
+                self.dropped_frames += 1
+
+            self._pending = (self._next_id, frame)
+            self._next_id += 1
+            self._cond.notify()
+
+
+
+    def latest(self):
+        # (frame_id, landmarks) of the most recent inference. landmarks is a (33, 4)
+        # array or None when no pose was detected; frame_id is None before the first result.
+        # An exception raised by inference since the last call is re-raised here, once.
+        with self._cond:
+            error, self._error = self._error, None
+            if error is not None:
+                raise error
+
+            return self._result
+
+
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+
+                if self._closed:
+                    return
+
+                frame_id, frame = self._pending
+                self._pending = None
+
+            # A failed frame must not stop the thread, or the stream would freeze on its
+            # last result.
+            try:
+                keypoints = self.pose.process(frame)
+            except Exception as e:
+                with self._cond:
+                    self._error = e
+                continue
+
+            landmarks = None
+            if keypoints.pose_landmarks:
+                landmarks = get_landmark_matrix(keypoints.pose_landmarks.landmark)
+
+            with self._cond:
+                self._result = (frame_id, landmarks)
+
+
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+        self._thread.join()
+
+
+
+
+class AsyncFrameProcessor:
+    def __init__(self, processor, pose = None, worker = None):
+
+        # Drives an exercise processor from an InferenceWorker so the frame callback
+        # never waits on MediaPipe. Each frame is drawn with the newest available
+        # landmarks; the state machine advances once per new inference result.
+        # Instead of a pose, any object with the worker's submit()/latest()/close()
+        # can be given, e.g. a stream_scheduler.ScheduledStream.
+        self.processor = processor
+        self.worker = worker if worker is not None else InferenceWorker(pose)
+
+        self._last_id = None
+        self._last_result = None
+
+
+
+    def process(self, frame):
+        frame_height, frame_width, _ = frame.shape
+
+        self.worker.submit(frame)
+        result_id, landmarks = self.worker.latest()
+
+        play_sound = None
+
+        if result_id is not None and result_id != self._last_id:
+            self._last_id = result_id
+            self._last_result = self.processor.analyze(landmarks, frame_width, frame_height)
+            play_sound = self._last_result['play_sound']
+
+        if self._last_result is None:
+            return frame, None
+
+        return self.processor.render(frame, self._last_result), play_sound
+
+
+
+    def close(self):
+        self.worker.close()
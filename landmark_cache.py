@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from utils import get_pose_params
+
+
+# Bump when the stored landmark layout changes so stale entries are never read back.
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'formmaster_landmark_cache')
+
+
+class LandmarkCache:
+    def __init__(self, cache_dir = DEFAULT_CACHE_DIR, max_bytes = 512 * 1024 * 1024):
+
+        # Per-frame landmark tracks ((N, 33, 4) float32, NaN rows where no pose was
+        # detected) stored as .npy files, evicted least recently used first once the
+        # directory grows past max_bytes.
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+
+
+    def key(self, video_path, pose_params = None, chunk_size = 1024 * 1024):
+
+        # Hash of the video content plus every parameter that affects inference,
+        # with get_mediapipe_pose defaults filled in.
+        params = get_pose_params(**(pose_params or {}))
+
+        digest = hashlib.sha256()
+        digest.update(json.dumps({'version': CACHE_VERSION, 'pose': params}, sort_keys=True).encode())
+
+        with open(video_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+
+        return digest.hexdigest()
+
+
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + '.npy')
+
+
+
+    def get(self, key):
+        path = self._path(key)
+
+        try:
+            landmarks = np.load(path)
+        except (OSError, ValueError):
+            return None
+
+        # Mark as recently used.
+        os.utime(path)
+
+        return landmarks
+
+
+
+    def put(self, key, landmarks):
+        path = self._path(key)
+
+        # Write to a temporary file first so concurrent readers never see a partial entry.
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, np.asarray(landmarks, dtype=np.float32))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+        self._evict(keep=path)
+
+
+
+    def _evict(self, keep = None):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.npy'):
+                continue
+
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+
+        # Oldest first; the entry just written goes last so it survives whenever it fits.
+        entries.sort(key=lambda e: (e[2] == keep, e[0]))
+
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+            total -= size
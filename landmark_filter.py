@@ -0,0 +1,70 @@
+import math
+
+import numpy as np
+
+from utils import NUM_POSE_LANDMARKS
+
+
+class OneEuroFilter:
+    def __init__(self, min_cutoff = 1.0, beta = 1.0, d_cutoff = 1.0, max_gap = 0.5):
+
+        # One Euro adaptive low-pass filter (Casiez et al., CHI 2012) over the x, y, z
+        # columns of a (33, 4) landmark array, all landmarks at once. Slow landmarks are
+        # smoothed with a cutoff near min_cutoff Hz, which removes the frame-to-frame
+        # jitter of the lite pose model. Fast ones get a cutoff that rises by beta Hz per
+        # normalized frame width per second of speed, so reps are not delayed.
+        # Visibility passes through unchanged. The filter starts over when a pose is lost
+        # or the timestamps jump by more than max_gap seconds.
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.max_gap = max_gap
+
+        self.filtered = np.zeros((NUM_POSE_LANDMARKS, 4), dtype=np.float32)
+        self._derivative = np.zeros((NUM_POSE_LANDMARKS, 3), dtype=np.float32)
+        self._timestamp = None
+
+
+
+    def reset(self):
+        self._timestamp = None
+
+
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+
+
+    def __call__(self, landmarks, timestamp):
+        # Filtered copy of landmarks; the returned array is reused on the next call.
+        dt = None if self._timestamp is None else timestamp - self._timestamp
+
+        if dt is None or dt > self.max_gap:
+            self.filtered[:] = landmarks
+            self._derivative[:] = 0.0
+            self._timestamp = timestamp
+
+            return self.filtered
+
+        # A repeated timestamp has nothing new to filter against.
+        if dt <= 0:
+            return self.filtered
+
+        self._timestamp = timestamp
+
+        values = landmarks[:, :3]
+        previous = self.filtered[:, :3]
+
+        derivative = (values - previous) / dt
+        self._derivative += self._alpha(self.d_cutoff, dt) * (derivative - self._derivative)
+
+        cutoff = self.min_cutoff + self.beta * np.abs(self._derivative)
+        alpha = 1.0 / (1.0 + 1.0 / (2 * np.pi * cutoff * dt))
+
+        previous += alpha * (values - previous)
+        self.filtered[:, 3] = landmarks[:, 3]
+
+        return self.filtered
@@ -0,0 +1,277 @@
+import argparse
+import functools
+import json
+import os
+import time
+
+import numpy as np
+
+from utils import get_landmark_matrix, mirror_landmarks, NUM_POSE_LANDMARKS
+
+
+# A trace is a directory holding:
+#   landmarks.bin   (N, 33, 4) x, y, z, visibility rows in meta['dtype'], NaN rows where no pose was detected
+#   timestamps.bin  (N,) float64 seconds since the first frame
+#   meta.json       format version, dtype, frame size and whatever the recorder adds;
+#                   'mirrored' is set when the landmarks come from horizontally flipped frames
+# Both .bin files are raw little-endian arrays, so they can be opened with np.memmap directly.
+TRACE_VERSION = 1
+
+LANDMARKS_FILE = 'landmarks.bin'
+TIMESTAMPS_FILE = 'timestamps.bin'
+META_FILE = 'meta.json'
+
+
+class LandmarkTraceWriter:
+    def __init__(self, path, dtype = 'float16', frame_size = None, meta = None, clock = time.perf_counter):
+
+        # Appends frames to the trace at path as they arrive. float16 keeps normalized
+        # coordinates to within about a pixel of a 1080p frame at half the size of float32.
+        self.path = path
+        self.dtype = np.dtype(dtype).newbyteorder('<')
+        self.frame_size = frame_size
+        self.meta = dict(meta or {})
+        self.clock = clock
+
+        self.num_frames = 0
+        self._start = None
+        self._landmarks_file = None
+        self._timestamps_file = None
+
+        self._missing = np.full((NUM_POSE_LANDMARKS, 4), np.nan, dtype=self.dtype)
+
+
+
+    def _open(self):
+        os.makedirs(self.path, exist_ok=True)
+
+        self._landmarks_file = open(os.path.join(self.path, LANDMARKS_FILE), 'wb')
+        self._timestamps_file = open(os.path.join(self.path, TIMESTAMPS_FILE), 'wb')
+
+        self.meta['started_at'] = time.time()
+        self._write_meta()
+
+
+
+    def append(self, landmarks, timestamp = None):
+        # landmarks is a (33, 4) array or None when no pose was detected. Without a timestamp
+        # the writer's clock is used, relative to the first frame.
+        if self._landmarks_file is None:
+            self._open()
+
+        if timestamp is None:
+            now = self.clock()
+            if self._start is None:
+                self._start = now
+            timestamp = now - self._start
+
+        if landmarks is None:
+            self._landmarks_file.write(self._missing.tobytes())
+        else:
+            self._landmarks_file.write(np.asarray(landmarks, dtype=self.dtype).tobytes())
+
+        self._timestamps_file.write(np.array(timestamp, dtype='<f8').tobytes())
+        self.num_frames += 1
+
+
+
+    def _write_meta(self):
+        meta = dict(self.meta)
+        meta.update({
+            'version': TRACE_VERSION,
+            'dtype': self.dtype.name,
+            'num_frames': self.num_frames,
+            'num_landmarks': NUM_POSE_LANDMARKS,
+            'fields': ['x', 'y', 'z', 'visibility'],
+            'frame_size': list(self.frame_size) if self.frame_size else None
+        })
+
+        tmp_path = os.path.join(self.path, META_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.path, META_FILE))
+
+
+
+    def close(self):
+        if self._landmarks_file is None:
+            return
+
+        self._landmarks_file.close()
+        self._timestamps_file.close()
+        self._landmarks_file = None
+        self._timestamps_file = None
+
+        self._write_meta()
+
+
+
+    def __enter__(self):
+        return self
+
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+
+
+class LandmarkTrace:
+    def __init__(self, path):
+
+        # Read-only view of a trace. Nothing is loaded up front: landmarks and timestamps
+        # are memory-mapped, and frames are read from disk as they are indexed.
+        self.path = path
+
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+
+        if self.meta.get('version') != TRACE_VERSION:
+            raise ValueError(f"unsupported landmark trace version {self.meta.get('version')} in {path}")
+
+        dtype = np.dtype(self.meta['dtype']).newbyteorder('<')
+        row_size = NUM_POSE_LANDMARKS * 4 * dtype.itemsize
+
+        # Count frames from the file itself, so a trace whose recorder never closed it
+        # (a crashed session) is still readable up to its last complete frame.
+        num_frames = min(os.path.getsize(os.path.join(path, LANDMARKS_FILE)) // row_size,
+                         os.path.getsize(os.path.join(path, TIMESTAMPS_FILE)) // 8)
+
+        if num_frames:
+            self.landmarks = np.memmap(os.path.join(path, LANDMARKS_FILE), dtype=dtype, mode='r', shape=(num_frames, NUM_POSE_LANDMARKS, 4))
+            self.timestamps = np.memmap(os.path.join(path, TIMESTAMPS_FILE), dtype='<f8', mode='r', shape=(num_frames,))
+        else:
+            self.landmarks = np.empty((0, NUM_POSE_LANDMARKS, 4), dtype=dtype)
+            self.timestamps = np.empty((0,), dtype='<f8')
+
+
+
+    def __len__(self):
+        return len(self.timestamps)
+
+
+
+    def __getitem__(self, frame_idx):
+        # (33, 4) float32 landmarks of one frame, or None where no pose was detected.
+        row = self.landmarks[frame_idx]
+        if np.isnan(row[0, 0]):
+            return None
+
+        return np.asarray(row, dtype=np.float32)
+
+
+
+
+class TraceRecordingPose:
+    def __init__(self, pose, writer):
+
+        # Wraps a MediaPipe Pose (or ROIPose) and appends the landmarks of every frame it
+        # processes to a LandmarkTraceWriter. Results pass through unchanged.
+        self.pose = pose
+        self.writer = writer
+
+
+
+    def process(self, frame):
+        keypoints = self.pose.process(frame)
+
+        if self.writer.frame_size is None:
+            self.writer.frame_size = (frame.shape[1], frame.shape[0])
+
+        landmarks = None
+        if keypoints.pose_landmarks:
+            landmarks = get_landmark_matrix(keypoints.pose_landmarks.landmark)
+
+        self.writer.append(landmarks)
+
+        return keypoints
+
+
+
+    def close(self):
+        self.pose.close()
+
+
+
+
+class TraceClock:
+    # Processor clock that reports the timestamp of the trace frame being replayed.
+    def __init__(self):
+        self.timestamp = 0.0
+
+    def __call__(self):
+        return self.timestamp
+
+
+
+
+def replay_trace(trace, processor_cls, thresholds, frame_size = None, **processor_kwargs):
+
+    # Drives a processor's state logic (analyze()) over a trace, without MediaPipe or any
+    # video, and yields the result dict of every frame. Inactivity timers follow the
+    # recorded timestamps.
+    if frame_size is None:
+        frame_size = trace.meta.get('frame_size') or (640, 480)
+    frame_width, frame_height = frame_size
+
+    processor_kwargs.setdefault('frame_mirrored', trace.meta.get('mirrored', False))
+
+    clock = TraceClock()
+    processor = processor_cls(thresholds, clock=clock, **processor_kwargs)
+
+    for frame_idx in range(len(trace)):
+        clock.timestamp = float(trace.timestamps[frame_idx])
+        yield processor.analyze(trace[frame_idx], frame_width, frame_height)
+
+
+
+
+def main(argv = None):
+    from thresholds import get_thresholds
+    from exercise_engine import ExerciseProcessor
+    from exercise_specs import EXERCISE_SPECS
+
+    processors = {name: functools.partial(ExerciseProcessor, spec) for name, spec in EXERCISE_SPECS.items()}
+
+    parser = argparse.ArgumentParser(description='Replay a landmark trace through an exercise processor.')
+    parser.add_argument('trace')
+    parser.add_argument('--exercise', choices=list(processors), default='squat')
+    parser.add_argument('--mode', choices=['beginner', 'pro'], default='beginner')
+    parser.add_argument('--counts-only', action='store_true', help='Squats only: count reps with the vectorized offline counter.')
+    parser.add_argument('--filter', action='store_true', help='Smooth landmarks with a One Euro filter, as with the lite pose model.')
+    args = parser.parse_args(argv)
+
+    trace = LandmarkTrace(args.trace)
+    thresholds = get_thresholds(args.mode)
+
+    if args.counts_only:
+        from offline_counter import count_squat_reps
+
+        if args.exercise != 'squat':
+            parser.error('--counts-only is only available for squats')
+        if args.filter:
+            parser.error('--counts-only does not support --filter')
+
+        landmarks = mirror_landmarks(trace.landmarks) if trace.meta.get('mirrored') else trace.landmarks
+        result = count_squat_reps(landmarks, thresholds, trace.meta.get('frame_size') or (640, 480), timestamps=trace.timestamps)
+        print('counters:', result['counters'])
+        return
+
+    landmark_filter = None
+    if args.filter:
+        from landmark_filter import OneEuroFilter
+        landmark_filter = OneEuroFilter()
+
+    result = None
+    for frame_idx, result in enumerate(replay_trace(trace, processors[args.exercise], thresholds, landmark_filter=landmark_filter)):
+        if result['play_sound']:
+            print(f"{trace.timestamps[frame_idx]:9.3f}s  frame {frame_idx:6d}  {result['play_sound']}")
+
+    if result is not None:
+        print('counters:', result['counters'])
+
+
+
+if __name__ == '__main__':
+    main()
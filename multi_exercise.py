@@ -0,0 +1,242 @@
+import time
+from contextlib import nullcontext
+import numpy as np
+from exercise_engine import ExerciseProcessor, get_threshold
+from exercise_specs import SQUAT, BICEP_CURL, SHOULDER_PRESS
+from utils import get_landmark_matrix, NUM_POSE_LANDMARKS
+
+
+# Exercises analysed side by side in multi-exercise mode.
+MULTI_EXERCISE_SPECS = (SQUAT, BICEP_CURL, SHOULDER_PRESS)
+
+
+
+
+class ExerciseClassifier:
+    def __init__(self, specs, thresholds, window = 45, min_excursion = 0.3, hold_frames = 15):
+
+        # Guesses the exercise being performed from how far each exercise's state angle
+        # moved over the last `window` frames, relative to the span of its state ranges.
+        # Side-view exercises only count on frames with the camera aligned, front-view
+        # ones (no alignment check) only on frames the side-view analyzers reject.
+        # An exercise is only picked once it moved at least min_excursion of its span, and
+        # a new pick has to lead for hold_frames consecutive frames before it is reported.
+        self.names = [spec['name'] for spec in specs]
+        self.state_angles = [spec['state_angle'] for spec in specs]
+        self.side_view = [spec['alignment'] for spec in specs]
+        self.min_excursion = min_excursion
+        self.hold_frames = hold_frames
+
+        spans = []
+        for spec in specs:
+            ranges = [get_threshold(thresholds, path) for path in spec['states'].values()]
+            spans.append(max(high for _, high in ranges) - min(low for low, _ in ranges))
+        self.spans = np.array(spans, dtype=np.float64)
+
+        # Ring buffer of state angles, NaN where an analyzer had no angle (no pose, misaligned).
+        self.history = np.full((window, len(specs)), np.nan)
+        self.num_frames = 0
+
+        self.current = None
+        self._candidate = None
+        self._candidate_frames = 0
+
+
+
+    def update(self, results):
+        # results maps exercise name -> ExerciseProcessor.analyze() result of the same frame.
+        aligned = [results[name]['camera_aligned'] for name, side_view in zip(self.names, self.side_view) if side_view]
+        front_view = not aligned or aligned[0] is False
+
+        row = self.history[self.num_frames % len(self.history)]
+        for idx, (name, angle_name, side_view) in enumerate(zip(self.names, self.state_angles, self.side_view)):
+            row[idx] = results[name]['angles'].get(angle_name, np.nan) if side_view or front_view else np.nan
+        self.num_frames += 1
+
+        filled = ~np.isnan(self.history)
+        if not filled.any():
+            return self.current
+
+        high = np.where(filled, self.history, -np.inf).max(axis=0)
+        low = np.where(filled, self.history, np.inf).min(axis=0)
+        excursion = np.where(filled.any(axis=0), high - low, 0.0) / self.spans
+
+        leader = int(np.argmax(excursion))
+        if excursion[leader] < self.min_excursion:
+            self._candidate, self._candidate_frames = None, 0
+            return self.current
+
+        if self.names[leader] == self._candidate:
+            self._candidate_frames += 1
+        else:
+            self._candidate, self._candidate_frames = self.names[leader], 1
+
+        if self._candidate_frames >= self.hold_frames or self.current is None:
+            self.current = self._candidate
+
+        return self.current
+
+
+
+
+class MultiExerciseProcessor:
+    def __init__(self, thresholds, specs = MULTI_EXERCISE_SPECS, flip_frame = False, clock = time.perf_counter, profiler = None, auto_select = False, frame_mirrored = False, landmark_filter = None):
+
+        # One analyzer per exercise, all fed from the same landmarks, so pose inference
+        # runs once per frame however many exercises are tracked. Every analyzer keeps
+        # its own counters; only the active exercise is drawn and plays sounds.
+        self.processors = {
+                            spec['name']: ExerciseProcessor(spec, thresholds, flip_frame=flip_frame, clock=clock, profiler=profiler, frame_mirrored=frame_mirrored)
+                            for spec in specs
+                          }
+
+        self.flip_frame = flip_frame
+        self.frame_mirrored = frame_mirrored
+        self.clock = clock
+
+        # Optional landmark_filter.OneEuroFilter, run once per frame for all analyzers.
+        self.landmark_filter = landmark_filter
+        self.profiler = profiler
+
+        # Exercise whose overlay is shown, set by the caller or by the classifier.
+        self.active = specs[0]['name']
+        self.auto_select = auto_select
+        self.classifier = ExerciseClassifier(specs, thresholds)
+
+        # Analyzer whose alignment check tells side-view frames from front-view ones.
+        self.view_gate = next((self.processors[spec['name']] for spec in specs if spec['alignment']), None)
+
+        self.landmarks = np.zeros((NUM_POSE_LANDMARKS, 4), dtype=np.float32)
+
+
+
+    def set_profiler(self, profiler):
+        self.profiler = profiler
+        for processor in self.processors.values():
+            processor.profiler = profiler
+
+
+
+    def _lap(self, stage):
+        if self.profiler is not None:
+            self.profiler.lap(stage)
+
+
+
+    def _timed_frame(self):
+        # Times the block as one frame on the profiler, if any. Nested entry points
+        # (process -> process_landmarks) leave the timing to the outermost one.
+        return self.profiler.time_frame() if self.profiler is not None else nullcontext()
+
+
+
+    def process(self, frame: np.array, pose):
+        with self._timed_frame():
+            # Process the image, once for all exercises.
+            keypoints = pose.process(frame)
+            self._lap('inference')
+
+            landmarks = None
+            if keypoints.pose_landmarks:
+                landmarks = get_landmark_matrix(keypoints.pose_landmarks.landmark, out=self.landmarks)
+            self._lap('landmarks')
+
+            frame, play_sound = self.process_landmarks(frame, landmarks)
+
+        return frame, play_sound
+
+
+
+    def process_landmarks(self, frame: np.array, landmarks):
+        with self._timed_frame():
+            frame_height, frame_width, _ = frame.shape
+
+            result = self.analyze(landmarks, frame_width, frame_height)
+            frame = self.render(frame, result)
+
+        return frame, result['play_sound']
+
+
+
+    def analyze_frame(self, frame: np.array, pose):
+        with self._timed_frame():
+            frame_height, frame_width, _ = frame.shape
+
+            keypoints = pose.process(frame)
+            self._lap('inference')
+
+            landmarks = None
+            if keypoints.pose_landmarks:
+                landmarks = get_landmark_matrix(keypoints.pose_landmarks.landmark, out=self.landmarks)
+            self._lap('landmarks')
+
+            result = self.analyze(landmarks, frame_width, frame_height)
+
+        return result
+
+
+
+    def analyze(self, landmarks, frame_width, frame_height):
+        # The active exercise's result, plus 'exercise' and every analyzer's result in 'results'.
+        # Filtering is per coordinate, so mirrored landmarks can be filtered as they are.
+        if self.landmark_filter is not None:
+            if landmarks is None:
+                self.landmark_filter.reset()
+            else:
+                landmarks = self.landmark_filter(landmarks, self.clock())
+
+        # Each frame only advances the analyzers of its view, so a front-view exercise does
+        # not count reps during a side-view one or the reverse. The first side-view analyzer
+        # decides the view, as in ExerciseClassifier.update.
+        front_view = None
+        if landmarks is not None and self.view_gate is not None:
+            front_view = not self.view_gate.check_alignment(landmarks, frame_width, frame_height)[0]
+
+        results = {}
+        for name, processor in self.processors.items():
+            if front_view is None or front_view != processor.alignment:
+                results[name] = processor.analyze(landmarks, frame_width, frame_height)
+            else:
+                results[name] = self._paused_result(processor, landmarks, frame_width, frame_height)
+
+        if self.auto_select:
+            self.active = self.classifier.update(results) or self.active
+
+        result = dict(results[self.active])
+        result['exercise'] = self.active
+        result['results'] = results
+
+        return result
+
+
+
+    def _paused_result(self, processor, landmarks, frame_width, frame_height):
+        # Result of an analyzer sitting out a frame of the other view. A side-view exercise
+        # shows the misaligned camera, a front-view one just its counters.
+        processor.pause()
+
+        if not processor.alignment:
+            return processor.blank_result(False)
+
+        _, offset_angle, coords = processor.check_alignment(landmarks, frame_width, frame_height)
+
+        result = processor.blank_result(True)
+        result['camera_aligned'] = False
+        result['offset_angle'] = offset_angle
+        result['coords'] = coords
+
+        return result
+
+
+
+    def render(self, frame: np.array, result):
+        return self.processors[result['exercise']].render(frame, result)
+
+
+
+    def counters(self):
+        # Rep counters of every exercise, active or not.
+        return {
+                 name: {'correct': processor.state_tracker[processor.correct_key], 'incorrect': processor.state_tracker[processor.incorrect_key]}
+                 for name, processor in self.processors.items()
+               }
@@ -0,0 +1,256 @@
+import numpy as np
+
+from exercise_engine import compile_exercise, compile_profile
+from exercise_specs import SQUAT
+from utils import find_angles
+
+
+# Per-frame categories of the streaming squat state machine.
+NO_POSE, MISALIGNED, ALIGNED = 0, 1, 2
+
+# Squat states as integer codes; 0 is the streaming processor's None.
+STATE_NAMES = (None, 's1', 's2', 's3')
+
+# Landmarks, angle triples and side joints come from the same compiled spec the streaming
+# processor runs on; every index below is a column of the LANDMARK_IDS gathered array.
+_COMPILED = compile_exercise(SQUAT)
+LANDMARK_IDS = _COMPILED['landmark_ids']
+
+# Angle triples (p1, p2, ref_pt) that the counters depend on: the offset angle, then the
+# knee and ankle vertical angles of the left or the right side. The hip angle only drives
+# on-screen feedback and is not computed.
+COUNTER_ANGLES = ('knee_vertical', 'ankle_vertical')
+_ANGLE_ROWS = [0] + [1 + _COMPILED['angle_names'].index(name) for name in COUNTER_ANGLES]
+LEFT_TRIPLES = _COMPILED['triples']['left'][_ANGLE_ROWS]
+RIGHT_TRIPLES = _COMPILED['triples']['right'][_ANGLE_ROWS]
+VERTICAL_ANGLES = _COMPILED['vertical'][_ANGLE_ROWS]
+
+# Columns of the (foot, shoulder) pair that picks the side, per side.
+LEFT_SIDE_JOINTS = _COMPILED['side_joints']['left']
+RIGHT_SIDE_JOINTS = _COMPILED['side_joints']['right']
+
+
+
+
+def squat_angles(landmark_coords, left_side):
+    # (F, 3) integer offset, knee and ankle angles for (F, len(LANDMARK_IDS), 2) pixel
+    # coordinates, each frame on its own side, computed exactly as utils.find_joint_angles
+    # does for a single frame.
+    triples = np.where(left_side[:, None, None], LEFT_TRIPLES, RIGHT_TRIPLES)
+    frames = np.arange(len(landmark_coords))[:, None]
+
+    p1 = landmark_coords[frames, triples[..., 0]].reshape(-1, 2)
+    p2 = landmark_coords[frames, triples[..., 1]]
+    ref_pt = landmark_coords[frames, triples[..., 2]].reshape(-1, 2)
+
+    p2[:, VERTICAL_ANGLES, 1] = 0
+
+    return find_angles(p1, p2.reshape(-1, 2), ref_pt).reshape(len(landmark_coords), len(VERTICAL_ANGLES))
+
+
+
+def state_table(thresholds):
+    # Lookup table from an integer knee angle (0-180) to its squat state code, shared with
+    # the streaming processor through exercise_engine.compile_profile.
+    return compile_profile(SQUAT, thresholds)['state_table']
+
+
+
+def posture_fault_table(thresholds, angles):
+
+    # Frames where a squat feedback rule marks the rep incorrect, from the same per-angle
+    # tables the streaming processor uses. angles maps the spec's angle names to (F,)
+    # integer angles. Rules are read without their elif chains: in SQUAT no incorrect
+    # rule overlaps an earlier rule of its chain.
+    profile = compile_profile(SQUAT, thresholds)
+    fault = np.zeros(len(next(iter(angles.values()))), dtype=bool)
+
+    for chain, tables in zip(SQUAT['feedback'], profile['rule_tables']):
+        for rule, table in zip(chain, tables):
+            if rule.get('incorrect'):
+                fault |= table[angles[rule['angle']]]
+
+    return fault
+
+
+
+def _last_true_index(mask):
+    # For every frame, the index of the latest frame at or before it where mask is set, else -1.
+    return np.maximum.accumulate(np.where(mask, np.arange(len(mask)), -1))
+
+
+
+def _inactivity_triggers(timestamps, accumulating, start_time, threshold, tolerance = 1e-6):
+
+    # Frames where an inactivity timer of the streaming processor reaches threshold. The
+    # timer sums the time between consecutive accumulating frames and restarts on every
+    # other frame and on every trigger. Elapsed time is first estimated for all frames at
+    # once; only stretches that come within tolerance of the threshold are re-summed
+    # frame by frame, in the processor's own order, so floating point rounding matches.
+    num_frames = len(timestamps)
+    triggers = np.zeros(num_frames, dtype=bool)
+
+    anchor = _last_true_index(~accumulating)
+    anchor_time = np.where(anchor >= 0, timestamps[np.maximum(anchor, 0)], start_time)
+
+    candidates = accumulating & (timestamps - anchor_time >= threshold - tolerance)
+
+    for stretch_anchor in np.unique(anchor[candidates]):
+        first = stretch_anchor + 1
+        last = first
+        while last < num_frames and accumulating[last]:
+            last += 1
+
+        prev_time = timestamps[stretch_anchor] if stretch_anchor >= 0 else start_time
+        elapsed = np.cumsum(np.diff(np.concatenate(([prev_time], timestamps[first:last]))))
+
+        while True:
+            hits = np.flatnonzero(elapsed >= threshold)
+            if not len(hits):
+                break
+
+            hit = first + hits[0]
+            triggers[hit] = True
+
+            first = hit + 1
+            elapsed = np.cumsum(np.diff(timestamps[hit:last]))
+
+    return triggers
+
+
+
+
+def count_squat_reps(landmarks, thresholds, frame_size, timestamps = None, fps = 30.0, start_time = None):
+
+    # Offline counterpart of feeding every frame through process_frame.ProcessFrame:
+    # landmarks is an (F, 33, 2) or (F, 33, 4) array of normalized landmarks with NaN rows
+    # where no pose was detected, timestamps the (F,) frame times in seconds (frame_idx / fps
+    # when omitted, as utils.MediaClock reports them). start_time is the clock reading when
+    # the processor was created; it defaults to the first timestamp.
+    #
+    # Returns the final counters, the per-frame counters and states, and the frames where
+    # correct reps, incorrect reps and inactivity resets happened.
+    landmarks = np.asarray(landmarks)
+    num_frames = landmarks.shape[0]
+    frame_width, frame_height = frame_size
+
+    if not num_frames:
+        no_frames = np.zeros(0, dtype=np.int64)
+        return {
+            'counters': {'correct': 0, 'incorrect': 0},
+            'correct_per_frame': no_frames,
+            'incorrect_per_frame': no_frames,
+            'states': no_frames,
+            'correct_frames': no_frames,
+            'incorrect_frames': no_frames,
+            'reset_frames': no_frames
+        }
+
+    if timestamps is None:
+        timestamps = np.arange(num_frames) / fps
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+
+    if start_time is None:
+        start_time = timestamps[0]
+
+    # ---------------------------------- ANGLES AND STATES -------------------------------------
+
+    detected = ~np.isnan(landmarks[:, 0, 0])
+
+    # Denormalized in float64 from float32, as utils.get_landmark_coords does.
+    xy = landmarks[:, LANDMARK_IDS, :2].astype(np.float32)
+    xy[~detected] = 0
+    coords = np.multiply(xy, (frame_width, frame_height), dtype=np.float64).astype(np.int64)
+
+    foot_l, shoulder_l = LEFT_SIDE_JOINTS
+    foot_r, shoulder_r = RIGHT_SIDE_JOINTS
+    dist_left = np.abs(coords[:, foot_l, 1] - coords[:, shoulder_l, 1])
+    dist_right = np.abs(coords[:, foot_r, 1] - coords[:, shoulder_r, 1])
+
+    offset_angle, knee_angle, ankle_angle = squat_angles(coords, dist_left > dist_right).T
+
+    category = np.where(~detected, NO_POSE, np.where(offset_angle > thresholds['OFFSET_THRESH'], MISALIGNED, ALIGNED))
+    aligned = category == ALIGNED
+
+    state = np.where(aligned, state_table(thresholds)[np.clip(knee_angle, 0, 180)], 0)
+    s1 = aligned & (state == 1)
+
+    # --------------------------------- STATE SEQUENCE LEVEL -----------------------------------
+
+    # The streaming state_seq only ever grows along s2, s3, s2 and is cleared on s1, so its
+    # length is the number of alternating s2/s3 runs since the last s1, not counting a
+    # leading s3 run, capped at 3. Other frames never change it.
+    seq_idx = np.flatnonzero(aligned & (state > 0))
+    seq_state = state[seq_idx]
+
+    seq_s1 = seq_state == 1
+    segment = np.cumsum(seq_s1) - seq_s1
+
+    run_start = np.ones(len(seq_state), dtype=bool)
+    run_start[1:] = seq_state[1:] != seq_state[:-1]
+
+    segment_start = np.ones(len(seq_state), dtype=bool)
+    segment_start[1:] = seq_s1[:-1]
+
+    num_segments = int(seq_s1.sum()) + 1
+    runs = np.bincount(segment[~seq_s1], weights=run_start[~seq_s1], minlength=num_segments)
+    leading_s3 = np.bincount(segment[~seq_s1 & segment_start & (seq_state == 3)], minlength=num_segments)
+    level = np.clip(runs - leading_s3, 0, 3).astype(np.int64)
+
+    s1_level = np.zeros(num_frames, dtype=np.int64)
+    s1_level[seq_idx[seq_s1]] = level[segment[seq_s1]]
+
+    # ----------------------------------- INCORRECT POSTURE ------------------------------------
+
+    # Set by non-s1 aligned frames with the knee or ankle past its limit; cleared after every
+    # s1 frame and on every frame without a pose.
+    posture_fault = aligned & ~s1 & posture_fault_table(thresholds, dict(zip(COUNTER_ANGLES, (knee_angle, ankle_angle))))
+    fault_count = np.cumsum(posture_fault)
+
+    cleared = s1 | (category == NO_POSE)
+    last_cleared = np.concatenate(([-1], _last_true_index(cleared)[:-1]))
+    faults_since_clear = fault_count - np.where(last_cleared >= 0, fault_count[np.maximum(last_cleared, 0)], 0)
+    incorrect_posture = faults_since_clear > 0
+
+    # -------------------------------------- REP EVENTS ----------------------------------------
+
+    correct = s1 & (s1_level == 3) & ~incorrect_posture
+    incorrect = s1 & ((s1_level == 1) | incorrect_posture)
+
+    # ------------------------------------- INACTIVITY -----------------------------------------
+
+    # Side-view timer: runs over frames without a pose and over aligned frames whose state
+    # repeats the previous aligned frame's; restarts on anything else.
+    prev_state = np.zeros(num_frames, dtype=state.dtype)
+    prev_state[1:] = np.where(aligned[:-1], state[:-1], 0)
+    side_accumulating = (category == NO_POSE) | (aligned & (state == prev_state))
+
+    # Front-view timer: runs over consecutive misaligned frames.
+    front_accumulating = category == MISALIGNED
+
+    resets = _inactivity_triggers(timestamps, side_accumulating, start_time, thresholds['INACTIVE_THRESH']) | \
+             _inactivity_triggers(timestamps, front_accumulating, start_time, thresholds['INACTIVE_THRESH'])
+
+    # ---------------------------------------- COUNTERS ----------------------------------------
+
+    # A reset clears the counters after that frame's rep has been counted.
+    correct_total = np.cumsum(correct)
+    incorrect_total = np.cumsum(incorrect)
+
+    last_reset = _last_true_index(resets)
+    has_reset = last_reset >= 0
+    correct_per_frame = correct_total - np.where(has_reset, correct_total[np.maximum(last_reset, 0)], 0)
+    incorrect_per_frame = incorrect_total - np.where(has_reset, incorrect_total[np.maximum(last_reset, 0)], 0)
+
+    return {
+        'counters': {
+            'correct': int(correct_per_frame[-1]),
+            'incorrect': int(incorrect_per_frame[-1])
+        },
+        'correct_per_frame': correct_per_frame,
+        'incorrect_per_frame': incorrect_per_frame,
+        'states': state,
+        'correct_frames': np.flatnonzero(correct),
+        'incorrect_frames': np.flatnonzero(incorrect),
+        'reset_frames': np.flatnonzero(resets)
+    }
@@ -1,61 +1,203 @@
 import av
 import os
 import sys
+import time
+import uuid
+import weakref
 import streamlit as st
 from streamlit_webrtc import VideoHTMLAttributes, webrtc_streamer
 from aiortc.contrib.media import MediaRecorder
-import importlib.util  # Import for dynamic module loading
 
 BASE_DIR = os.path.abspath(os.path.join(__file__, '../../'))
 sys.path.append(BASE_DIR)
 
-from utils import get_mediapipe_pose
-from process_frame import ProcessFrame
-from thresholds import get_thresholds_beginner, get_thresholds_pro
+from pose_pool import get_pose_pool, PoseLease
+from roi_pose import ROIPose
+from frame_skipping import AdaptiveFrameSkipper
+from inference_worker import AsyncFrameProcessor
+from frame_buffers import FrameBufferPool
+from stream_scheduler import get_stream_scheduler
+from stage_profiler import StageProfiler
+from landmark_trace import LandmarkTraceWriter, TraceRecordingPose
+from exercise_engine import ExerciseProcessor
+from exercise_specs import SQUAT, BICEP_CURL, PUSHUP, SHOULDER_PRESS, TRICEP_EXTENSION
+from multi_exercise import MultiExerciseProcessor, MULTI_EXERCISE_SPECS
+from thresholds import get_thresholds
+from landmark_filter import OneEuroFilter
+from complexity_tuning import AdaptiveComplexityPose
 
 st.title('FormMaster')
 
 # Dropdown for selecting exercises
-exercise_options = ['Squats', 'Bicep Curls', 'Pushups', 'Shoulder Press', 'Tricep Extensions']
+exercise_specs = {
+    'Squats': SQUAT,
+    'Bicep Curls': BICEP_CURL,
+    'Pushups': PUSHUP,
+    'Shoulder Press': SHOULDER_PRESS,
+    'Tricep Extensions': TRICEP_EXTENSION
+}
+multi_exercise = st.sidebar.checkbox('Multi-exercise mode', value=False, help='Track squats, bicep curls and shoulder presses from one pose inference. Switching exercise keeps every counter; Auto picks the overlay from your movement.')
+
+exercise_options = list(exercise_specs)
+if multi_exercise:
+    multi_names = [spec['name'] for spec in MULTI_EXERCISE_SPECS]
+    exercise_options = ['Auto'] + [label for label, spec in exercise_specs.items() if spec['name'] in multi_names]
+
 selected_exercise = st.selectbox('Select Exercise', exercise_options)
 
 mode = st.radio('Select Mode', ['Beginner', 'Pro'], horizontal=True)
 
+show_timings = st.sidebar.checkbox('Show stage timings', value=False, help='Rolling p50/p95/p99 latency of each processing stage.')
+profiler = StageProfiler() if show_timings else None
+
+pose_model = st.sidebar.radio('Pose model', ['Full', 'Lite', 'Auto-tune'], horizontal=True,
+                              help='Lite: fastest model (model_complexity=0). Auto-tune: switches between the lite, full and heavy models to keep '
+                                   'inference within the frame budget. Both smooth landmarks to keep rep counting stable.')
+
 thresholds = None 
 
 if mode == 'Beginner':
-    thresholds = get_thresholds_beginner()
+    thresholds = get_thresholds('beginner')
 elif mode == 'Pro':
-    thresholds = get_thresholds_pro()
+    thresholds = get_thresholds('pro')
 
-# Initialize the ProcessFrame instance based on the selected exercise
+# Every exercise runs on the shared analysis engine, configured by its spec.
 if selected_exercise == 'Shoulder Press':
-    # Dynamically import and run the shoulder_press.py code
-    shoulder_press_path = "D:\\main project\\FormMaster\\shoulder_press.py"
-    spec = importlib.util.spec_from_file_location("shoulder_press", shoulder_press_path)
-    shoulder_press_module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(shoulder_press_module)
-    
     # Display comments or instructions for Shoulder Press
     st.info("Perform the Shoulder Press by lifting weights overhead. Maintain good posture and control.")
-    
-    # Initialize the ProcessFrame instance for Shoulder Press
-    live_process_frame = ProcessFrame(thresholds=thresholds, flip_frame=True)
+
+if multi_exercise:
+    # Kept across reruns, so switching exercise neither rebuilds the analyzers nor resets their counters.
+    if st.session_state.get('multi_exercise_mode') != mode:
+        st.session_state['multi_exercise'] = MultiExerciseProcessor(thresholds, flip_frame=True, frame_mirrored=True)
+        st.session_state['multi_exercise_mode'] = mode
+
+    live_process_frame = st.session_state['multi_exercise']
+    live_process_frame.set_profiler(profiler)
+    live_process_frame.landmark_filter = OneEuroFilter() if pose_model != 'Full' else None
+    live_process_frame.auto_select = selected_exercise == 'Auto'
+
+    if selected_exercise != 'Auto':
+        live_process_frame.active = exercise_specs[selected_exercise]['name']
 else:
-    live_process_frame = ProcessFrame(thresholds=thresholds, flip_frame=True)  # For other exercises
+    live_process_frame = ExerciseProcessor(exercise_specs[selected_exercise], thresholds=thresholds, flip_frame=True, profiler=profiler, frame_mirrored=True,
+                                            landmark_filter=OneEuroFilter() if pose_model != 'Full' else None)
+
+roi_tracking = st.sidebar.checkbox('ROI tracking', value=False, help='Run pose inference on a crop around the subject instead of the full frame.')
+inference_mode = st.sidebar.radio('Inference', ['Every frame', 'Adaptive frame skipping', 'Async worker', 'Shared scheduler'],
+                                  help='Shared scheduler: every camera on this server shares one fixed pool of pose workers.')
+record_trace = st.sidebar.checkbox('Record landmark trace', value=False, help='Save the landmarks of this session for offline re-analysis.')
+
+# Lease a warmed pose graph from the process-wide pool. The session keeps it while the
+# stream is playing and hands it back once the stream stops, including when the tab is
+# closed or the connection drops, or else when Streamlit discards the session. The shared
+# scheduler runs inference on its own graphs, so no lease is taken for it.
+pose_pool = get_pose_pool()
+use_scheduler = inference_mode == 'Shared scheduler'
+
+def lease_pose():
+    if pose_model == 'Auto-tune':
+        # An auto-tuned session hands back whichever graph it holds at the time.
+        tuned_pose = AdaptiveComplexityPose(pool=pose_pool, timeout=10.0)
+        return PoseLease(tuned_pose, tuned_pose.close)
+
+    return PoseLease(pose_pool.acquire(timeout=10.0, **({'model_complexity': 0} if pose_model == 'Lite' else {})), pose_pool.release)
+
+# Stop the inference thread left over from the previous script run before its graph
+# can be handed back below.
+if 'async_processor' in st.session_state:
+    st.session_state['async_processor'].close()
+    del st.session_state['async_processor']
+
+# Replace a graph handed back when the previous stream ended. One still in use is only
+# traded in for another pose model, or given up for the shared scheduler, once the
+# stream has stopped: until then the frame callback may be running inference on it.
+stream_playing = st.session_state.get('stream_playing', False)
+if 'pose_lease' in st.session_state:
+    pose_lease = st.session_state['pose_lease']
+    model_changed = st.session_state.get('pose_model') != pose_model
+
+    if pose_lease.released or ((model_changed or use_scheduler) and not stream_playing):
+        st.session_state.pop('pose_lease').release()
+    elif model_changed:
+        st.sidebar.info('The new pose model is used once the stream is stopped.')
+
+if 'pose_lease' not in st.session_state and not use_scheduler:
+    try:
+        st.session_state['pose_lease'] = lease_pose()
+        st.session_state['pose_model'] = pose_model
+    except TimeoutError:
+        st.error('All pose analysis slots on this server are busy. Please try again shortly.')
+        st.stop()
 
-# Initialize face mesh solution
-pose = get_mediapipe_pose()
+pose_lease = st.session_state.get('pose_lease')
+pose = pose_lease.pose if pose_lease is not None else None
+complexity_tuner = pose if isinstance(pose, AdaptiveComplexityPose) else None
+
+if roi_tracking and pose is not None:
+    pose = ROIPose(pose)
+
+# Record every inferred frame's landmarks into a compact trace; it is closed once the stream stops.
+if record_trace and pose is not None:
+    if 'trace_writer' not in st.session_state:
+        trace_path = os.path.join(BASE_DIR, 'traces', time.strftime('%Y%m%d-%H%M%S'))
+        st.session_state['trace_writer'] = LandmarkTraceWriter(trace_path, meta={'exercise': selected_exercise, 'mode': mode, 'mirrored': True})
+
+    pose = TraceRecordingPose(pose, st.session_state['trace_writer'])
+
+# Under load, infer only every N-th frame and extrapolate landmarks in between.
+frame_skipper = AdaptiveFrameSkipper(pose) if inference_mode == 'Adaptive frame skipping' else None
+
+# Or run inference on a background thread and draw each frame with the newest landmarks.
+async_processor = None
+if inference_mode == 'Async worker':
+    async_processor = AsyncFrameProcessor(live_process_frame, pose)
+    st.session_state['async_processor'] = async_processor
+
+# Or register this session as one stream of the process-wide scheduler, which serves all
+# cameras from a fixed set of workers at a guaranteed rate.
+elif use_scheduler:
+    try:
+        stream_scheduler = get_stream_scheduler()
+        stream = stream_scheduler.add_stream(f'session-{uuid.uuid4().hex[:8]}', target_fps=15.0)
+    except (RuntimeError, TimeoutError):
+        st.error('This server is serving as many cameras as it can. Please choose another inference mode or try again shortly.')
+        st.stop()
+
+    async_processor = AsyncFrameProcessor(live_process_frame, worker=stream)
+    st.session_state['async_processor'] = async_processor
+
+    # Like the pose lease, the stream goes with the session's state if the session is
+    # discarded before the stream ends or the script runs again.
+    weakref.finalize(async_processor, stream.close)
+    st.sidebar.table(stream_scheduler.stats())
 
 if 'download' not in st.session_state:
     st.session_state['download'] = False
 
 output_video_file = f'output_live.flv'
 
+# Frames are decoded into reused buffers, already mirrored for the selfie view, drawn on
+# in place and returned to PyAV without a copy.
+frame_buffers = FrameBufferPool(mirror=True)
+
 def video_frame_callback(frame: av.VideoFrame):
-    frame = frame.to_ndarray(format="rgb24")  # Decode and get RGB frame
-    frame, _ = live_process_frame.process(frame, pose)  # Process frame
-    return av.VideoFrame.from_ndarray(frame, format="rgb24")  # Encode and return BGR frame
+    frame = frame_buffers.to_ndarray(frame)  # Decode and get RGB frame
+    if async_processor is not None:
+        frame, _ = async_processor.process(frame)
+    elif frame_skipper is not None:
+        frame, _ = live_process_frame.process_landmarks(frame, frame_skipper.process(frame))
+    else:
+        frame, _ = live_process_frame.process(frame, pose)  # Process frame
+    return frame_buffers.to_video_frame(frame)  # Encode and return RGB frame
+
+def video_ended_callback():
+    # Runs when the browser stops sending video, also after the tab was closed or the
+    # connection dropped, when no further script run would hand the graph back.
+    if async_processor is not None:
+        async_processor.close()
+    if pose_lease is not None:
+        pose_lease.release()
 
 def out_recorder_factory() -> MediaRecorder:
     return MediaRecorder(output_video_file)
@@ -66,9 +208,24 @@ ctx = webrtc_streamer(
     rtc_configuration={"iceServers": [{"urls": ["stun:stun.l.google.com:19302"]}]},  # Add this config
     media_stream_constraints={"video": {"width": {'min':480, 'ideal':480}}, "audio": False},
     video_html_attrs=VideoHTMLAttributes(autoPlay=True, controls=False, muted=False),
-    out_recorder_factory=out_recorder_factory
+    out_recorder_factory=out_recorder_factory,
+    on_video_ended=video_ended_callback
 )
 
+st.session_state['stream_playing'] = ctx.state.playing
+
+if not ctx.state.playing and 'pose_lease' in st.session_state:
+    st.session_state.pop('pose_lease').release()
+
+# A scheduler stream that is not playing would still count against the node's capacity.
+if not ctx.state.playing and 'async_processor' in st.session_state:
+    st.session_state.pop('async_processor').close()
+
+if not ctx.state.playing and 'trace_writer' in st.session_state and st.session_state['trace_writer'].num_frames:
+    trace_writer = st.session_state.pop('trace_writer')
+    trace_writer.close()
+    st.sidebar.success(f'Landmark trace saved to {trace_writer.path}')
+
 download_button = st.empty()
 
 if os.path.exists(output_video_file):
@@ -81,4 +238,19 @@ if os.path.exists(output_video_file):
 if os.path.exists(output_video_file) and st.session_state['download']:
     os.remove(output_video_file)
     st.session_state['download'] = False
-    download_button.empty()
\ No newline at end of file
+    download_button.empty()
+
+# Refresh the stage timings and pose model metrics while the stream is playing.
+if profiler is not None or complexity_tuner is not None:
+    timings = st.sidebar.empty()
+    tuning = st.sidebar.empty()
+    switches = st.sidebar.empty()
+    while ctx.state.playing:
+        if profiler is not None:
+            timings.table(profiler.summary())
+        if complexity_tuner is not None:
+            tuning.table([complexity_tuner.stats()])
+            recent_switches = complexity_tuner.recent_switches()
+            if recent_switches:
+                switches.table(recent_switches)
+        time.sleep(1.0)
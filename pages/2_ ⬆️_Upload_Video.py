@@ -1,18 +1,31 @@
 import av
 import os
 import sys
+import time
+from contextlib import nullcontext
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx
 import cv2
-import tempfile
+import numpy as np
 
 
 BASE_DIR = os.path.abspath(os.path.join(__file__, '../../'))
 sys.path.append(BASE_DIR)
 
 
-from utils import get_mediapipe_pose
+from utils import get_landmark_matrix, MediaClock, NUM_POSE_LANDMARKS
+from pose_pool import get_pose_pool
 from process_frame import ProcessFrame
-from thresholds import get_thresholds_beginner, get_thresholds_pro
+from thresholds import get_thresholds
+from video_pipeline import VideoPipeline
+from video_encoder import H264StreamWriter
+from parallel_analysis import extract_landmarks_parallel, get_track_landmarks
+from landmark_cache import LandmarkCache
+from roi_pose import ROIPose
+from stage_profiler import StageProfiler
+from scratch_storage import get_scratch_storage
+from frame_preview import FramePreview
+from landmark_filter import OneEuroFilter
 
 
 
@@ -25,21 +38,41 @@ mode = st.radio('Select Mode', ['Beginner', 'Pro'], horizontal=True)
 thresholds = None 
 
 if mode == 'Beginner':
-    thresholds = get_thresholds_beginner()
+    thresholds = get_thresholds('beginner')
 
 elif mode == 'Pro':
-    thresholds = get_thresholds_pro()
+    thresholds = get_thresholds('pro')
 
 
 
-upload_process_frame = ProcessFrame(thresholds=thresholds)
+parallel_mode = st.sidebar.checkbox('Parallel analysis (long videos)', value=False)
+roi_tracking = st.sidebar.checkbox('ROI tracking', value=False, help='Run pose inference on a crop around the subject instead of the full frame.')
+lite_model = st.sidebar.checkbox('Lite pose model', value=False, help='Fastest pose model (model_complexity=0), with landmark smoothing to keep rep counting stable.')
+show_timings = st.sidebar.checkbox('Show stage timings', value=False, help='Rolling p50/p95/p99 latency of each processing stage.')
 
-# Initialize face mesh solution
-pose = get_mediapipe_pose()
+
+# Inactivity timers follow the video's own timeline, so results do not depend on processing speed.
+upload_clock = MediaClock(fps=30.0)
+profiler = StageProfiler() if show_timings else None
+upload_process_frame = ProcessFrame(thresholds=thresholds, clock=upload_clock, profiler=profiler, landmark_filter=OneEuroFilter() if lite_model else None)
+
+# Pose graphs come from a process-wide pool of warmed instances, leased per upload.
+pose_params = {'model_complexity': 0} if lite_model else {}
+pose_pool = get_pose_pool()
+
+# Landmarks depend only on the video and the pose model, not on the threshold profile,
+# so re-analysing the same video replays cached landmarks instead of rerunning inference.
+landmark_cache = LandmarkCache()
+
+# Uploads are spooled to shared scratch storage and deleted once analysed.
+scratch_storage = get_scratch_storage()
 
 
 download = None
 
+# Seconds between refreshes of the player showing the processed part of the video.
+PLAYER_REFRESH = 10.0
+
 if 'download' not in st.session_state:
     st.session_state['download'] = False
 
@@ -55,6 +88,7 @@ with st.form('Upload', clear_on_submit=True):
     uploaded = st.form_submit_button("Upload")
 
 stframe = st.empty()
+processed_video = st.empty()
 
 ip_vid_str = '<p style="font-family:Helvetica; font-weight: bold; font-size: 16px;">Input Video</p>'
 warning_str = '<p style="font-family:Helvetica; font-weight: bold; color: Red; font-size: 17px;">Please Upload a Video first!!!</p>'
@@ -67,54 +101,135 @@ download_button = st.empty()
 if up_file and uploaded:
     
     download_button.empty()
-    tfile = tempfile.NamedTemporaryFile(delete=False)
+    video_path = None
+
+    try:
+        leased_pose = pose_pool.acquire(timeout=10.0, **pose_params)
+    except TimeoutError:
+        st.error('All pose analysis slots on this server are busy. Please try again shortly.')
+        st.stop()
+
+    pose = ROIPose(leased_pose) if roi_tracking else leased_pose
 
     try:
         warn.empty()
-        tfile.write(up_file.read())
+        video_path = scratch_storage.ingest(up_file, suffix=os.path.splitext(up_file.name)[1])
 
-        vf = cv2.VideoCapture(tfile.name)
+        vf = cv2.VideoCapture(video_path)
 
         # ---------------------  Write the processed video frame. --------------------
         fps = int(vf.get(cv2.CAP_PROP_FPS))
         width = int(vf.get(cv2.CAP_PROP_FRAME_WIDTH))
         height = int(vf.get(cv2.CAP_PROP_FRAME_HEIGHT))
         frame_size = (width, height)
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        video_output = cv2.VideoWriter(output_video_file, fourcc, fps, frame_size)
+
+        # H.264 in a fragmented MP4 plays inline in browsers, and the file is readable
+        # fragment by fragment while later frames are still being processed.
+        try:
+            video_output = H264StreamWriter(output_video_file, vf.get(cv2.CAP_PROP_FPS), frame_size)
+        except RuntimeError:
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            video_output = cv2.VideoWriter(output_video_file, fourcc, fps, frame_size)
         # -----------------------------------------------------------------------------
 
+        upload_clock.fps = fps if fps > 0 else 30.0
         
         txt = st.sidebar.markdown(ip_vid_str, unsafe_allow_html=True)   
-        ip_video = st.sidebar.video(tfile.name) 
+        ip_video = st.sidebar.video(video_path) 
+
+        cache_key = landmark_cache.key(video_path, dict(pose_params, roi_tracking=roi_tracking))
+        track = landmark_cache.get(cache_key)
+
+        # In parallel mode pose inference for the whole video runs up front in worker
+        # processes; the loop below then only replays the landmarks through ProcessFrame.
+        if track is None and parallel_mode:
+            with st.spinner('Analysing video...'):
+                track = extract_landmarks_parallel(video_path, pose_params=pose_params, roi_tracking=roi_tracking)
+            landmark_cache.put(cache_key, track)
+
+        recorded = []
+
+        timings = st.sidebar.empty() if profiler is not None else None
+
+        num_frames = int(vf.get(cv2.CAP_PROP_FRAME_COUNT))
+        progress_bar = st.progress(0.0, text='Analysing video...')
 
-        while vf.isOpened():
-            ret, frame = vf.read()
-            if not ret:
-                break
+        # The browser only gets a few downscaled JPEG frames per second, published from a
+        # background thread, so rendering the preview never slows down the analysis.
+        preview = FramePreview(stframe.image, max_fps=5.0)
+        add_script_run_ctx(preview.thread)
 
-            # convert frame from BGR to RGB before processing it.
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            out_frame, _ = upload_process_frame.process(frame, pose)
-            stframe.image(out_frame)
-            video_output.write(out_frame[...,::-1])
+        # The finished fragments of the H.264 output can be watched while the rest is
+        # still being analysed; the player is refreshed as new ones are written.
+        playable = getattr(video_output, 'playable_prefix', None)
+        next_refresh = time.perf_counter() + PLAYER_REFRESH
+        served_bytes = 0
+
+        # Decode and encode run on background threads while frames are analysed here.
+        with VideoPipeline(vf, video_output) as pipeline, preview:
+            for frame_idx, frame in enumerate(pipeline.frames()):
+                upload_clock.frame_idx = frame_idx
+
+                # Inference runs outside the processor here, so time it as part of the same frame.
+                with profiler.time_frame() if profiler is not None else nullcontext():
+                    if track is None:
+                        keypoints = pose.process(frame)
+
+                        if profiler is not None:
+                            profiler.lap('inference')
+
+                        if keypoints.pose_landmarks:
+                            landmarks = get_landmark_matrix(keypoints.pose_landmarks.landmark)
+                        else:
+                            landmarks = np.full((NUM_POSE_LANDMARKS, 4), np.nan, dtype=np.float32)
+
+                        recorded.append(landmarks)
+                        out_frame, _ = upload_process_frame.process_landmarks(frame, get_track_landmarks(recorded, frame_idx))
+                    else:
+                        out_frame, _ = upload_process_frame.process_landmarks(frame, get_track_landmarks(track, frame_idx))
+
+                if timings is not None and frame_idx % 30 == 0:
+                    timings.table(profiler.summary())
+
+                if preview.offer(out_frame) and num_frames > 0:
+                    progress_bar.progress(min(1.0, (frame_idx + 1) / num_frames), text='Analysing video...')
+
+                if playable is not None and time.perf_counter() >= next_refresh and video_output.playable_bytes > served_bytes:
+                    served_bytes = video_output.playable_bytes
+                    processed_video.video(playable(), format='video/mp4')
+                    next_refresh = time.perf_counter() + PLAYER_REFRESH
+
+                pipeline.write(out_frame)
+
+        if timings is not None:
+            timings.table(profiler.summary())
+
+        if recorded:
+            landmark_cache.put(cache_key, np.stack(recorded))
 
         
         vf.release()
         video_output.release()
+        progress_bar.empty()
         stframe.empty()
+        processed_video.empty()
         ip_video.empty()
         txt.empty()
-        tfile.close()
     
     except AttributeError:
         warn.markdown(warning_str, unsafe_allow_html=True)   
 
+    finally:
+        pose_pool.release(leased_pose)
+
+        if video_path is not None:
+            scratch_storage.release(video_path)
+
 
 
 if os.path.exists(output_video_file):
     with open(output_video_file, 'rb') as op_vid:
-        download = download_button.download_button('Download Video', data = op_vid, file_name='output_recorded.mp4')
+        download = download_button.download_button('Download Video', data = op_vid, file_name='output_recorded.mp4', mime='video/mp4')
     
     if download:
         st.session_state['download'] = True
@@ -0,0 +1,108 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from utils import get_mediapipe_pose, get_landmark_matrix, NUM_POSE_LANDMARKS
+from roi_pose import ROIPose
+
+
+def extract_landmarks(video_path, start_frame = 0, end_frame = None, warmup_frames = 0, pose_params = None, roi_tracking = False):
+
+    # Runs pose inference on frames [start_frame, end_frame) with a dedicated Pose instance and
+    # returns an (N, 33, 4) float32 array, NaN where no pose was detected. The warmup_frames
+    # before start_frame are inferred but discarded, so the tracker has settled by start_frame.
+    pose = get_mediapipe_pose(**(pose_params or {}))
+    if roi_tracking:
+        pose = ROIPose(pose)
+    vf = cv2.VideoCapture(video_path)
+
+    first_frame = max(0, start_frame - warmup_frames)
+
+    landmarks = []
+    frame_idx = 0
+
+    try:
+        # Decode up to first_frame instead of seeking: CAP_PROP_POS_FRAMES can land near the
+        # frame rather than on it, and the segments would then not line up. Decoding
+        # without inference costs little next to the segment's own inference.
+        while frame_idx < first_frame:
+            if not vf.grab():
+                break
+            frame_idx += 1
+
+        while end_frame is None or frame_idx < end_frame:
+            ret, frame = vf.read()
+            if not ret:
+                break
+
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            keypoints = pose.process(frame)
+
+            if frame_idx >= start_frame:
+                if keypoints.pose_landmarks:
+                    landmarks.append(get_landmark_matrix(keypoints.pose_landmarks.landmark))
+                else:
+                    landmarks.append(np.full((NUM_POSE_LANDMARKS, 4), np.nan, dtype=np.float32))
+
+            frame_idx += 1
+
+    finally:
+        vf.release()
+        pose.close()
+
+    if not landmarks:
+        return np.empty((0, NUM_POSE_LANDMARKS, 4), dtype=np.float32)
+
+    return np.stack(landmarks)
+
+
+
+
+def extract_landmarks_parallel(video_path, num_workers = None, warmup_seconds = 2.0, pose_params = None, roi_tracking = False):
+
+    # Splits the video into one time segment per worker process and stitches the
+    # per-segment landmark arrays back together in frame order.
+    num_workers = num_workers or os.cpu_count() or 1
+
+    vf = cv2.VideoCapture(video_path)
+    frame_count = int(vf.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = vf.get(cv2.CAP_PROP_FPS) or 30.0
+    vf.release()
+
+    warmup_frames = int(warmup_seconds * fps)
+
+    # Segments much shorter than the warm-up would spend most of their time warming up.
+    num_segments = max(1, min(num_workers, frame_count // max(1, 4 * warmup_frames)))
+    if num_segments == 1:
+        return extract_landmarks(video_path, pose_params=pose_params, roi_tracking=roi_tracking)
+
+    bounds = np.linspace(0, frame_count, num_segments + 1).astype(int)
+
+    # Spawn instead of fork: the parent already runs MediaPipe and Streamlit threads.
+    ctx = multiprocessing.get_context('spawn')
+
+    with ProcessPoolExecutor(max_workers=num_segments, mp_context=ctx) as executor:
+        futures = []
+        for i in range(num_segments):
+            # The frame count reported by the container can be off, so the last segment reads to EOF.
+            end_frame = bounds[i + 1] if i < num_segments - 1 else None
+            futures.append(executor.submit(extract_landmarks, video_path, int(bounds[i]), end_frame, warmup_frames, pose_params, roi_tracking))
+
+        segments = [future.result() for future in futures]
+
+    return np.concatenate(segments)
+
+
+
+
+def get_track_landmarks(landmarks, frame_idx):
+
+    # Landmarks of one frame from an extracted track, in the form expected by
+    # ProcessFrame.process_landmarks (None when no pose was detected).
+    if frame_idx >= len(landmarks) or np.isnan(landmarks[frame_idx][0, 0]):
+        return None
+
+    return landmarks[frame_idx]
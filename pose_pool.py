@@ -0,0 +1,208 @@
+import threading
+import weakref
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+from utils import get_mediapipe_pose, get_pose_params
+
+
+class PosePool:
+    def __init__(self, max_size = 4, warmup = True):
+
+        # Bounded set of MediaPipe Pose graphs shared by every session in the process.
+        # Instances are keyed by their get_mediapipe_pose parameters; at most max_size
+        # graphs exist at any time, idle or leased.
+        self.max_size = max_size
+        self.warmup = warmup
+
+        self._cond = threading.Condition()
+        self._idle = {}
+        self._size = 0
+
+
+
+    def _key(self, pose_params):
+        return tuple(sorted(get_pose_params(**pose_params).items()))
+
+
+
+    def _create(self, key):
+        pose = get_mediapipe_pose(**dict(key))
+
+        # Pay graph initialisation and the first-inference cost before any user sees it.
+        # A blank frame yields no detection, so no tracking state is left behind.
+        if self.warmup:
+            pose.process(np.zeros((256, 256, 3), dtype=np.uint8))
+
+        return pose
+
+
+
+    def _reset(self, pose):
+        # Drop the previous user's tracking and smoothing state. Graphs without reset()
+        # raise here and are closed by release() instead of being reused.
+        pose.reset()
+
+
+
+    def acquire(self, timeout = None, **pose_params):
+        return self._lease(self._key(pose_params), timeout)
+
+
+
+    def exchange(self, pose, timeout = None, **pose_params):
+        # Hands pose back and leases a graph with pose_params in one step, so the freed
+        # slot cannot go to another session in between: on a full pool this returns at
+        # once, where release() and acquire() could wait behind everyone else.
+        return self._lease(self._key(pose_params), timeout, returned=(pose, self._try_reset(pose)))
+
+
+
+    def _try_reset(self, pose):
+        # Whether pose can go back to the idle set; a graph that cannot be reset is
+        # closed instead of being handed to another user.
+        try:
+            self._reset(pose)
+        except Exception:
+            pose.close()
+            return False
+
+        return True
+
+
+
+    def _lease(self, key, timeout, returned = None):
+        with self._cond:
+            if returned is not None:
+                self._put_back(*returned)
+
+            while True:
+                if self._idle.get(key):
+                    return self._idle[key].popleft()
+
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+
+                # Full: make room by closing an idle graph with other parameters.
+                other = next((k for k, idle in self._idle.items() if idle), None)
+                if other is not None:
+                    self._idle[other].popleft().close()
+                    break
+
+                if not self._cond.wait(timeout):
+                    raise TimeoutError(f'no Pose instance became available within {timeout} s')
+
+        try:
+            pose = self._create(key)
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        # Remember the key so release() returns the instance to the right bucket.
+        pose._pool_key = key
+
+        return pose
+
+
+
+    def release(self, pose):
+        reusable = self._try_reset(pose)
+
+        with self._cond:
+            self._put_back(pose, reusable)
+            self._cond.notify()
+
+
+
+    def _put_back(self, pose, reusable):
+        # With self._cond held.
+        if reusable:
+            self._idle.setdefault(pose._pool_key, deque()).append(pose)
+            self._trim()
+        else:
+            self._size -= 1
+
+
+
+    def grow(self, count):
+        # Lets the pool hold count more graphs, or fewer for a negative count. Idle graphs
+        # beyond the new size are closed right away, leased ones when they are handed back.
+        with self._cond:
+            self.max_size += count
+            self._trim()
+            self._cond.notify_all()
+
+
+
+    def _trim(self):
+        # With self._cond held.
+        while self._size > self.max_size:
+            other = next((k for k, idle in self._idle.items() if idle), None)
+            if other is None:
+                return
+
+            self._idle[other].popleft().close()
+            self._size -= 1
+
+
+
+    @contextmanager
+    def lease(self, timeout = None, **pose_params):
+        pose = self.acquire(timeout=timeout, **pose_params)
+        try:
+            yield pose
+        finally:
+            self.release(pose)
+
+
+
+    def stats(self):
+        with self._cond:
+            idle = sum(len(idle) for idle in self._idle.values())
+            return {'size': self._size, 'idle': idle, 'leased': self._size - idle, 'max_size': self.max_size}
+
+
+
+
+class PoseLease:
+    def __init__(self, pose, release):
+
+        # A leased graph handed back exactly once through release(pose): when release()
+        # is called, or at the latest when the lease is garbage collected, e.g. with the
+        # state of a Streamlit session that was abandoned without another script run.
+        # release() is safe to call from several threads and more than once.
+        self.pose = pose
+        self._finalizer = weakref.finalize(self, release, pose)
+
+
+
+    @property
+    def released(self):
+        return not self._finalizer.alive
+
+
+
+    def release(self):
+        self._finalizer()
+
+
+
+
+_pose_pool = None
+_pose_pool_lock = threading.Lock()
+
+
+def get_pose_pool(max_size = 4):
+    # Process-wide pool; max_size only applies to the first call.
+    global _pose_pool
+
+    with _pose_pool_lock:
+        if _pose_pool is None:
+            _pose_pool = PosePool(max_size=max_size)
+
+        return _pose_pool
@@ -0,0 +1,114 @@
+import numpy as np
+
+
+class ROIPose:
+    def __init__(self, pose, padding = 0.25, min_size = 96, min_visibility = 0.5, max_area_ratio = 0.7):
+
+        # Wraps a MediaPipe Pose so inference runs on a padded crop around the subject
+        # found in the previous frame instead of on the full frame. Results are returned
+        # in full-frame normalized coordinates, so callers use it exactly like the Pose.
+        self.pose = pose
+
+        # Padding added on every side of the landmark bounding box, as a fraction of its size.
+        self.padding = padding
+
+        # Smallest crop side in pixels.
+        self.min_size = min_size
+
+        # Landmarks below this visibility do not contribute to the bounding box.
+        self.min_visibility = min_visibility
+
+        # Crops covering more than this fraction of the frame are not worth the copy.
+        self.max_area_ratio = max_area_ratio
+
+        # Current crop as (x0, y0, x1, y1) in pixels, or None for full-frame detection.
+        self.roi = None
+
+
+
+    def process(self, frame):
+        frame_height, frame_width = frame.shape[:2]
+
+        if self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+
+            keypoints = self.pose.process(np.ascontiguousarray(frame[y0:y1, x0:x1]))
+
+            if keypoints.pose_landmarks:
+                self._to_frame_coords(keypoints.pose_landmarks.landmark, frame_width, frame_height)
+                self._update_roi(keypoints.pose_landmarks.landmark, frame_width, frame_height)
+                return keypoints
+
+            # Subject lost inside the crop: fall back to the full frame for this frame.
+            self.roi = None
+
+        keypoints = self.pose.process(frame)
+
+        if keypoints.pose_landmarks:
+            self._update_roi(keypoints.pose_landmarks.landmark, frame_width, frame_height)
+
+        return keypoints
+
+
+
+    def _to_frame_coords(self, landmarks, frame_width, frame_height):
+        x0, y0, x1, y1 = self.roi
+        scale_x = (x1 - x0) / frame_width
+        scale_y = (y1 - y0) / frame_height
+
+        for lm in landmarks:
+            lm.x = x0 / frame_width + lm.x * scale_x
+            lm.y = y0 / frame_height + lm.y * scale_y
+            # z shares the scale of x in MediaPipe's normalized landmarks.
+            lm.z = lm.z * scale_x
+
+
+
+    def _update_roi(self, landmarks, frame_width, frame_height):
+        pts = np.array([(lm.x, lm.y, lm.visibility) for lm in landmarks], dtype=np.float32)
+
+        visible = pts[pts[:, 2] >= self.min_visibility]
+        if len(visible) < 2:
+            visible = pts
+
+        bx0, by0 = visible[:, 0].min() * frame_width, visible[:, 1].min() * frame_height
+        bx1, by1 = visible[:, 0].max() * frame_width, visible[:, 1].max() * frame_height
+
+        # Keep the current crop while the subject stays well inside it: moving the crop
+        # every frame would disturb the tracker's temporal smoothing.
+        if self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+            margin_x = 0.5 * self.padding * (bx1 - bx0)
+            margin_y = 0.5 * self.padding * (by1 - by0)
+
+            inside = x0 + margin_x <= bx0 and bx1 <= x1 - margin_x and y0 + margin_y <= by0 and by1 <= y1 - margin_y
+            not_too_loose = (bx1 - bx0) * (by1 - by0) >= 0.25 * (x1 - x0) * (y1 - y0)
+
+            if inside and not_too_loose:
+                return
+
+        pad_x = max(self.padding * (bx1 - bx0), (self.min_size - (bx1 - bx0)) / 2)
+        pad_y = max(self.padding * (by1 - by0), (self.min_size - (by1 - by0)) / 2)
+
+        x0 = int(max(0, bx0 - pad_x))
+        y0 = int(max(0, by0 - pad_y))
+        x1 = int(min(frame_width, np.ceil(bx1 + pad_x)))
+        y1 = int(min(frame_height, np.ceil(by1 + pad_y)))
+
+        if x1 - x0 < 2 or y1 - y0 < 2 or (x1 - x0) * (y1 - y0) > self.max_area_ratio * frame_width * frame_height:
+            self.roi = None
+        else:
+            self.roi = (x0, y0, x1, y1)
+
+
+
+    def reset(self):
+        self.roi = None
+
+        if hasattr(self.pose, 'reset'):
+            self.pose.reset()
+
+
+
+    def close(self):
+        self.pose.close()
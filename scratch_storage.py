@@ -0,0 +1,115 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+
+DEFAULT_SCRATCH_DIR = os.path.join(tempfile.gettempdir(), 'formmaster_scratch')
+
+
+class ScratchStorage:
+    def __init__(self, scratch_dir = DEFAULT_SCRATCH_DIR, max_bytes = 2 * 1024 * 1024 * 1024, max_age = 3600.0, chunk_size = 1024 * 1024):
+
+        # Spools uploaded videos to disk in chunk_size blocks, so ingesting an upload never
+        # holds a second copy of it in memory. Files are deleted when released. Files left
+        # behind by crashed sessions are removed once they are max_age seconds old, and
+        # the oldest go first when the directory passes max_bytes. Files still in use by
+        # this process are never removed.
+        self.scratch_dir = scratch_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.chunk_size = chunk_size
+
+        self._active = set()
+        self._lock = threading.Lock()
+
+        os.makedirs(self.scratch_dir, exist_ok=True)
+
+
+
+    def ingest(self, fileobj, suffix = ''):
+        # Copies a readable file object (a Streamlit UploadedFile) to a new scratch file and
+        # returns its path. Keep the suffix (e.g. '.mp4') so decoders can sniff the format.
+        self.cleanup()
+
+        fd, path = tempfile.mkstemp(dir=self.scratch_dir, suffix=suffix)
+        with self._lock:
+            self._active.add(path)
+
+        try:
+            if hasattr(fileobj, 'seek'):
+                fileobj.seek(0)
+
+            with os.fdopen(fd, 'wb') as f:
+                shutil.copyfileobj(fileobj, f, self.chunk_size)
+        except BaseException:
+            self.release(path)
+            raise
+
+        return path
+
+
+
+    def release(self, path):
+        with self._lock:
+            self._active.discard(path)
+
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+
+    def cleanup(self):
+        now = time.time()
+
+        with self._lock:
+            active = set(self._active)
+
+        # Files in use count towards the directory size, but are never removed.
+        entries = []
+        total = 0
+        for name in os.listdir(self.scratch_dir):
+            path = os.path.join(self.scratch_dir, name)
+
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+
+            total += stat.st_size
+            if path not in active:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        # Oldest first.
+        entries.sort()
+
+        for mtime, size, path in entries:
+            if total <= self.max_bytes and now - mtime < self.max_age:
+                break
+
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+            total -= size
+
+
+
+
+_scratch_storage = None
+_scratch_storage_lock = threading.Lock()
+
+
+def get_scratch_storage():
+    # Process-wide scratch storage, so every session sees the files in use by the others.
+    global _scratch_storage
+
+    with _scratch_storage_lock:
+        if _scratch_storage is None:
+            _scratch_storage = ScratchStorage()
+
+        return _scratch_storage
@@ -0,0 +1,132 @@
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class StageProfiler:
+    def __init__(self, window = 512):
+
+        # Rolling per-stage latencies of the last `window` frames, in fixed-size ring buffers.
+        self.window = window
+
+        self._samples = {}
+        self._counts = {}
+
+        # Time spent in each stage during the frame being timed.
+        self._frame = {}
+        self._last = None
+        self.active = False
+
+
+
+    def start(self):
+        # Begins timing a frame. Returns False if a frame is already being timed, so nested
+        # entry points (process -> process_landmarks) leave start/stop to the outermost one.
+        if self.active:
+            return False
+
+        self.active = True
+        self._frame.clear()
+        self._last = time.perf_counter()
+
+        return True
+
+
+
+    def lap(self, stage):
+        # Charges the time since the previous lap to `stage`. A stage may be charged
+        # several times per frame; the sum is recorded.
+        if not self.active:
+            return
+
+        now = time.perf_counter()
+        self._frame[stage] = self._frame.get(stage, 0.0) + now - self._last
+        self._last = now
+
+
+
+    def stop(self):
+        if not self.active:
+            return
+
+        self.active = False
+
+        total = 0.0
+        for stage, seconds in self._frame.items():
+            self.record(stage, seconds)
+            total += seconds
+
+        self.record('total', total)
+
+
+
+    def cancel(self):
+        # Drops the frame being timed without recording it.
+        self.active = False
+        self._frame.clear()
+
+
+
+    @contextmanager
+    def time_frame(self):
+        # start() and stop() around a block. A frame that raises is dropped, so the
+        # profiler is ready for the next one rather than stuck timing this one.
+        started = self.start()
+        try:
+            yield
+        except BaseException:
+            if started:
+                self.cancel()
+            raise
+
+        if started:
+            self.stop()
+
+
+
+    def record(self, stage, seconds):
+        buf = self._samples.get(stage)
+        if buf is None:
+            buf = self._samples[stage] = np.zeros(self.window, dtype=np.float64)
+            self._counts[stage] = 0
+
+        buf[self._counts[stage] % self.window] = seconds
+        self._counts[stage] += 1
+
+
+
+    def percentiles(self, q = (50, 95, 99)):
+        # {stage: {percentile: milliseconds}} over the samples currently in each window.
+        # Safe to call from another thread than the one recording, e.g. a UI refresh loop.
+        result = {}
+        for stage, buf in list(self._samples.items()):
+            n = min(self._counts[stage], self.window)
+            values = np.percentile(buf[:n], q) * 1000.0
+            result[stage] = dict(zip(q, values.tolist()))
+
+        return result
+
+
+
+    def summary(self):
+        # One row per stage, ready for st.table / st.dataframe.
+        rows = []
+        for stage, values in self.percentiles().items():
+            rows.append({
+                'stage': stage,
+                'p50 (ms)': round(values[50], 2),
+                'p95 (ms)': round(values[95], 2),
+                'p99 (ms)': round(values[99], 2),
+                'frames': self._counts.get(stage, 0)
+            })
+
+        return rows
+
+
+
+    def reset(self):
+        self._samples.clear()
+        self._counts.clear()
+        self._frame.clear()
+        self.active = False
@@ -0,0 +1,455 @@
+import argparse
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from pose_pool import get_pose_pool
+from utils import get_landmark_matrix
+
+
+POLICIES = ('fair', 'deadline')
+
+
+
+
+class ScheduledStream:
+    def __init__(self, scheduler, name, target_fps, on_result = None):
+
+        # One frame source registered with a StreamScheduler. Has the submit()/latest()/
+        # close() interface of inference_worker.InferenceWorker, so AsyncFrameProcessor
+        # can run on it. Like the worker, only the newest waiting frame is kept.
+        self.scheduler = scheduler
+        self.name = name
+        self.target_fps = target_fps
+        self.on_result = on_result
+
+        self._pending = None
+        self._busy = False
+        self._result = (None, None)
+        self._error = None
+        self._next_id = 0
+        self.closed = False
+
+        # Scheduling state: the worker whose graph tracks this stream, and the virtual
+        # finish time (fair) or release time (deadline).
+        self.worker = 0
+        self._vtime = 0.0
+        self._release = 0.0
+
+        self.submitted_frames = 0
+        self.inferred_frames = 0
+        self.dropped_frames = 0
+        self.failed_frames = 0
+        self.latency = None
+        self._completions = deque()
+
+
+
+    def submit(self, frame):
+        # Copy, since the caller goes on to draw on its frame while inference reads this one.
+        frame = np.copy(frame)
+        self.scheduler._submit(self, frame)
+
+
+
+    def latest(self):
+        # (frame_id, landmarks) of the most recent inference, as InferenceWorker.latest().
+        # An exception raised by this stream's inference since the last call is re-raised
+        # here, once.
+        with self.scheduler._cond:
+            error, self._error = self._error, None
+            if error is not None:
+                raise error
+
+            return self._result
+
+
+
+    def close(self):
+        self.scheduler.remove_stream(self)
+
+
+
+
+class StreamScheduler:
+    def __init__(self, num_workers = 2, policy = 'fair', poses = None, pose_params = None, max_load = 0.9, fps_window = 2.0, clock = time.perf_counter):
+
+        # Runs pose inference for any number of frame sources on a fixed set of worker
+        # threads, each with its own Pose graph, instead of one unscheduled thread per
+        # stream. Scheduling policies:
+        #   fair      work-conserving fair share: streams are served in proportion to
+        #             their target fps, however fast they submit frames
+        #   deadline  earliest deadline first: every stream is served at most at its
+        #             target fps, the one whose next frame is due soonest first
+        # Every stream has a preferred worker, whose graph keeps tracking it from frame to
+        # frame. A worker only takes another worker's stream while that worker is busy, and
+        # the stream then stays with it; a graph is reset whenever it switches streams.
+        # Worker graphs are leased from the process-wide pose pool unless `poses` are given,
+        # on num_workers slots added to the pool for them, so the sessions keep theirs.
+        if policy not in POLICIES:
+            raise ValueError(f'unknown scheduling policy {policy!r}, expected one of {POLICIES}')
+
+        self.policy = policy
+        self.max_load = max_load
+        self.fps_window = fps_window
+        self.clock = clock
+
+        self._cond = threading.Condition()
+        self._streams = []
+        self._closed = False
+
+        # Moving average of one inference, in seconds, for admission control.
+        self.inference_time = None
+
+        self._leased = poses is None
+        if poses is None:
+            poses = self._lease_poses(num_workers, pose_params or {})
+        self.poses = list(poses)
+
+        self._vclocks = [0.0] * len(self.poses)
+        self._busy_workers = [False] * len(self.poses)
+
+        self._threads = [threading.Thread(target=self._run, args=(worker,), daemon=True) for worker in range(len(self.poses))]
+        for thread in self._threads:
+            thread.start()
+
+
+
+    @staticmethod
+    def _lease_poses(num_workers, pose_params):
+        pool = get_pose_pool()
+        pool.grow(num_workers)
+
+        poses = []
+        try:
+            for _ in range(num_workers):
+                poses.append(pool.acquire(timeout=10.0, **pose_params))
+        except BaseException:
+            for pose in poses:
+                pool.release(pose)
+            pool.grow(-num_workers)
+            raise
+
+        return poses
+
+
+
+    def load(self, extra_fps = 0.0):
+        # Fraction of the workers' capacity the registered streams need at their target
+        # fps, from the measured inference time; None before the first inference.
+        if self.inference_time is None:
+            return None
+
+        with self._cond:
+            committed = sum(stream.target_fps for stream in self._streams) + extra_fps
+
+        return committed * self.inference_time / len(self.poses)
+
+
+
+    def add_stream(self, name, target_fps = 15.0, on_result = None):
+        # Registers a frame source. Refused once the node could no longer serve every
+        # stream at its target fps, so admitted streams keep their rate.
+        load = self.load(target_fps)
+        if load is not None and load > self.max_load:
+            raise RuntimeError(f'cannot admit stream {name!r} at {target_fps} fps: node load would be {load:.0%} (max {self.max_load:.0%})')
+
+        stream = ScheduledStream(self, name, target_fps, on_result)
+
+        with self._cond:
+            # The worker with the least committed fps takes the stream.
+            committed = [0.0] * len(self.poses)
+            for other in self._streams:
+                committed[other.worker] += other.target_fps
+            stream.worker = committed.index(min(committed))
+
+            # Start level with the streams already being served, without credit for the past.
+            stream._vtime = self._vclocks[stream.worker]
+            stream._release = self.clock()
+            self._streams.append(stream)
+
+        return stream
+
+
+
+    def remove_stream(self, stream):
+        with self._cond:
+            stream.closed = True
+            stream._pending = None
+            if stream in self._streams:
+                self._streams.remove(stream)
+
+
+
+    def _submit(self, stream, frame):
+        with self._cond:
+            if stream.closed:
+                return
+
+            if stream._pending is not None:
+                stream.dropped_frames += 1
+
+            stream._pending = (stream._next_id, frame, self.clock())
+            stream._next_id += 1
+            stream.submitted_frames += 1
+
+            # Only the stream's own worker, or an idle one if that is busy, may take the frame.
+            self._cond.notify_all()
+
+
+
+    def _next_stream(self, now, worker):
+        # Picks the stream for `worker` to serve next, with self._cond held. Returns
+        # (stream, None), or (None, seconds to wait) when nothing can be served yet. A
+        # stream is never served by two workers at once, so its results stay in frame order.
+        ready = [stream for stream in self._streams if stream._pending is not None and not stream._busy]
+        ready = [stream for stream in ready if stream.worker == worker] or [stream for stream in ready if self._busy_workers[stream.worker]]
+        if not ready:
+            return None, None
+
+        if self.policy == 'fair':
+            vclock = self._vclocks[worker]
+            stream = min(ready, key=lambda s: max(s._vtime, vclock))
+            stream._vtime = max(stream._vtime, vclock)
+            self._vclocks[worker] = stream._vtime
+            stream._vtime += 1.0 / stream.target_fps
+            stream.worker = worker
+
+            return stream, None
+
+        due = [stream for stream in ready if stream._release <= now]
+        if not due:
+            return None, min(stream._release for stream in ready) - now
+
+        # Deadline of a due frame is one period after its release.
+        stream = min(due, key=lambda s: s._release)
+        period = 1.0 / stream.target_fps
+        stream._release = max(stream._release, now - period) + period
+        stream.worker = worker
+
+        return stream, None
+
+
+
+    def _run(self, worker):
+        pose = self.poses[worker]
+        last_stream = None
+
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+
+                    stream, wait = self._next_stream(self.clock(), worker)
+                    if stream is not None:
+                        break
+
+                    self._cond.wait(wait)
+
+                frame_id, frame, submitted_at = stream._pending
+                stream._pending = None
+                stream._busy = True
+                self._busy_workers[worker] = True
+
+                # Idle workers may now take this worker's other streams.
+                self._cond.notify_all()
+
+            landmarks, error, inferred = None, None, False
+
+            start = self.clock()
+            try:
+                # Tracking state of the previous stream must not carry into this one.
+                if last_stream is not None and stream is not last_stream:
+                    pose.reset()
+                last_stream = stream
+
+                keypoints = pose.process(frame)
+                if keypoints.pose_landmarks:
+                    landmarks = get_landmark_matrix(keypoints.pose_landmarks.landmark)
+                inferred = True
+
+            # A failed frame must not stop the worker, which serves every other stream too.
+            # The stream's owner gets the error from its next latest().
+            except Exception as e:
+                error = e
+
+            finally:
+                end = self.clock()
+
+                with self._cond:
+                    # However inference ended, the stream is free for the next worker.
+                    stream._busy = False
+                    self._busy_workers[worker] = False
+                    self._cond.notify_all()
+
+                    if error is not None:
+                        stream._error = error
+                        stream.failed_frames += 1
+
+                    elif inferred:
+                        elapsed = end - start
+                        self.inference_time = elapsed if self.inference_time is None else 0.9 * self.inference_time + 0.1 * elapsed
+
+                        stream._result = (frame_id, landmarks)
+                        stream.inferred_frames += 1
+
+                        latency = end - submitted_at
+                        stream.latency = latency if stream.latency is None else 0.9 * stream.latency + 0.1 * latency
+
+                        stream._completions.append(end)
+                        while stream._completions and stream._completions[0] < end - self.fps_window:
+                            stream._completions.popleft()
+
+            if inferred and stream.on_result is not None and not stream.closed:
+                try:
+                    stream.on_result(frame_id, landmarks)
+                except Exception as e:
+                    with self._cond:
+                        stream._error = e
+
+
+
+    def stats(self):
+        # One row per stream, for st.table or printing.
+        now = self.clock()
+        rows = []
+
+        with self._cond:
+            for stream in self._streams:
+                recent = sum(1 for t in stream._completions if t >= now - self.fps_window)
+                rows.append({
+                    'stream': stream.name,
+                    'target fps': stream.target_fps,
+                    'achieved fps': round(recent / self.fps_window, 1),
+                    'latency (ms)': round(stream.latency * 1000, 1) if stream.latency is not None else None,
+                    'inferred': stream.inferred_frames,
+                    'dropped': stream.dropped_frames,
+                    'failed': stream.failed_frames
+                })
+
+        return rows
+
+
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+        for thread in self._threads:
+            thread.join()
+
+        if self._leased:
+            pool = get_pose_pool()
+            for pose in self.poses:
+                pool.release(pose)
+            pool.grow(-len(self.poses))
+
+
+
+
+class VideoFileSource:
+    def __init__(self, path, stream, loop = True, realtime = True):
+
+        # Replays a video file into a ScheduledStream like a live camera (an RTSP feed):
+        # frames are submitted at the file's own frame rate whether or not the scheduler
+        # keeps up, and the file restarts at its end when loop is set.
+        self.path = path
+        self.stream = stream
+        self.loop = loop
+        self.realtime = realtime
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+
+
+    def _run(self):
+        vf = cv2.VideoCapture(self.path)
+        fps = vf.get(cv2.CAP_PROP_FPS)
+        period = 1.0 / fps if fps > 0 else 1.0 / 30
+
+        next_time = time.perf_counter()
+
+        while not self._stop.is_set():
+            ret, frame = vf.read()
+
+            if not ret:
+                if not self.loop:
+                    break
+                vf.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                continue
+
+            self.stream.submit(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+            if self.realtime:
+                next_time += period
+                self._stop.wait(max(0.0, next_time - time.perf_counter()))
+
+        vf.release()
+
+
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
+
+
+
+_stream_scheduler = None
+_stream_scheduler_lock = threading.Lock()
+
+
+def get_stream_scheduler(num_workers = 2, policy = 'fair'):
+    # Process-wide scheduler shared by every live session; arguments only apply to the first call.
+    global _stream_scheduler
+
+    with _stream_scheduler_lock:
+        if _stream_scheduler is None:
+            _stream_scheduler = StreamScheduler(num_workers=num_workers, policy=policy)
+
+        return _stream_scheduler
+
+
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description='Serve several video files as camera streams from one pose worker pool.')
+    parser.add_argument('videos', nargs='+')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--fps', type=float, default=15.0, help='Target fps of every stream.')
+    parser.add_argument('--policy', choices=POLICIES, default='fair')
+    parser.add_argument('--seconds', type=float, default=30.0)
+    args = parser.parse_args(argv)
+
+    scheduler = StreamScheduler(num_workers=args.workers, policy=args.policy)
+    sources = []
+
+    try:
+        for idx, path in enumerate(args.videos):
+            stream = scheduler.add_stream(f'camera-{idx}', target_fps=args.fps)
+            sources.append(VideoFileSource(path, stream))
+
+        end_time = time.perf_counter() + args.seconds
+        while time.perf_counter() < end_time:
+            time.sleep(2.0)
+            for row in scheduler.stats():
+                print(f"{row['stream']:<12} {row['achieved fps']:6.1f} / {row['target fps']:.1f} fps  "
+                      f"latency {row['latency (ms)']} ms  dropped {row['dropped']}  failed {row['failed']}")
+            print()
+
+    finally:
+        for source in sources:
+            source.close()
+        scheduler.close()
+
+
+
+if __name__ == '__main__':
+    main()
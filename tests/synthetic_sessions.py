@@ -0,0 +1,41 @@
+import numpy as np
+
+from benchmark import synthetic_landmarks
+from utils import NUM_POSE_LANDMARKS
+
+
+FRAME_WIDTH, FRAME_HEIGHT = 640, 480
+
+EXERCISES = ('squat', 'bicep_curl', 'shoulder_press')
+
+
+def random_session(seed, num_frames, exercise = 'squat'):
+
+    # Landmark track stitched from random pieces: reps of the exercise at varying speed and
+    # noise, held poses long enough to trip the inactivity timers, dropped detections, and
+    # the other exercises' geometry, which the exercise's counter sees as misaligned or odd.
+    # fixtures/pre_engine_traces.json was recorded on these tracks; regenerate it if they change.
+    rng = np.random.default_rng(seed)
+    others = [other for other in EXERCISES if other != exercise]
+    pieces = []
+
+    while sum(len(piece) for piece in pieces) < num_frames:
+        kind = rng.integers(0, 6)
+        length = int(rng.integers(20, 400))
+
+        if kind == 0:
+            piece = synthetic_landmarks(exercise, int(rng.integers(1, 60)), FRAME_WIDTH, FRAME_HEIGHT, period=int(rng.integers(20, 90)), seed=int(rng.integers(1e6)))
+            piece = np.repeat(piece[-1:], length if rng.random() < 0.5 else int(rng.integers(400, 700)), axis=0)
+        elif kind == 1:
+            piece = np.full((length, NUM_POSE_LANDMARKS, 4), np.nan, dtype=np.float32)
+        elif kind in (2, 3):
+            piece = synthetic_landmarks(others[kind - 2], length, FRAME_WIDTH, FRAME_HEIGHT, seed=int(rng.integers(1e6)))
+        else:
+            piece = synthetic_landmarks(exercise, length, FRAME_WIDTH, FRAME_HEIGHT, period=int(rng.integers(15, 90)), noise=float(rng.uniform(0.5, 8)), seed=int(rng.integers(1e6)))
+
+        if rng.random() < 0.3:
+            piece = piece + rng.normal(0, 0.02, piece.shape).astype(np.float32) * [1, 1, 0, 0]
+
+        pieces.append(piece.astype(np.float32))
+
+    return np.concatenate(pieces)[:num_frames]
@@ -0,0 +1,161 @@
+import threading
+
+import pytest
+
+import pose_pool
+from complexity_tuning import AdaptiveComplexityPose
+from pose_pool import PosePool
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+
+class TimedPose:
+    # Inference that takes latencies[model_complexity] seconds on the fake clock.
+    def __init__(self, clock, latencies, model_complexity):
+        self.clock = clock
+        self.latency = latencies[model_complexity]
+
+    def process(self, frame):
+        self.clock.now += self.latency
+        return None
+
+    def reset(self):
+        pass
+
+    def close(self):
+        pass
+
+
+
+def timed_pool(monkeypatch, clock, latencies, max_size = 4):
+    monkeypatch.setattr(pose_pool, 'get_mediapipe_pose', lambda model_complexity = 1, **pose_params: TimedPose(clock, latencies, model_complexity))
+    return PosePool(max_size=max_size, warmup=False)
+
+
+
+def run(tuned_pose, num_frames):
+    # Frame indices at which the complexity changed, with the new complexity.
+    changes = []
+    for frame_idx in range(num_frames):
+        complexity = tuned_pose.complexity
+        tuned_pose.process(None)
+        if tuned_pose.complexity != complexity:
+            changes.append((frame_idx, tuned_pose.complexity))
+
+    return changes
+
+
+
+def test_over_budget_downgrades_after_the_hold(monkeypatch):
+    clock = FakeClock()
+    pool = timed_pool(monkeypatch, clock, {0: 0.02, 1: 0.1, 2: 0.3})
+    tuned_pose = AdaptiveComplexityPose(target_latency=1 / 30, pool=pool, clock=clock)
+
+    assert run(tuned_pose, 200) == [(59, 0)]
+
+    [switch] = tuned_pose.recent_switches()
+    assert (switch['from'], switch['to'], switch['reason']) == (1, 0, 'over budget')
+    assert tuned_pose.stats()['switches'] == 1
+    assert pool.stats()['leased'] == 1
+
+
+
+def test_busy_node_still_downgrades(monkeypatch):
+    # Two sessions lease every slot of the pool between them.
+    clock = FakeClock()
+    pool = timed_pool(monkeypatch, clock, {0: 0.02, 1: 0.1, 2: 0.3}, max_size=2)
+    sessions = [AdaptiveComplexityPose(target_latency=1 / 30, pool=pool, clock=clock) for _ in range(2)]
+
+    for _ in range(200):
+        for tuned_pose in sessions:
+            tuned_pose.process(None)
+
+    assert [tuned_pose.complexity for tuned_pose in sessions] == [0, 0]
+    assert pool.stats() == {'size': 2, 'idle': 0, 'leased': 2, 'max_size': 2}
+
+
+
+def test_holds_between_the_thresholds(monkeypatch):
+    # Within budget, but the full model's predicted latency is above the upgrade margin.
+    clock = FakeClock()
+    pool = timed_pool(monkeypatch, clock, {0: 0.01, 1: 0.02, 2: 0.06})
+    tuned_pose = AdaptiveComplexityPose(target_latency=1 / 30, pool=pool, clock=clock)
+
+    assert run(tuned_pose, 500) == []
+
+
+
+def test_upgrade_over_budget_doubles_the_wait(monkeypatch):
+    # The heavy model costs more than predicted, so every upgrade is taken back.
+    clock = FakeClock()
+    pool = timed_pool(monkeypatch, clock, {0: 0.004, 1: 0.005, 2: 0.1})
+    tuned_pose = AdaptiveComplexityPose(target_latency=1 / 30, hold_frames=60, pool=pool, clock=clock)
+
+    changes = run(tuned_pose, 800)
+
+    assert [complexity for _, complexity in changes] == [2, 1, 2, 1, 2, 1]
+    upgrade_waits = [upgrade - downgrade for (downgrade, _), (upgrade, _) in zip(changes[1::2], changes[2::2])]
+    assert upgrade_waits == [120, 240]
+    assert [switch['reason'] for switch in tuned_pose.recent_switches(count=6)] == ['headroom', 'over budget'] * 3
+
+
+
+class BlockingPose:
+    def __init__(self):
+        self.entered = threading.Event()
+        self.proceed = threading.Event()
+
+    def process(self, frame):
+        self.entered.set()
+        self.proceed.wait(5.0)
+        return None
+
+    def reset(self):
+        pass
+
+    def close(self):
+        pass
+
+
+
+def test_close_waits_for_the_frame_in_flight(monkeypatch):
+    monkeypatch.setattr(pose_pool, 'get_mediapipe_pose', lambda **pose_params: BlockingPose())
+    pool = PosePool(max_size=1, warmup=False)
+    tuned_pose = AdaptiveComplexityPose(pool=pool)
+    graph = tuned_pose.pose
+
+    errors = []
+    def run_frame():
+        try:
+            tuned_pose.process(None)
+        except Exception as e:
+            errors.append(e)
+
+    worker = threading.Thread(target=run_frame)
+    worker.start()
+    graph.entered.wait(5.0)
+
+    closer = threading.Thread(target=tuned_pose.close)
+    closer.start()
+    closer.join(0.1)
+
+    # The graph is still in use, so it is not back in the pool yet.
+    assert closer.is_alive()
+    assert pool.stats()['leased'] == 1
+
+    graph.proceed.set()
+    worker.join()
+    closer.join()
+
+    assert errors == []
+    assert pool.stats()['leased'] == 0
+
+    with pytest.raises(RuntimeError, match='after close'):
+        tuned_pose.process(None)
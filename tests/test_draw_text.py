@@ -0,0 +1,68 @@
+import cv2
+import numpy as np
+import pytest
+
+import utils
+from utils import draw_rounded_rect, draw_text
+
+
+def raster_label(img, msg, pos, font_scale, font_thickness, text_color, text_color_bg, width = 8, font = cv2.FONT_HERSHEY_SIMPLEX, box_offset = (20, 10)):
+    # draw_text as it was before labels were cached.
+    x, y = pos
+    text_size, _ = cv2.getTextSize(msg, font, font_scale, font_thickness)
+    text_w, text_h = text_size
+    rec_start = tuple(p - o for p, o in zip(pos, box_offset))
+    rec_end = tuple(m + n - o for m, n, o in zip((x + text_w, y + text_h), box_offset, (25, 0)))
+
+    draw_rounded_rect(img, rec_start, rec_end, width, text_color_bg)
+    cv2.putText(img, msg, (int(rec_start[0] + 6), int(y + text_h + font_scale - 1)), font, font_scale, text_color, font_thickness, cv2.LINE_AA)
+
+    return text_size
+
+
+
+LABELS = [
+    ('CORRECT: 12', 0.7, 2),
+    ('CAMERA NOT ALIGNED PROPERLY!!!', 0.65, 2),
+    # Descenders and a large scale put anti-aliased text outside the box.
+    ('jQ|gy, quip', 2, 4),
+    ('jQ|gy, quip', 0.5, 1),
+]
+
+POSITIONS = [
+    (30, 80),
+    (420, 30),
+    # Clipped at the left, top, right and bottom borders.
+    (-30, -20),
+    (300, -15),
+    (600, 200),
+    (30, 470),
+]
+
+
+@pytest.mark.parametrize('pos', POSITIONS)
+@pytest.mark.parametrize('msg, font_scale, font_thickness', LABELS)
+def test_draw_text_matches_the_raster_path(msg, font_scale, font_thickness, pos):
+    background = np.random.default_rng(0).integers(0, 256, (480, 640, 3), dtype=np.uint8)
+    colors = {'text_color': (255, 255, 230), 'text_color_bg': (18, 185, 0)}
+
+    expected = background.copy()
+    expected_size = raster_label(expected, msg, pos, font_scale, font_thickness, **colors)
+
+    # Twice: once rendering the cached label, once reusing it.
+    for _ in range(2):
+        img = background.copy()
+        size = draw_text(img, msg, pos=pos, font_scale=font_scale, font_thickness=font_thickness, **colors)
+
+        assert size == expected_size
+        assert np.array_equal(img, expected)
+
+
+
+def test_interior_labels_come_from_the_cache():
+    img = np.zeros((480, 640, 3), dtype=np.uint8)
+    draw_text(img, 'INCORRECT: 3', pos=(30, 80), font_scale=0.7)
+
+    entry = next(entry for key, entry in utils._text_sprites.items() if key[0] == 'INCORRECT: 3')
+    assert entry['sprite'] is not None
+    assert utils._blit_text_sprite(img, entry, (30, 80))
@@ -0,0 +1,144 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from benchmark import synthetic_landmarks
+from bicep_curl import ProcessFrame as BicepCurlProcessFrame
+from process_frame import ProcessFrame
+from shoulder_press import ProcessShoulderPress
+from synthetic_sessions import random_session, FRAME_WIDTH, FRAME_HEIGHT
+from thresholds import get_thresholds
+from utils import MediaClock
+
+
+# The bicep curl deliberately counts differently from its pre-engine processor; see the
+# bicep curl tests below.
+PROCESSORS = {
+    'squat': ProcessFrame,
+    'shoulder_press': ProcessShoulderPress
+}
+
+LEFT_ARM, RIGHT_ARM = [11, 13, 15], [12, 14, 16]
+LEFT_HIP, RIGHT_HIP = 23, 24
+
+with open(os.path.join(os.path.dirname(__file__), 'fixtures', 'pre_engine_traces.json')) as f:
+    PRE_ENGINE_TRACES = json.load(f)['cases']
+
+
+def trace(processor, landmarks):
+    # Same encoding as the fixture: [first frame, correct, incorrect, state] runs and [frame, sound] events.
+    runs, sounds = [], []
+    last = None
+
+    for frame_idx, row in enumerate(landmarks):
+        processor.clock.frame_idx = frame_idx
+        result = processor.analyze(None if np.isnan(row[0, 0]) else row, FRAME_WIDTH, FRAME_HEIGHT)
+
+        current = [result['counters']['correct'], result['counters']['incorrect'], result['state']]
+        if current != last:
+            runs.append([frame_idx, *current])
+            last = current
+
+        if result['play_sound'] is not None:
+            sounds.append([frame_idx, result['play_sound']])
+
+    return runs, sounds
+
+
+
+@pytest.mark.parametrize('case', PRE_ENGINE_TRACES, ids=lambda case: f"{case['exercise']}-{case['seed']}")
+def test_engine_matches_pre_engine_processors(case):
+    landmarks = random_session(case['seed'], case['num_frames'], case['exercise'])
+    processor = PROCESSORS[case['exercise']](get_thresholds(case['mode']), clock=MediaClock(30.0))
+
+    runs, sounds = trace(processor, landmarks)
+
+    assert runs == case['counters_and_states']
+    assert sounds == case['sounds']
+
+
+
+def run_bicep_curl(landmarks):
+    clock = MediaClock(30.0)
+    processor = BicepCurlProcessFrame(get_thresholds('beginner'), clock=clock)
+
+    results = []
+    for frame_idx, row in enumerate(landmarks):
+        clock.frame_idx = frame_idx
+        results.append(processor.analyze(None if np.isnan(row[0, 0]) else row, FRAME_WIDTH, FRAME_HEIGHT))
+
+    return results
+
+
+
+@pytest.mark.parametrize('side', ['left', 'right'])
+def test_bicep_curl_follows_the_arm_facing_the_camera(side):
+    # One arm curls while the other hangs still, and the far side's hip is foreshortened.
+    # The pre-engine processor always read the right arm.
+    landmarks = synthetic_landmarks('bicep_curl', 600, FRAME_WIDTH, FRAME_HEIGHT)
+    still_arm, far_hip = (RIGHT_ARM, RIGHT_HIP) if side == 'left' else (LEFT_ARM, LEFT_HIP)
+    landmarks[:, still_arm] = landmarks[0, still_arm]
+    landmarks[:, far_hip, 1] -= 40 / FRAME_HEIGHT
+
+    results = run_bicep_curl(landmarks)
+
+    assert results[-1]['side'] == side
+    assert results[-1]['counters']['correct'] > 0
+
+
+
+def test_bicep_curl_inactivity():
+    landmarks = synthetic_landmarks('bicep_curl', 600, FRAME_WIDTH, FRAME_HEIGHT)
+
+    # A dropped detection after 20 s of curling keeps the count; the pre-engine processor
+    # reset it, since pose frames never restarted its timer.
+    dropout = np.concatenate((landmarks, np.full((1, *landmarks.shape[1:]), np.nan, dtype=np.float32)))
+    results = run_bicep_curl(dropout)
+    assert results[-1]['counters'] == results[-2]['counters'] and results[-1]['counters']['correct'] > 0
+
+    # Holding still for INACTIVE_THRESH seconds resets the counters, as for squats.
+    held = np.concatenate((landmarks, np.repeat(landmarks[-1:], 480, axis=0)))
+    results = run_bicep_curl(held)
+    assert [result['play_sound'] for result in results[600:]].count('reset_counters') == 1
+    assert results[-1]['counters'] == {'correct': 0, 'incorrect': 0}
+
+
+
+def test_bicep_curl_feedback_and_hint():
+    results = run_bicep_curl(synthetic_landmarks('bicep_curl', 600, FRAME_WIDTH, FRAME_HEIGHT))
+
+    assert any(result['feedback'] is not None and result['feedback'].any() for result in results)
+
+    # The hint is taken down again once the rep moves on.
+    hints = [result['lower_arms'] for result in results]
+    assert any(earlier and not later for earlier, later in zip(hints, hints[1:]))
+
+
+
+def test_render_flips_frames_opencv_cannot_write_in_place():
+    landmarks = synthetic_landmarks('squat', 30, FRAME_WIDTH, FRAME_HEIGHT)
+    processor = ProcessFrame(get_thresholds('beginner'), flip_frame=True, clock=MediaClock(30.0))
+    result = processor.analyze(landmarks[-1], FRAME_WIDTH, FRAME_HEIGHT)
+
+    rgba = np.random.default_rng(0).integers(0, 256, (FRAME_HEIGHT, FRAME_WIDTH, 4), dtype=np.uint8)
+    frame = rgba[..., :3]
+    expected = processor.render(np.ascontiguousarray(frame), result)
+
+    assert np.array_equal(processor.render(frame, result), expected)
+
+
+
+def test_render_marks_the_offset_joints_on_a_misaligned_camera():
+    # Squats seen from the front: nose white, left shoulder yellow, right shoulder magenta.
+    landmarks = synthetic_landmarks('shoulder_press', 1, FRAME_WIDTH, FRAME_HEIGHT)[0]
+    processor = ProcessFrame(get_thresholds('beginner'), clock=MediaClock(30.0))
+    result = processor.analyze(landmarks, FRAME_WIDTH, FRAME_HEIGHT)
+    assert result['camera_aligned'] is False
+
+    frame = processor.render(np.zeros((FRAME_HEIGHT, FRAME_WIDTH, 3), dtype=np.uint8), result)
+
+    for landmark_id, color in ((0, (255, 255, 255)), (11, (255, 255, 0)), (12, (255, 0, 255))):
+        x, y = (landmarks[landmark_id, :2] * (FRAME_WIDTH, FRAME_HEIGHT)).astype(int)
+        assert tuple(frame[y, x]) == color
@@ -0,0 +1,62 @@
+import gc
+
+import av
+import numpy as np
+
+from frame_buffers import FrameBufferPool
+
+
+def camera_frame(height = 48, width = 64, seed = 0):
+    rgb = np.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    return av.VideoFrame.from_ndarray(rgb, format='rgb24').reformat(format='yuv420p')
+
+
+
+def test_buffer_is_reused_once_the_video_frame_is_gone():
+    pool = FrameBufferPool(max_buffers=2)
+
+    rgb = pool.to_ndarray(camera_frame())
+    video_frame = pool.to_video_frame(rgb)
+    address = rgb.__array_interface__['data'][0]
+    del rgb, video_frame
+    gc.collect()
+
+    assert pool.free_buffers() == 1
+
+    rgb = pool.to_ndarray(camera_frame(seed=1))
+    assert rgb.__array_interface__['data'][0] == address
+    assert pool.allocated_buffers == 1
+
+
+
+def test_buffer_held_by_a_video_frame_is_not_handed_out():
+    pool = FrameBufferPool(max_buffers=2)
+
+    # The encoder still holds the first frame, and only its VideoFrame refers to the buffer.
+    held = pool.to_video_frame(pool.to_ndarray(camera_frame()))
+    gc.collect()
+    expected = held.to_ndarray(format='rgb24').copy()
+
+    second = pool.to_ndarray(camera_frame(seed=1))
+    third = pool.to_ndarray(camera_frame(seed=2))
+
+    assert pool.allocated_buffers == 2
+    assert pool.unpooled_frames == 1
+    assert not np.shares_memory(second, third)
+    assert np.array_equal(held.to_ndarray(format='rgb24'), expected)
+
+
+
+def test_resolution_change_drops_the_old_buffers():
+    pool = FrameBufferPool(max_buffers=2)
+
+    small = pool.to_ndarray(camera_frame(48, 64))
+    del small
+    gc.collect()
+
+    # The free small buffer makes room for the new size.
+    large = [pool.to_ndarray(camera_frame(96, 128, seed)) for seed in range(2)]
+
+    assert [frame.shape for frame in large] == [(96, 128, 3)] * 2
+    assert pool.allocated_buffers == 3
+    assert pool.unpooled_frames == 0
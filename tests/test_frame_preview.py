@@ -0,0 +1,95 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from frame_preview import FramePreview
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+
+def frame(width = 640, height = 480):
+    return np.full((height, width, 3), 128, dtype=np.uint8)
+
+
+
+def test_offers_are_rate_limited():
+    clock = FakeClock()
+    published = []
+
+    with FramePreview(published.append, max_fps=5.0, clock=clock) as preview:
+        taken = []
+        for now in [0.0, 0.1, 0.19, 0.2, 0.35, 0.4]:
+            clock.now = now
+            taken.append(preview.offer(frame()))
+
+            # Let each taken frame be published, so only the rate limit turns offers away.
+            while preview._pending is not None or preview._busy:
+                time.sleep(0.001)
+
+    assert taken == [True, False, False, True, False, True]
+    assert len(published) == 3
+    assert preview.dropped_frames == 0
+
+
+
+def test_frames_are_dropped_while_publishing():
+    clock = FakeClock()
+    publishing, unblock = threading.Event(), threading.Event()
+    published = []
+
+    def publish(jpeg):
+        publishing.set()
+        unblock.wait()
+        published.append(jpeg)
+
+    with FramePreview(publish, max_fps=5.0, clock=clock) as preview:
+        assert preview.offer(frame())
+        assert publishing.wait(5.0)
+
+        # Past the rate limit, but the browser has not taken the last frame yet.
+        for now in [1.0, 2.0]:
+            clock.now = now
+            assert not preview.offer(frame())
+
+        unblock.set()
+
+    assert len(published) == 1
+    assert preview.published_frames == 1
+    assert preview.dropped_frames == 2
+
+
+
+@pytest.mark.parametrize('size, preview_size', [((640, 480), (320, 240)), ((200, 100), (200, 100))])
+def test_frames_are_downscaled_to_max_width(size, preview_size):
+    published = []
+
+    with FramePreview(published.append, max_width=320) as preview:
+        assert preview.offer(frame(*size))
+
+    image = cv2.imdecode(np.frombuffer(published[0], dtype=np.uint8), cv2.IMREAD_COLOR)
+    assert image.shape == (preview_size[1], preview_size[0], 3)
+
+
+
+def test_close_raises_the_publish_error():
+    def publish(jpeg):
+        raise ConnectionError('browser went away')
+
+    preview = FramePreview(publish)
+    preview.start()
+    preview.offer(frame())
+
+    with pytest.raises(ConnectionError, match='browser went away'):
+        preview.close()
+
+    assert preview.published_frames == 0
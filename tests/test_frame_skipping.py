@@ -0,0 +1,62 @@
+import numpy as np
+
+from benchmark import FakePose, synthetic_landmarks
+from frame_skipping import AdaptiveFrameSkipper
+from process_frame import ProcessFrame
+from thresholds import get_thresholds
+from utils import MediaClock
+
+
+FRAME_WIDTH, FRAME_HEIGHT = 640, 480
+
+
+def replay(landmark_source, num_frames):
+    clock = MediaClock(fps=30.0)
+    processor = ProcessFrame(get_thresholds('beginner'), clock=clock)
+
+    for frame_idx in range(num_frames):
+        clock.frame_idx = frame_idx
+        result = processor.analyze(landmark_source(frame_idx), FRAME_WIDTH, FRAME_HEIGHT)
+
+    return result['counters']
+
+
+
+def test_forced_skipping_keeps_rep_counts():
+    landmarks = synthetic_landmarks('squat', 600, FRAME_WIDTH, FRAME_HEIGHT)
+    frame = np.zeros((FRAME_HEIGHT, FRAME_WIDTH, 3), dtype=np.uint8)
+
+    # Any measured latency is over a 1 ns budget, so inference runs on every 3rd frame only.
+    pose = FakePose(landmarks)
+    skipper = AdaptiveFrameSkipper(pose, target_latency=1e-9, max_interval=3)
+
+    def skipped_landmarks(frame_idx):
+        # Inference sees the pose of the frame it runs on, not the next row of the track.
+        pose.frame_idx = frame_idx
+        return skipper.process(frame)
+
+    expected = replay(lambda frame_idx: landmarks[frame_idx], len(landmarks))
+    skipped = replay(skipped_landmarks, len(landmarks))
+
+    assert skipper.interval == 3
+    assert expected['correct'] > 0
+    assert skipped == expected
+
+
+
+def test_extrapolation_stays_in_frame():
+    landmarks = np.full((4, 33, 4), 0.5, dtype=np.float32)
+    landmarks[:, :, 0] = [[0.2], [0.95], [0.95], [0.95]]
+    landmarks[:, :, 1] = [[0.8], [0.05], [0.05], [0.05]]
+
+    skipper = AdaptiveFrameSkipper(FakePose(landmarks), target_latency=1e-9, max_interval=4)
+    frame = np.zeros((FRAME_HEIGHT, FRAME_WIDTH, 3), dtype=np.uint8)
+
+    # Frame 0 is inferred; with the interval at 4, frame 4 is the second inference.
+    for _ in range(5):
+        skipper.process(frame)
+
+    extrapolated = skipper.process(frame)
+
+    assert np.all(extrapolated[:, :2] >= 0.0) and np.all(extrapolated[:, :2] <= 1.0)
+    assert np.all(extrapolated[:, 3] == 0.5)
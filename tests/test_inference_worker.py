@@ -0,0 +1,53 @@
+import time
+
+import numpy as np
+import pytest
+
+from benchmark import FakePose, synthetic_landmarks
+from inference_worker import InferenceWorker
+
+
+class FailingPose(FakePose):
+    def __init__(self, landmarks, fail_calls):
+        super().__init__(landmarks)
+        self.fail_calls = fail_calls
+        self.calls = 0
+
+    def process(self, frame):
+        self.calls += 1
+        if self.calls in self.fail_calls:
+            raise RuntimeError('graph failed')
+
+        return super().process(frame)
+
+
+
+def wait_for(condition, timeout = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+
+def test_inference_error_is_raised_and_worker_keeps_running():
+    landmarks = synthetic_landmarks('squat', 10, 640, 480)
+    pose = FailingPose(landmarks, fail_calls={1})
+    worker = InferenceWorker(pose)
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    try:
+        worker.submit(frame)
+
+        # Polls until the failure surfaces; no frame ever produced a result.
+        with pytest.raises(RuntimeError, match='graph failed'):
+            wait_for(lambda: worker.latest()[0] is not None)
+
+        # Raised once; the next frame is processed as usual.
+        assert worker.latest() == (None, None)
+
+        worker.submit(frame)
+        wait_for(lambda: worker.latest()[0] == 1)
+        assert worker._thread.is_alive()
+    finally:
+        worker.close()
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+from benchmark import synthetic_landmarks
+from landmark_filter import OneEuroFilter
+from process_frame import ProcessFrame
+from synthetic_sessions import FRAME_WIDTH, FRAME_HEIGHT
+from thresholds import get_thresholds
+from utils import MediaClock
+
+
+def noisy_landmarks(seed, num_frames = 300, sigma = 0.01):
+    landmarks = synthetic_landmarks('squat', num_frames, FRAME_WIDTH, FRAME_HEIGHT, seed=seed)
+    noisy = landmarks.copy()
+    noisy[..., :2] += np.random.default_rng(100 + seed).normal(0, sigma, noisy[..., :2].shape).astype(np.float32)
+
+    return landmarks, noisy
+
+
+
+def count_squats(landmarks, landmark_filter = None):
+    clock = MediaClock(30.0)
+    processor = ProcessFrame(get_thresholds('beginner'), clock=clock, landmark_filter=landmark_filter)
+
+    for frame_idx, row in enumerate(landmarks):
+        clock.frame_idx = frame_idx
+        result = processor.analyze(row, FRAME_WIDTH, FRAME_HEIGHT)
+
+    return result['counters']
+
+
+
+@pytest.mark.parametrize('sigma', [0.01, 0.015])
+def test_filtered_noisy_reps_count_like_clean_ones(sigma):
+    # Landmark jitter of the lite pose model, as Gaussian noise of sigma frame widths.
+    unfiltered_error = 0
+
+    for seed in range(8):
+        landmarks, noisy = noisy_landmarks(seed, num_frames=900, sigma=sigma)
+        clean = count_squats(landmarks)
+
+        assert count_squats(noisy, OneEuroFilter()) == clean
+
+        counters = count_squats(noisy)
+        unfiltered_error += abs(counters['correct'] - clean['correct']) + abs(counters['incorrect'] - clean['incorrect'])
+
+    # Without the filter the same streams miscount.
+    assert unfiltered_error > 40
+
+
+
+def test_first_frame_and_frames_after_a_reset_pass_through():
+    _, noisy = noisy_landmarks(0)
+    landmark_filter = OneEuroFilter()
+
+    assert np.array_equal(landmark_filter(noisy[0], 0.0), noisy[0])
+    assert not np.array_equal(landmark_filter(noisy[1], 1 / 30), noisy[1])
+
+    landmark_filter.reset()
+    assert np.array_equal(landmark_filter(noisy[2], 2 / 30), noisy[2])
+
+
+
+def test_timestamp_gap_starts_over():
+    _, noisy = noisy_landmarks(0)
+    landmark_filter = OneEuroFilter(max_gap=0.5)
+
+    landmark_filter(noisy[0], 0.0)
+    landmark_filter(noisy[1], 1 / 30)
+
+    assert np.array_equal(landmark_filter(noisy[2], 1 / 30 + 0.6), noisy[2])
+
+
+
+def test_repeated_timestamp_keeps_the_previous_output():
+    _, noisy = noisy_landmarks(0)
+    landmark_filter = OneEuroFilter()
+
+    landmark_filter(noisy[0], 0.0)
+    previous = landmark_filter(noisy[1], 1 / 30).copy()
+
+    assert np.array_equal(landmark_filter(noisy[2], 1 / 30), previous)
+
+
+
+def test_visibility_passes_through_and_jitter_is_smoothed():
+    # A held pose with jittering landmarks and varying visibility.
+    landmarks, _ = noisy_landmarks(0)
+    held = np.repeat(landmarks[:1], 300, axis=0)
+    rng = np.random.default_rng(0)
+    noisy = (held + rng.normal(0, 0.01, held.shape) * [1, 1, 0, 0]).astype(np.float32)
+    noisy[:, :, 3] = rng.random(noisy.shape[:2])
+    landmark_filter = OneEuroFilter()
+
+    filtered = np.stack([landmark_filter(row, frame_idx / 30).copy() for frame_idx, row in enumerate(noisy)])
+
+    assert np.array_equal(filtered[:, :, 3], noisy[:, :, 3])
+
+    # Once settled, the jitter left is a fraction of the input's.
+    noisy_error = np.abs(noisy[30:, :, :2] - held[30:, :, :2]).mean()
+    filtered_error = np.abs(filtered[30:, :, :2] - held[30:, :, :2]).mean()
+    assert filtered_error < 0.5 * noisy_error
+
+
+
+def test_processor_resets_the_filter_when_the_pose_is_lost():
+    _, noisy = noisy_landmarks(0)
+    landmark_filter = OneEuroFilter()
+    clock = MediaClock(30.0)
+    processor = ProcessFrame(get_thresholds('beginner'), clock=clock, landmark_filter=landmark_filter)
+
+    for frame_idx, row in enumerate([noisy[0], noisy[1], None, noisy[3]]):
+        clock.frame_idx = frame_idx
+        processor.analyze(row, FRAME_WIDTH, FRAME_HEIGHT)
+
+    # The frame after the dropout starts the filter over.
+    assert np.array_equal(landmark_filter.filtered, noisy[3])
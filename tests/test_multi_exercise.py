@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from benchmark import synthetic_landmarks
+from exercise_engine import ExerciseProcessor
+from multi_exercise import MultiExerciseProcessor, MULTI_EXERCISE_SPECS
+from synthetic_sessions import EXERCISES, FRAME_WIDTH, FRAME_HEIGHT
+from thresholds import get_thresholds
+from utils import MediaClock
+
+
+def run(processor, landmarks):
+    for frame_idx, row in enumerate(landmarks):
+        processor.clock.frame_idx = frame_idx
+        processor.analyze(row, FRAME_WIDTH, FRAME_HEIGHT)
+
+
+
+@pytest.mark.parametrize('exercise', EXERCISES)
+def test_only_the_performed_exercise_counts(exercise):
+    landmarks = synthetic_landmarks(exercise, 900, FRAME_WIDTH, FRAME_HEIGHT)
+    multi = MultiExerciseProcessor(get_thresholds('beginner'), clock=MediaClock(30.0))
+
+    run(multi, landmarks)
+
+    counters = multi.counters()
+    assert counters[exercise]['correct'] > 0
+
+    for other in EXERCISES:
+        if other != exercise:
+            assert counters[other] == {'correct': 0, 'incorrect': 0}
+
+
+
+@pytest.mark.parametrize('spec', MULTI_EXERCISE_SPECS, ids=lambda spec: spec['name'])
+def test_analyzers_only_see_frames_of_their_view(spec):
+    # Switching between the exercises leaves each analyzer counting as it would on its own
+    # when fed only the stretches watched from its side of the camera.
+    thresholds = get_thresholds('beginner')
+    exercises = EXERCISES * 2
+    pieces = [synthetic_landmarks(exercise, 400, FRAME_WIDTH, FRAME_HEIGHT, seed=seed) for seed, exercise in enumerate(exercises)]
+    side_view = {other['name']: other['alignment'] for other in MULTI_EXERCISE_SPECS}
+
+    multi = MultiExerciseProcessor(thresholds, clock=MediaClock(30.0))
+    run(multi, np.concatenate(pieces))
+
+    single = ExerciseProcessor(spec, thresholds, clock=MediaClock(30.0))
+    run(single, np.concatenate([piece for piece, exercise in zip(pieces, exercises) if side_view[exercise] == spec['alignment']]))
+
+    assert multi.counters()[spec['name']] == {'correct': single.state_tracker[single.correct_key], 'incorrect': single.state_tracker[single.incorrect_key]}
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from offline_counter import count_squat_reps
+from process_frame import ProcessFrame
+from synthetic_sessions import random_session, FRAME_WIDTH, FRAME_HEIGHT
+from thresholds import get_thresholds
+from utils import MediaClock, NUM_POSE_LANDMARKS
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_offline_counts_match_streaming(seed):
+    thresholds = get_thresholds('beginner' if seed % 2 == 0 else 'pro')
+    fps = (30.0, 25.0, 29.97)[seed % 3]
+    landmarks = random_session(seed, 2000)
+
+    clock = MediaClock(fps)
+    processor = ProcessFrame(thresholds, clock=clock)
+
+    correct, incorrect = [], []
+    for frame_idx, row in enumerate(landmarks):
+        clock.frame_idx = frame_idx
+        result = processor.analyze(None if np.isnan(row[0, 0]) else row, FRAME_WIDTH, FRAME_HEIGHT)
+        correct.append(result['counters']['correct'])
+        incorrect.append(result['counters']['incorrect'])
+
+    offline = count_squat_reps(landmarks, thresholds, (FRAME_WIDTH, FRAME_HEIGHT), fps=fps)
+
+    np.testing.assert_array_equal(offline['correct_per_frame'], correct)
+    np.testing.assert_array_equal(offline['incorrect_per_frame'], incorrect)
+
+
+
+def test_empty_track():
+    offline = count_squat_reps(np.zeros((0, NUM_POSE_LANDMARKS, 4), dtype=np.float32), get_thresholds('beginner'), (FRAME_WIDTH, FRAME_HEIGHT))
+
+    assert offline['counters'] == {'correct': 0, 'incorrect': 0}
+    assert len(offline['correct_per_frame']) == 0 and len(offline['reset_frames']) == 0
@@ -0,0 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import parallel_analysis
+from parallel_analysis import extract_landmarks, extract_landmarks_parallel
+from utils import NUM_POSE_LANDMARKS
+from video_encoder import H264StreamWriter, find_h264_encoder
+
+
+class BrightnessPose:
+    def process(self, frame):
+        # Reports the frame's mean brightness, which identifies the frame in the test video.
+        value = float(frame.mean())
+        landmark = [SimpleNamespace(x=value, y=value, z=0.0, visibility=1.0)] * NUM_POSE_LANDMARKS
+
+        return SimpleNamespace(pose_landmarks=SimpleNamespace(landmark=landmark))
+
+    def close(self):
+        pass
+
+
+
+@pytest.mark.skipif(find_h264_encoder() is None, reason='no H.264 encoder in this PyAV build')
+def test_parallel_extraction_matches_sequential(tmp_path, monkeypatch):
+    path = str(tmp_path / 'frames.mp4')
+    writer = H264StreamWriter(path, 30, (64, 48))
+    for frame_idx in range(72):
+        writer.write_rgb(np.full((48, 64, 3), 3 * frame_idx, dtype=np.uint8))
+    writer.release()
+
+    # Threads stand in for the worker processes, which would not see the stub pose.
+    monkeypatch.setattr(parallel_analysis, 'get_mediapipe_pose', lambda **pose_params: BrightnessPose())
+    monkeypatch.setattr(parallel_analysis, 'ProcessPoolExecutor', lambda max_workers, mp_context: ThreadPoolExecutor(max_workers))
+
+    sequential = extract_landmarks(path)
+    parallel = extract_landmarks_parallel(path, num_workers=3, warmup_seconds=0.2)
+
+    # Compression moves the brightness by at most 1, so every frame stays identifiable.
+    assert len(sequential) == 72
+    assert np.array_equal(np.round(sequential[:, 0, 0] / 3), np.arange(72))
+    assert np.array_equal(parallel, sequential)
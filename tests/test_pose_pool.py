@@ -0,0 +1,66 @@
+import gc
+import threading
+
+import pytest
+
+import pose_pool
+from pose_pool import PoseLease, PosePool
+
+
+class StubPose:
+    def process(self, frame):
+        return None
+
+    def reset(self):
+        pass
+
+    def close(self):
+        pass
+
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(pose_pool, 'get_mediapipe_pose', lambda **pose_params: StubPose())
+    return PosePool(max_size=1, warmup=False)
+
+
+
+def test_lease_is_released_once(pool):
+    lease = PoseLease(pool.acquire(timeout=0), pool.release)
+
+    threads = [threading.Thread(target=lease.release) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert lease.released
+    assert pool.stats() == {'size': 1, 'idle': 1, 'leased': 0, 'max_size': 1}
+
+
+
+def test_abandoned_lease_returns_to_pool(pool):
+    # A session dropped without another script run: its state, and the lease with it, is collected.
+    session_state = {'pose_lease': PoseLease(pool.acquire(timeout=0), pool.release)}
+    session_state['self'] = session_state
+
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0)
+
+    del session_state
+    gc.collect()
+
+    assert pool.acquire(timeout=0) is not None
+
+
+
+def test_exchange_on_a_full_pool(pool):
+    pose = pool.acquire(timeout=0)
+
+    # No other slot is free, yet the trade goes through at once.
+    lite_pose = pool.exchange(pose, timeout=0, model_complexity=0)
+
+    assert lite_pose is not pose
+    assert lite_pose._pool_key == pool._key({'model_complexity': 0})
+    assert pool.stats() == {'size': 1, 'idle': 0, 'leased': 1, 'max_size': 1}
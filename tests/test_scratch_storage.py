@@ -0,0 +1,90 @@
+import io
+import os
+import time
+
+from scratch_storage import ScratchStorage
+
+
+class RecordingFile(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = []
+
+    def read(self, size = -1):
+        self.reads.append(size)
+        return super().read(size)
+
+
+
+def write_file(storage, name, size, age):
+    path = os.path.join(storage.scratch_dir, name)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+
+    return path
+
+
+
+def test_ingest_copies_in_chunks(tmp_path):
+    storage = ScratchStorage(str(tmp_path), chunk_size=1000)
+    data = os.urandom(10500)
+    upload = RecordingFile(data)
+    upload.read(100)
+
+    path = storage.ingest(upload, suffix='.mp4')
+
+    # The whole upload is copied, from its start, never more than a chunk at a time.
+    assert path.endswith('.mp4')
+    with open(path, 'rb') as f:
+        assert f.read() == data
+    assert upload.reads[1:] == [1000] * 12
+
+
+
+def test_release_deletes_the_file(tmp_path):
+    storage = ScratchStorage(str(tmp_path))
+    path = storage.ingest(io.BytesIO(b'video'))
+
+    storage.release(path)
+    storage.release(path)
+
+    assert not os.path.exists(path)
+    assert os.listdir(tmp_path) == []
+
+
+
+def test_cleanup_removes_old_files_but_not_active_ones(tmp_path):
+    storage = ScratchStorage(str(tmp_path), max_age=60.0)
+    active = storage.ingest(io.BytesIO(b'video'))
+    os.utime(active, (time.time() - 120, time.time() - 120))
+
+    old = write_file(storage, 'old', 10, age=120)
+    recent = write_file(storage, 'recent', 10, age=30)
+
+    storage.cleanup()
+
+    assert os.path.exists(active)
+    assert not os.path.exists(old)
+    assert os.path.exists(recent)
+
+
+
+def test_cleanup_evicts_oldest_first_past_max_bytes(tmp_path):
+    storage = ScratchStorage(str(tmp_path), max_bytes=250, max_age=3600.0)
+
+    # The oldest file is in use, so the next oldest go until the directory fits.
+    active = storage.ingest(io.BytesIO(b'x' * 100))
+    os.utime(active, (time.time() - 50, time.time() - 50))
+    oldest = write_file(storage, 'oldest', 100, age=40)
+    older = write_file(storage, 'older', 100, age=30)
+    newest = write_file(storage, 'newest', 50, age=10)
+
+    storage.cleanup()
+
+    assert os.path.exists(active)
+    assert not os.path.exists(oldest)
+    assert os.path.exists(older)
+    assert os.path.exists(newest)
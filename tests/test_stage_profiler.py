@@ -0,0 +1,22 @@
+import pytest
+
+from stage_profiler import StageProfiler
+
+
+def test_failed_frame_does_not_stop_timing():
+    profiler = StageProfiler()
+
+    with pytest.raises(ValueError):
+        with profiler.time_frame():
+            profiler.lap('inference')
+            raise ValueError('bad frame')
+
+    assert not profiler.active
+
+    with profiler.time_frame():
+        # Nested frames leave the timing to the outermost one.
+        with profiler.time_frame():
+            profiler.lap('inference')
+        profiler.lap('render')
+
+    assert {row['stage']: row['frames'] for row in profiler.summary()} == {'inference': 1, 'render': 1, 'total': 1}
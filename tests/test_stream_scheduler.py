@@ -0,0 +1,174 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import pose_pool
+import stream_scheduler
+from benchmark import FakePose, synthetic_landmarks
+from pose_pool import PosePool
+from stream_scheduler import StreamScheduler
+
+
+class FailingPose(FakePose):
+    def __init__(self, landmarks, fail_calls):
+        super().__init__(landmarks)
+        self.fail_calls = fail_calls
+        self.calls = 0
+
+    def process(self, frame):
+        self.calls += 1
+        if self.calls in self.fail_calls:
+            raise RuntimeError('graph failed')
+
+        return super().process(frame)
+
+
+
+def wait_for(condition, timeout = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+
+def test_inference_error_is_raised_and_worker_keeps_serving():
+    landmarks = synthetic_landmarks('squat', 10, 640, 480)
+    scheduler = StreamScheduler(poses=[FailingPose(landmarks, fail_calls={1})])
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    try:
+        failing = scheduler.add_stream('failing')
+        failing.submit(frame)
+
+        with pytest.raises(RuntimeError, match='graph failed'):
+            wait_for(lambda: failing.latest()[0] is not None)
+
+        # The failed stream is free again, and the worker serves it and the others.
+        other = scheduler.add_stream('other')
+        other.submit(frame)
+        failing.submit(frame)
+
+        wait_for(lambda: other.latest()[0] == 0 and failing.latest()[0] == 1)
+        assert [row['failed'] for row in scheduler.stats()] == [1, 0]
+    finally:
+        scheduler.close()
+
+
+
+class StubPose:
+    def process(self, frame):
+        return None
+
+    def reset(self):
+        pass
+
+    def close(self):
+        pass
+
+
+
+def test_workers_do_not_take_the_sessions_slots(monkeypatch):
+    pool = PosePool(max_size=1, warmup=False)
+    monkeypatch.setattr(pose_pool, 'get_mediapipe_pose', lambda **pose_params: StubPose())
+    monkeypatch.setattr(stream_scheduler, 'get_pose_pool', lambda: pool)
+
+    scheduler = StreamScheduler(num_workers=2)
+    session_pose = pool.acquire(timeout=0)
+    scheduler.close()
+
+    pool.release(session_pose)
+    assert pool.stats() == {'size': 1, 'idle': 1, 'leased': 0, 'max_size': 1}
+
+
+
+class RecordingPose(StubPose):
+    def __init__(self, gate = None):
+        self.gate = gate
+        self.log = []
+
+    def process(self, frame):
+        # Frames carry their stream's number in their pixels.
+        if self.gate is not None:
+            self.gate.wait()
+        self.log.append(int(frame[0, 0, 0]))
+
+        return SimpleNamespace(pose_landmarks=None)
+
+    def reset(self):
+        self.log.append('reset')
+
+
+
+def frame_of(stream_no):
+    return np.full((4, 4, 3), stream_no, dtype=np.uint8)
+
+
+
+def test_each_stream_keeps_its_worker():
+    poses = [RecordingPose(), RecordingPose()]
+    scheduler = StreamScheduler(poses=poses)
+
+    try:
+        streams = [scheduler.add_stream(name) for name in ('a', 'b')]
+        assert [stream.worker for stream in streams] == [0, 1]
+
+        for frame_id in range(5):
+            for stream_no, stream in enumerate(streams):
+                stream.submit(frame_of(stream_no))
+                wait_for(lambda: stream.latest()[0] == frame_id)
+    finally:
+        scheduler.close()
+
+    # Each graph tracks one stream and never needs a reset.
+    assert poses[0].log == [0] * 5
+    assert poses[1].log == [1] * 5
+
+
+
+def test_graph_is_reset_when_its_worker_switches_streams():
+    pose = RecordingPose()
+    scheduler = StreamScheduler(poses=[pose])
+
+    try:
+        streams = [scheduler.add_stream(name) for name in ('a', 'b')]
+
+        for stream_no in [0, 0, 1, 0]:
+            stream = streams[stream_no]
+            frame_id = stream.submitted_frames
+            stream.submit(frame_of(stream_no))
+            wait_for(lambda: stream.latest()[0] == frame_id)
+    finally:
+        scheduler.close()
+
+    assert pose.log == [0, 0, 'reset', 1, 'reset', 0]
+
+
+
+def test_idle_worker_takes_a_stream_from_a_busy_one():
+    gate = threading.Event()
+    poses = [RecordingPose(gate), RecordingPose()]
+    scheduler = StreamScheduler(poses=poses)
+
+    try:
+        a, b, c = [scheduler.add_stream(name) for name in ('a', 'b', 'c')]
+        assert [a.worker, b.worker, c.worker] == [0, 1, 0]
+
+        # Worker 0 is stuck on a's frame, so worker 1 serves c, which then stays with it.
+        a.submit(frame_of(0))
+        wait_for(lambda: scheduler._busy_workers[0])
+        c.submit(frame_of(2))
+        wait_for(lambda: c.latest()[0] == 0)
+        assert c.worker == 1
+
+        gate.set()
+        wait_for(lambda: a.latest()[0] == 0)
+    finally:
+        gate.set()
+        scheduler.close()
+
+    assert poses[0].log == [0]
+    assert poses[1].log == [2]
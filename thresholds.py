@@ -1,3 +1,7 @@
+import functools
+from types import MappingProxyType
+
+
 # Get thresholds for beginner mode
 def get_thresholds_beginner():
     _ANGLE_HIP_KNEE_VERT = {
@@ -19,15 +23,41 @@ def get_thresholds_beginner():
         'PASS': (121, 150)    # Pass range (too high)
     }
 
+    _ANGLE_ELBOW_PUSHUP = {
+        'NORMAL': (150, 180),  # Arms extended
+        'TRANS': (100, 145),
+        'PASS': (50, 95)       # Chest lowered
+    }
+
+    _ANGLE_ELBOW_TRICEP_EXTENSION = {
+        'NORMAL': (150, 180),  # Arms extended overhead
+        'TRANS': (100, 145),
+        'PASS': (30, 95)       # Weight lowered behind the head
+    }
+
     thresholds = {
         'HIP_KNEE_VERT': _ANGLE_HIP_KNEE_VERT,
         'ELBOW_BICEP_CURL': _ANGLE_ELBOW_BICEP_CURL,  # Added bicep curl thresholds
         'SHOULDER_PRESS': _ANGLE_SHOULDER_PRESS,      # Added shoulder press thresholds
+        'PUSHUP_ELBOW': _ANGLE_ELBOW_PUSHUP,
+        'TRICEP_ELBOW': _ANGLE_ELBOW_TRICEP_EXTENSION,
+
+        # Flat bounds read by the bicep curl feedback rules, derived from the range above.
+        'ELBOW_THRESH': [*_ANGLE_ELBOW_BICEP_CURL['NORMAL'], *_ANGLE_ELBOW_BICEP_CURL['PASS'], _ANGLE_ELBOW_BICEP_CURL['PASS'][1]],
+
+        # Shoulder press states: arms down below the transition range, up above the pass threshold.
+        'SHOULDER_PRESS_STATES': {
+            'DOWN': (0, _ANGLE_SHOULDER_PRESS['TRANS'][0] - 1),
+            'UP': (_ANGLE_SHOULDER_PRESS['PASS'][0] + 1, 180)
+        },
 
         'HIP_THRESH': [10, 50],
         'ANKLE_THRESH': 45,
         'KNEE_THRESH': [50, 70, 95],
 
+        'PUSHUP_HIP_THRESH': 160,
+        'TRICEP_UPPER_ARM_THRESH': 30,
+
         'OFFSET_THRESH': 35.0,
         'INACTIVE_THRESH': 15.0,
 
@@ -58,19 +88,76 @@ def get_thresholds_pro():
         'PASS': (131, 150)    # Pass range (too high)
     }
 
+    _ANGLE_ELBOW_PUSHUP = {
+        'NORMAL': (150, 180),  # Arms extended
+        'TRANS': (100, 145),
+        'PASS': (60, 95)       # Chest lowered
+    }
+
+    _ANGLE_ELBOW_TRICEP_EXTENSION = {
+        'NORMAL': (150, 180),  # Arms extended overhead
+        'TRANS': (100, 145),
+        'PASS': (30, 95)       # Weight lowered behind the head
+    }
+
     thresholds = {
         'HIP_KNEE_VERT': _ANGLE_HIP_KNEE_VERT,
         'ELBOW_BICEP_CURL': _ANGLE_ELBOW_BICEP_CURL,  # Added bicep curl thresholds
         'SHOULDER_PRESS': _ANGLE_SHOULDER_PRESS,      # Added shoulder press thresholds
+        'PUSHUP_ELBOW': _ANGLE_ELBOW_PUSHUP,
+        'TRICEP_ELBOW': _ANGLE_ELBOW_TRICEP_EXTENSION,
+
+        # Flat bounds read by the bicep curl feedback rules, derived from the range above.
+        'ELBOW_THRESH': [*_ANGLE_ELBOW_BICEP_CURL['NORMAL'], *_ANGLE_ELBOW_BICEP_CURL['PASS'], _ANGLE_ELBOW_BICEP_CURL['PASS'][1]],
+
+        # Shoulder press states: arms down below the transition range, up above the pass threshold.
+        'SHOULDER_PRESS_STATES': {
+            'DOWN': (0, _ANGLE_SHOULDER_PRESS['TRANS'][0] - 1),
+            'UP': (_ANGLE_SHOULDER_PRESS['PASS'][0] + 1, 180)
+        },
 
         'HIP_THRESH': [15, 50],
         'ANKLE_THRESH': 30,
         'KNEE_THRESH': [50, 80, 95],
 
+        'PUSHUP_HIP_THRESH': 165,
+        'TRICEP_UPPER_ARM_THRESH': 20,
+
         'OFFSET_THRESH': 35.0,
         'INACTIVE_THRESH': 15.0,
 
         'CNT_FRAME_THRESH': 50
     }
 
-    return thresholds
\ No newline at end of file
+    return thresholds
+
+
+# Threshold profiles by mode name.
+THRESHOLD_PROFILES = {
+    'beginner': get_thresholds_beginner,
+    'pro': get_thresholds_pro
+}
+
+
+def freeze_thresholds(thresholds):
+    # Read-only copy: dicts become mapping proxies, lists become tuples.
+    if isinstance(thresholds, dict) or isinstance(thresholds, MappingProxyType):
+        return MappingProxyType({key: freeze_thresholds(value) for key, value in thresholds.items()})
+    if isinstance(thresholds, (list, tuple)):
+        return tuple(freeze_thresholds(value) for value in thresholds)
+    return thresholds
+
+
+def thresholds_key(thresholds):
+    # Hashable form of a threshold profile, for caching what is compiled from it.
+    if isinstance(thresholds, dict) or isinstance(thresholds, MappingProxyType):
+        return tuple((key, thresholds_key(value)) for key, value in sorted(thresholds.items()))
+    if isinstance(thresholds, (list, tuple)):
+        return tuple(thresholds_key(value) for value in thresholds)
+    return thresholds
+
+
+# Get the read-only thresholds of a mode, built once per process and shared by every caller.
+@functools.lru_cache(maxsize=None)
+def get_thresholds(mode):
+    return freeze_thresholds(THRESHOLD_PROFILES[mode.lower()]())
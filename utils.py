@@ -1,7 +1,26 @@
+import inspect
+import threading
+from collections import OrderedDict
+
 import cv2
 import mediapipe as mp
 import numpy as np
 
+
+# Number of landmarks in the MediaPipe pose topology.
+NUM_POSE_LANDMARKS = 33
+
+# Landmark i of a horizontally mirrored image is landmark MIRRORED_LANDMARKS[i] of the
+# original: every left landmark (eyes, ears, mouth, limbs) trades places with its right twin.
+MIRRORED_LANDMARKS = np.array([0, 4, 5, 6, 1, 2, 3, 8, 7, 10, 9] + [idx + 1 if idx % 2 else idx - 1 for idx in range(11, NUM_POSE_LANDMARKS)])
+
+# Maximum number of pre-rendered draw_text labels kept in memory.
+TEXT_SPRITE_CACHE_SIZE = 256
+
+_text_sprites = OrderedDict()
+_text_sprites_lock = threading.Lock()
+
+
 def draw_rounded_rect(img, rect_start, rect_end, corner_width, box_color):
 
     x1, y1 = rect_start
@@ -43,6 +62,86 @@ def draw_dotted_line(frame, lm_coord, start, end, line_color):
     return frame
 
 
+def _draw_label(img, msg, width, font, pos, font_scale, font_thickness, text_color, text_color_bg, box_offset):
+
+    # The rounded box and the anti-aliased text of a label, rasterized straight onto img.
+    offset = box_offset
+    x, y = pos
+    text_size, _ = cv2.getTextSize(msg, font, font_scale, font_thickness)
+    text_w, text_h = text_size
+    rec_start = tuple(p - o for p, o in zip(pos, offset))
+    rec_end = tuple(m + n - o for m, n, o in zip((x + text_w, y + text_h), offset, (25, 0)))
+
+    draw_rounded_rect(img, rec_start, rec_end, width, text_color_bg)
+
+    cv2.putText(img, msg, (int(rec_start[0] + 6), int(y + text_h + font_scale - 1)), font, font_scale, text_color, font_thickness, cv2.LINE_AA)
+
+    return text_size
+
+
+
+
+def _render_text_sprite(msg, width, font, font_scale, font_thickness, text_color, text_color_bg, box_offset, channels, dtype):
+
+    # Renders a label exactly as _draw_label would at pos = (0, 0), onto a blank canvas,
+    # with the mask of the pixels it covers. Anti-aliased text reaching past the box
+    # blends with the frame underneath, which a sprite cannot reproduce, so such labels
+    # get no sprite and are rasterized every time.
+    offset = box_offset
+    text_size, baseline = cv2.getTextSize(msg, font, font_scale, font_thickness)
+    text_w, text_h = text_size
+    rec_start = tuple(-o for o in offset)
+    rec_end = tuple(m + n - o for m, n, o in zip((text_w, text_h), offset, (25, 0)))
+    text_org = (int(rec_start[0] + 6), int(text_h + font_scale - 1))
+
+    # Canvas covering the box plus the anti-aliased extent of the text.
+    margin = font_thickness + 2
+    x0 = min(rec_start[0], text_org[0]) - margin
+    y0 = min(rec_start[1], text_org[1] - text_h) - margin
+    x1 = max(rec_end[0], text_org[0] + text_w) + margin
+    y1 = max(rec_end[1], text_org[1] + baseline) + margin
+
+    def shift(pt):
+        return (pt[0] - x0, pt[1] - y0)
+
+    box = np.zeros((y1 - y0 + 1, x1 - x0 + 1), dtype=np.uint8)
+    text = np.zeros_like(box)
+
+    draw_rounded_rect(box, shift(rec_start), shift(rec_end), width, 255)
+    cv2.putText(text, msg, shift(text_org), font, font_scale, 255, font_thickness, cv2.LINE_AA)
+
+    entry = {'sprite': None, 'mask': None, 'origin': (x0, y0), 'text_size': text_size}
+
+    if not np.any((text > 0) & (box == 0)):
+        entry['sprite'] = np.zeros((*box.shape, channels), dtype=dtype)
+        _draw_label(entry['sprite'], msg, width, font, shift((0, 0)), font_scale, font_thickness, text_color, text_color_bg, box_offset)
+        entry['mask'] = box
+
+    return entry
+
+
+
+
+def _blit_text_sprite(img, entry, pos):
+
+    # Copies a label's pixels into img. Returns False, leaving img as it is, when the
+    # sprite does not lie entirely inside img: OpenCV clips the raster calls in ways a
+    # cropped sprite does not reproduce.
+    sprite = entry['sprite']
+    h, w = sprite.shape[:2]
+    x = pos[0] + entry['origin'][0]
+    y = pos[1] + entry['origin'][1]
+
+    if x < 0 or y < 0 or x + w > img.shape[1] or y + h > img.shape[0]:
+        return False
+
+    cv2.copyTo(sprite, entry['mask'], img[y:y + h, x:x + w])
+
+    return True
+
+
+
+
 def draw_text(
     img,
     msg,
@@ -56,29 +155,30 @@ def draw_text(
     box_offset=(20, 10),
 ):
 
-    offset = box_offset
-    x, y = pos
-    text_size, _ = cv2.getTextSize(msg, font, font_scale, font_thickness)
-    text_w, text_h = text_size
-    rec_start = tuple(p - o for p, o in zip(pos, offset))
-    rec_end = tuple(m + n - o for m, n, o in zip((x + text_w, y + text_h), offset, (25, 0)))
-    
-    img = draw_rounded_rect(img, rec_start, rec_end, width, text_color_bg)
+    # Labels repeat from frame to frame, so each distinct one is rasterized once and
+    # then copied from a bounded LRU cache. Labels the cache cannot reproduce pixel for
+    # pixel (text past the box, or clipped by the frame border) are rasterized instead.
+    key = (msg, width, font, font_scale, font_thickness, tuple(text_color), tuple(text_color_bg), tuple(box_offset), img.shape[2], img.dtype.str)
 
+    with _text_sprites_lock:
+        entry = _text_sprites.get(key)
+        if entry is not None:
+            _text_sprites.move_to_end(key)
 
-    cv2.putText(
-        img,
-        msg,
-        (int(rec_start[0] + 6), int(y + text_h + font_scale - 1)), 
-        font,
-        font_scale,
-        text_color,
-        font_thickness,
-        cv2.LINE_AA,
-    )
+    if entry is None:
+        entry = _render_text_sprite(msg, width, font, font_scale, font_thickness, text_color, text_color_bg, box_offset, img.shape[2], img.dtype)
 
-    
-    return text_size
+        with _text_sprites_lock:
+            _text_sprites[key] = entry
+            while len(_text_sprites) > TEXT_SPRITE_CACHE_SIZE:
+                _text_sprites.popitem(last=False)
+
+    pos = (int(pos[0]), int(pos[1]))
+
+    if entry['sprite'] is None or not _blit_text_sprite(img, entry, pos):
+        _draw_label(img, msg, width, font, pos, font_scale, font_thickness, text_color, text_color_bg, box_offset)
+
+    return entry['text_size']
 
 
 
@@ -108,6 +208,74 @@ def get_landmark_array(pose_landmark, key, frame_width, frame_height):
 
 
 
+def find_angles(p1, p2, ref_pt):
+    # Batched version of find_angle over (N, 2) arrays of points.
+    p1_ref = p1 - ref_pt
+    p2_ref = p2 - ref_pt
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cos_theta = np.einsum('ij,ij->i', p1_ref, p2_ref) / (1.0 * np.linalg.norm(p1_ref, axis=1) * np.linalg.norm(p2_ref, axis=1))
+    theta = np.arccos(np.clip(np.nan_to_num(cos_theta, nan=1.0), -1.0, 1.0))
+
+    degree = int(180 / np.pi) * theta
+
+    return degree.astype(np.int64)
+
+
+
+
+def find_joint_angles(landmark_coords, angle_triples, vertical = None):
+    # Each row of angle_triples is (p1, p2, ref_pt) as landmark indices. Rows flagged
+    # in vertical measure against the vertical through ref_pt instead of p2.
+    p1 = landmark_coords[angle_triples[:, 0]]
+    p2 = landmark_coords[angle_triples[:, 1]]
+    ref_pt = landmark_coords[angle_triples[:, 2]]
+
+    if vertical is not None:
+        p2[vertical, 1] = 0
+
+    return find_angles(p1, p2, ref_pt)
+
+
+
+
+
+def get_landmark_matrix(pose_landmark, out = None):
+    # Pack all landmarks as (x, y, z, visibility) rows of a single float32 array.
+    if out is None:
+        out = np.empty((NUM_POSE_LANDMARKS, 4), dtype=np.float32)
+
+    out[:] = [(lm.x, lm.y, lm.z, lm.visibility) for lm in pose_landmark]
+
+    return out
+
+
+
+
+def get_landmark_coords(landmark_matrix, frame_width, frame_height, out = None):
+    # Denormalize x, y of every landmark to integer pixel coordinates.
+    if out is None:
+        out = np.empty((landmark_matrix.shape[0], 2), dtype=np.int64)
+
+    np.multiply(landmark_matrix[:, :2], (frame_width, frame_height), out=out, dtype=np.float64, casting='unsafe')
+
+    return out
+
+
+
+
+def mirror_landmarks(landmark_matrix, out = None):
+    # Landmarks as detected in the horizontally mirrored frame: x flipped and left/right
+    # swapped, for one (33, 4) frame or a (N, 33, 4) trace. Mirroring twice gives the
+    # landmarks back; out must not be landmark_matrix.
+    out = np.take(landmark_matrix, MIRRORED_LANDMARKS, axis=-2, out=out)
+    out[..., 0] = 1.0 - out[..., 0]
+
+    return out
+
+
+
+
 def get_landmark_features(kp_results, dict_features, feature, frame_width, frame_height):
 
     if feature == 'nose':
@@ -128,6 +296,19 @@ def get_landmark_features(kp_results, dict_features, feature, frame_width, frame
        raise ValueError("feature needs to be either 'nose', 'left' or 'right")
 
 
+class MediaClock:
+    # Callable clock reporting the timestamp of the current video frame, for use as a
+    # processor clock when analysing recorded video. Set frame_idx before each frame.
+    def __init__(self, fps):
+        self.fps = fps if fps > 0 else 30.0
+        self.frame_idx = 0
+
+    def __call__(self):
+        return self.frame_idx / self.fps
+
+
+
+
 def get_mediapipe_pose(
                         static_image_mode = False, 
                         model_complexity = 1,
@@ -143,4 +324,14 @@ def get_mediapipe_pose(
                                     min_detection_confidence = min_detection_confidence,
                                     min_tracking_confidence = min_tracking_confidence
                                  )
-    return pose
\ No newline at end of file
+    return pose
+
+
+
+
+def get_pose_params(**pose_params):
+    # Full get_mediapipe_pose keyword arguments, with defaults filled in for any not given.
+    params = {name: p.default for name, p in inspect.signature(get_mediapipe_pose).parameters.items()}
+    params.update(pose_params)
+
+    return params
\ No newline at end of file
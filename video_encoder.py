@@ -0,0 +1,132 @@
+import fractions
+import os
+
+import av
+import cv2
+import numpy as np
+
+
+# H.264 encoders tried in order. PyAV's wheels ship libx264; other FFmpeg builds may
+# only have one of the others.
+H264_ENCODERS = ('libx264', 'h264', 'libopenh264')
+
+# Fragmented MP4: an empty moov box goes first and every keyframe starts a new moof/mdat
+# fragment, so the file is playable (and can be served) while it is still being written.
+FRAGMENTED_MP4_OPTIONS = {
+                           'movflags': 'frag_keyframe+empty_moov+default_base_moof',
+                           'flush_packets': '1'
+                         }
+
+
+
+
+def find_h264_encoder():
+    for name in H264_ENCODERS:
+        try:
+            av.codec.Codec(name, 'w')
+        except Exception:
+            continue
+
+        return name
+
+    return None
+
+
+
+
+class H264StreamWriter:
+    def __init__(self, path, fps, frame_size, crf = 23, preset = 'veryfast', fragment_seconds = 1.0, threads = 0):
+
+        # Drop-in replacement for cv2.VideoWriter that encodes H.264 into a fragmented MP4
+        # with PyAV. A fragment is flushed to path every fragment_seconds of video, so
+        # players and downloads can start on the finished part before the last frame is
+        # written. The encoder runs on its own threads (threads=0: one per core).
+        # playable_bytes is the length of the file's playable prefix: the header and every
+        # complete fragment. Raises RuntimeError when this FFmpeg build has no H.264 encoder.
+        codec = find_h264_encoder()
+        if codec is None:
+            raise RuntimeError('no H.264 encoder available in this PyAV build')
+
+        self.path = path
+        self.rate = fractions.Fraction(fps if fps > 0 else 30.0).limit_denominator(1001)
+        self.num_frames = 0
+        self.playable_bytes = 0
+
+        self.container = av.open(path, mode='w', format='mp4', options=FRAGMENTED_MP4_OPTIONS)
+
+        self.stream = self.container.add_stream(codec, rate=self.rate)
+
+        # 4:2:0 chroma needs even dimensions; odd frames lose their last row or column.
+        width, height = frame_size
+        self.stream.width = width - width % 2
+        self.stream.height = height - height % 2
+        self.stream.pix_fmt = 'yuv420p'
+
+        # A keyframe starts each fragment.
+        self.stream.codec_context.gop_size = max(1, round(float(self.rate) * fragment_seconds))
+        self.stream.codec_context.thread_type = 'AUTO'
+        self.stream.codec_context.thread_count = threads
+
+        if codec == 'libx264':
+            self.stream.codec_context.options = {'crf': str(crf), 'preset': preset}
+
+
+
+    def isOpened(self):
+        return self.container is not None
+
+
+
+    def write_rgb(self, frame: np.array):
+        # Encodes one RGB frame; VideoPipeline hands frames over here without a BGR round trip.
+        self._encode(frame, cv2.COLOR_RGB2YUV_I420)
+
+
+
+    def write(self, frame: np.array):
+        # Encodes one BGR frame, as cv2.VideoWriter.write().
+        self._encode(frame, cv2.COLOR_BGR2YUV_I420)
+
+
+
+    def _encode(self, frame, conversion):
+        # OpenCV converts to I420 several times faster than swscale. Each frame gets its
+        # own array, since the encoder may still hold the previous one.
+        yuv = cv2.cvtColor(frame[:self.stream.height, :self.stream.width], conversion)
+        video_frame = av.VideoFrame.from_numpy_buffer(yuv, format='yuv420p')
+
+        video_frame.pts = self.num_frames
+        video_frame.time_base = 1 / self.rate
+        self.num_frames += 1
+
+        for packet in self.stream.encode(video_frame):
+            self.container.mux(packet)
+
+            # A keyframe starts a new fragment, so muxing it wrote out the previous one.
+            if packet.is_keyframe:
+                self.playable_bytes = os.path.getsize(self.path)
+
+
+
+    def playable_prefix(self):
+        # The playable part of the file so far, safe to read while frames are being written.
+        if not self.playable_bytes:
+            return b''
+
+        with open(self.path, 'rb') as f:
+            return f.read(self.playable_bytes)
+
+
+
+    def release(self):
+        if self.container is None:
+            return
+
+        # Drain the frames still buffered in the encoder.
+        for packet in self.stream.encode(None):
+            self.container.mux(packet)
+
+        self.container.close()
+        self.container = None
+
+        self.playable_bytes = os.path.getsize(self.path)
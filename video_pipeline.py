@@ -0,0 +1,151 @@
+import queue
+import threading
+
+import cv2
+
+
+# Marks the end of a frame stream in the pipeline queues.
+_END = object()
+
+
+class VideoPipeline:
+    def __init__(self, capture, writer, queue_size = 8):
+
+        # cv2.VideoCapture to decode from and cv2.VideoWriter to encode into. Writers with
+        # a write_rgb() method (video_encoder.H264StreamWriter) take the RGB frames as they are.
+        self.capture = capture
+        self.writer = writer
+        self._write_rgb = getattr(writer, 'write_rgb', None)
+
+        # Bounded queues so a fast decoder or a slow encoder applies backpressure
+        # instead of buffering the whole video in memory.
+        self.decode_queue = queue.Queue(maxsize = queue_size)
+        self.encode_queue = queue.Queue(maxsize = queue_size)
+
+        self._stop = threading.Event()
+        self._errors = []
+
+        self._decoder = threading.Thread(target = self._decode, daemon = True)
+        self._encoder = threading.Thread(target = self._encode, daemon = True)
+
+
+
+    def __enter__(self):
+        self.start()
+        return self
+
+
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._shutdown()
+
+
+
+    def start(self):
+        self._decoder.start()
+        self._encoder.start()
+
+
+
+    def _put(self, q, item):
+        # Block while the queue is full, but give up once the pipeline is stopped.
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout = 0.1)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
+
+
+    def _raise_errors(self):
+        if self._errors:
+            raise self._errors[0]
+
+
+
+    def _decode(self):
+        try:
+            while not self._stop.is_set():
+                ret, frame = self.capture.read()
+                if not ret:
+                    break
+
+                # convert frame from BGR to RGB before processing it.
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+                if not self._put(self.decode_queue, frame):
+                    return
+
+        except Exception as e:
+            self._errors.append(e)
+
+        finally:
+            self._put(self.decode_queue, _END)
+
+
+
+    def _encode(self):
+        while True:
+            frame = self.encode_queue.get()
+            if frame is _END:
+                break
+
+            # Keep draining after a failure so the producer never blocks on a full queue.
+            if self._errors:
+                continue
+
+            try:
+                if self._write_rgb is not None:
+                    self._write_rgb(frame)
+                else:
+                    self.writer.write(cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
+            except Exception as e:
+                self._errors.append(e)
+
+
+
+    def frames(self):
+        # Yields decoded RGB frames in order. Runs on the caller's thread.
+        while True:
+            frame = self.decode_queue.get()
+            if frame is _END:
+                break
+
+            yield frame
+
+        self._raise_errors()
+
+
+
+    def write(self, frame):
+        # Queues a processed RGB frame for encoding, in call order.
+        self._raise_errors()
+        self._put(self.encode_queue, frame)
+
+
+
+    def close(self):
+        self._shutdown()
+        self._raise_errors()
+
+
+
+    def _shutdown(self):
+        # Flush every queued frame to the writer before stopping the decoder.
+        if self._encoder.is_alive():
+            self._put(self.encode_queue, _END)
+            self._encoder.join()
+
+        self._stop.set()
+
+        while not self.decode_queue.empty():
+            self.decode_queue.get_nowait()
+
+        if self._decoder.is_alive():
+            self._decoder.join()